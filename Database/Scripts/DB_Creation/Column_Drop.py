@@ -1,19 +1,51 @@
-import pandas as pd
+import argparse
 
-# Read the CSV file
-df = pd.read_csv('movies-normalized.csv')
+import profiling
+from artifacts import read_artifact, write_artifact
+from data_profile import ensure_profile, save_profile
 
-# Calculate the threshold for non-missing values
-threshold = len(df) * 0.5
 
-# Identify columns to drop
-cols_to_drop = df.columns[df.isna().sum() > len(df) - threshold]
+def drop_sparse_columns(df, max_missing=0.5, profile=None):
+    if profile is not None:
+        # null counts from the data profile (see data_profile.py)
+        cols_to_drop = profile.columns_to_drop(max_missing)
+        return df.drop(columns=cols_to_drop), cols_to_drop
 
-# Drop them
-df = df.drop(columns=cols_to_drop)
+    # Calculate the threshold for non-missing values
+    threshold = len(df) * max_missing
 
-# Print dropped columns
-print("Dropped columns:", list(cols_to_drop))
+    # Identify columns to drop
+    cols_to_drop = df.columns[df.isna().sum() > len(df) - threshold]
 
-# Save the cleaned DataFrame
-df.to_csv('movies-column-dropped.csv', index=False)
+    # Drop them
+    df = df.drop(columns=cols_to_drop)
+    return df, list(cols_to_drop)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    profiling.add_arguments(ap)
+    profiling.configure(ap.parse_args())
+
+    # Read the CSV file
+    with profiling.stage("read") as st:
+        df = read_artifact('movies-normalized.csv')
+        st.rows_out = len(df)
+
+    with profiling.stage("column_drop", len(df)) as st:
+        profile = ensure_profile('movies-normalized.csv', df)
+        df, cols_to_drop = drop_sparse_columns(df, profile=profile)
+        st.rows_out = len(df)
+
+    # Print dropped columns
+    print("Dropped columns:", cols_to_drop)
+
+    # Save the cleaned DataFrame
+    with profiling.stage("write", len(df)):
+        write_artifact(df, 'movies-column-dropped.csv')
+        # the next stages' profile, without another scan
+        save_profile(profile.select(df.columns), 'movies-column-dropped.csv')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,47 @@
 # this script creates a database schema and stores the processed data
-
-import sqlite3
-import pandas as pd
-
-# load the cleaned csv
-df = pd.read_csv("movies_category_cleaned.csv")
-
-# create sqlite database
-conn = sqlite3.connect("movies.db")
-cur = conn.cursor()
-
-# create schema
-cur.execute("""
-CREATE TABLE IF NOT EXISTS movies (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    movie TEXT NOT NULL,
-    genre TEXT,
-    runtime REAL,
-    rating REAL,
-    stars TEXT,
-    description TEXT,
-    votes REAL,
-    director TEXT
-)
-""")
-
-# clears the table before inserting new data to avoid duplicates
-cur.execute("DELETE FROM movies")
-
-# insert data
-# pandas maps to existing columns by name
-df.to_sql("movies", conn, if_exists="append", index=False)
-
-conn.commit()
-conn.close()
-
-print("Loaded", len(df), "rows into movies.db")
+# --bulk loads everything in one transaction via a staging table and builds the indexes
+# --incremental upserts a delta file (same columns, optional 'deleted' flag) by natural key
+
+import argparse
+import time
+
+import profiling
+from db_loader import KEY_COLUMNS, OPTIONAL_KEY_COLUMNS, load_movies, bulk_load_movies, upsert_movies
+from artifacts import read_artifact
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--input", default="movies_category_cleaned.csv")
+ap.add_argument("--db", default="movies.db")
+mode = ap.add_mutually_exclusive_group()
+mode.add_argument("--bulk", action="store_true",
+                  help="executemany into a staging table, swap it in and create indexes")
+mode.add_argument("--incremental", action="store_true",
+                  help="upsert new/changed rows and delete tombstoned ones instead of reloading")
+profiling.add_arguments(ap)
+args = ap.parse_args()
+profiling.configure(args)
+
+# load the cleaned data (its Parquet copy when there is a fresh one)
+# (key columns stay text so a delta hashes to the same natural keys as the table)
+with profiling.stage("read") as st:
+    df = read_artifact(args.input, dtype={col: str for col in KEY_COLUMNS + OPTIONAL_KEY_COLUMNS} if args.incremental else None)
+    st.rows_out = len(df)
+
+# create sqlite database, create schema and insert data
+start = time.perf_counter()
+with profiling.stage("load", len(df)) as st:
+    if args.incremental:
+        counts = upsert_movies(df, args.db)
+        rows = len(df)
+    elif args.bulk:
+        rows = bulk_load_movies(df, args.db)
+    else:
+        rows = load_movies(df, args.db)
+    st.rows_out = rows
+elapsed = time.perf_counter() - start
+
+if args.incremental:
+    print("Applied", rows, "delta rows to", args.db, counts)
+else:
+    print("Loaded", rows, "rows into", args.db)
+print(f"Load time: {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
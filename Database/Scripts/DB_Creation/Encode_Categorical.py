@@ -1,7 +1,16 @@
+import argparse
+
+import numpy as np
 import pandas as pd
 
-# Load CSV
-df = pd.read_csv("movies-cleaned.csv")
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional: the .str fallback below gives the same result
+    pa = None
+
+import profiling
+from artifacts import read_artifact, write_artifact
 
 # Function to clean the stars and director string lists
 def clean_list_column(value):
@@ -14,14 +23,101 @@ def clean_list_column(value):
     cleaned = [p.strip() for p in parts if p.strip()]
     return cleaned
 
-# Clean both columns
-df['stars'] = df['stars'].apply(clean_list_column)
-df['director'] = df['director'].apply(clean_list_column)
 
-df['stars'] = df['stars'].apply(lambda x: ", ".join(x))
-df['director'] = df['director'].apply(lambda x: ", ".join(x))
+def string_positions(values):
+    # clean_list_column gives [] for anything that is not a string (NaN, numbers)
+    raw = values.to_numpy(dtype=object)
+    is_str = np.fromiter((isinstance(v, str) for v in raw), dtype=bool, count=len(raw))
+    return np.flatnonzero(is_str), raw[is_str]
+
+
+def list_column_pairs(values):
+    """clean_list_column over a whole column at once, exploded.
+
+    Returns (movie_idx, names): the row position in `values` of every cleaned
+    name, in list order, and the names themselves (an Arrow string array
+    when pyarrow is installed, else a numpy object array). Rows whose list
+    is empty have no pairs.
+    """
+    positions, text = string_positions(values)
+    if pa is not None:
+        # Arrow kernels: utf8_trim_whitespace strips the same characters as str.strip()
+        text = pa.array(text, type=pa.large_string())
+        text = pc.utf8_trim(pc.utf8_trim_whitespace(text), characters="[]")
+        lists = pc.split_pattern(text, ",")
+        parents = pc.list_parent_indices(lists).to_numpy()
+        names = pc.list_flatten(lists)
+        names = pc.utf8_trim_whitespace(names)
+        names = pc.utf8_trim(pc.utf8_trim(names, characters="'"), characters='"')
+        names = pc.utf8_trim_whitespace(names)
+        keep = pc.not_equal(names, "")
+        return positions[parents[keep.to_numpy(zero_copy_only=False)]], names.filter(keep)
+
+    text = pd.Series(text, dtype=object).str.strip().str.strip("[]")
+    parts = text.str.split(",").explode()
+    parts = parts.str.strip().str.strip("'").str.strip('"').str.strip()
+    keep = (parts != "").to_numpy()
+    return positions[parts.index.to_numpy()[keep]], parts.to_numpy(dtype=object)[keep]
+
+
+def parse_list_column(values):
+    # a real list per row, like values.apply(clean_list_column)
+    movie_idx, names = list_column_pairs(values)
+    names = names.to_pylist() if pa is not None else names.tolist()
+    lists = [[] for _ in range(len(values))]
+    for pos, name in zip(movie_idx.tolist(), names):
+        lists[pos].append(name)
+    return pd.Series(lists, index=values.index, dtype=object)
+
+
+def join_list_column(values, sep=", "):
+    # like values.apply(clean_list_column).apply(sep.join): "" for empty lists
+    movie_idx, names = list_column_pairs(values)
+    counts = np.bincount(movie_idx, minlength=len(values))
+    if pa is not None:
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        lists = pa.LargeListArray.from_arrays(pa.array(offsets), names)
+        joined = pc.binary_join(lists, pa.scalar(sep, pa.large_string())).to_numpy(zero_copy_only=False)
+    else:
+        joined = np.full(len(values), "", dtype=object)
+        if len(names):
+            first = np.concatenate([[True], movie_idx[1:] != movie_idx[:-1]])
+            pieces = np.where(first, names, sep + names)
+            joined[movie_idx[first]] = np.add.reduceat(pieces, np.flatnonzero(first))
+    return pd.Series(joined.tolist(), index=values.index)
+
+
+def encode_categorical(df):
+    # Clean both columns: vectorized equivalent of
+    # df[col].apply(clean_list_column).apply(lambda x: ", ".join(x))
+    df['stars'] = join_list_column(df['stars'])
+    df['director'] = join_list_column(df['director'])
+
+    # empty lists become missing values, as they would after a CSV round trip
+    df[['stars', 'director']] = df[['stars', 'director']].replace("", None)
+    return df
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    profiling.add_arguments(ap)
+    profiling.configure(ap.parse_args())
+
+    # Load CSV
+    with profiling.stage("read") as st:
+        df = read_artifact("movies-cleaned.csv")
+        st.rows_out = len(df)
+
+    with profiling.stage("encode", len(df)) as st:
+        df = encode_categorical(df)
+        st.rows_out = len(df)
+
+    # Save cleaned file
+    with profiling.stage("write", len(df)):
+        write_artifact(df, "movies_category_cleaned.csv")
+
+    print("Stars and director columns cleaned and saved as movies_category_cleaned.csv.")
 
-# Save cleaned file
-df.to_csv("movies_category_cleaned.csv", index=False)
 
-print("Stars and director columns cleaned and saved as movies_category_cleaned.csv.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Parquet copies of the pipeline's CSV artifacts.
+
+Every stage CSV (movies-normalized.csv ... movies_category_cleaned.csv) is
+also written as <name>.parquet with explicit column types: runtime, rating
+and votes as float64, genre and director dictionary-encoded, every other
+text column as a string. read_artifact() uses the Parquet file when it is at
+least as new as the CSV, reads only the requested columns, and falls back to
+the CSV otherwise (or when pyarrow is not installed).
+
+Stored values match a CSV round trip: empty strings, and the strings
+read_csv turns into NaN ("NA", "null", ...), are written as nulls.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: without pyarrow only the CSV files are written
+    pa = None
+
+NUMERIC_COLUMNS = ["runtime", "rating", "votes"]
+DICTIONARY_COLUMNS = ["genre", "director"]
+
+# read_csv's default na_values
+CSV_NA_STRINGS = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+                  "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+
+
+def parquet_path(csv_path):
+    return Path(csv_path).with_suffix(".parquet")
+
+
+# columns that are always text, whatever the first chunk looks like
+TEXT_COLUMNS = ["movie", "certificate", "stars", "description"]
+
+
+def column_type(series):
+    # the Parquet schema is fixed by the first chunk, so a column that happens to be
+    # all-NaN there (e.g. a sparse certificate) must not be typed float64
+    if series.name in DICTIONARY_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    if series.name in NUMERIC_COLUMNS:
+        return pa.float64() if pd.api.types.is_numeric_dtype(series.dtype) else pa.string()
+    if series.name in TEXT_COLUMNS or series.isna().all():
+        return pa.string()
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return pa.int64()
+    if pd.api.types.is_float_dtype(series.dtype):
+        return pa.float64()
+    return pa.string()
+
+
+def arrow_schema(df):
+    return pa.schema([pa.field(col, column_type(df[col])) for col in df.columns])
+
+
+def to_arrow(df, schema):
+    arrays = []
+    for field in schema:
+        col = df[field.name]
+        if pa.types.is_dictionary(field.type) or pa.types.is_string(field.type):
+            values = col.astype(object)
+            values = values.where(~(col.isna() | values.isin(CSV_NA_STRINGS)), None).to_numpy()
+            try:
+                array = pa.array(values, type=pa.string(), from_pandas=True)
+            except (pa.ArrowTypeError, pa.ArrowInvalid):
+                # mixed object column: store the text the CSV would have had
+                array = pa.array([v if v is None else str(v) for v in values], type=pa.string())
+            if pa.types.is_dictionary(field.type):
+                array = array.dictionary_encode()
+        else:
+            array = pa.array(col, type=field.type, from_pandas=True)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class ArtifactWriter:
+    """Writes a stage artifact as CSV (as before) plus Parquet, chunk by chunk."""
+
+    def __init__(self, csv_path, parquet=True, profile=None):
+        self.csv_path = Path(csv_path)
+        self.parquet = parquet and pa is not None
+        self.profile = profile  # e.g. a data_profile.DataProfile, updated with every chunk
+        self.first_chunk = True
+        self.writer = None
+        self.schema = None
+
+    def write(self, df):
+        df.to_csv(self.csv_path, mode="w" if self.first_chunk else "a",
+                  header=self.first_chunk, index=False)
+        self.first_chunk = False
+        if self.profile is not None:
+            self.profile.update(df)
+        if self.parquet:
+            if self.writer is None:
+                self.schema = arrow_schema(df)
+                self.writer = pq.ParquetWriter(parquet_path(self.csv_path), self.schema,
+                                               compression="zstd")
+            self.writer.write_table(to_arrow(df, self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def write_artifact(df, csv_path, parquet=True, profile=None):
+    writer = ArtifactWriter(csv_path, parquet, profile)
+    try:
+        writer.write(df)
+    finally:
+        writer.close()
+
+
+def fresh_parquet(csv_path):
+    # the Parquet copy, if pyarrow can read it and it is not older than the CSV
+    pq_file = parquet_path(csv_path)
+    if pa is None or not pq_file.exists():
+        return None
+    csv_file = Path(csv_path)
+    if csv_file.exists() and csv_file.stat().st_mtime > pq_file.stat().st_mtime:
+        return None
+    return pq_file
+
+
+def plain_strings(df):
+    # dictionary-encoded columns come back as categoricals; turn them into plain strings
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+
+def read_artifact(csv_path, columns=None, keep_categories=False, **csv_kwargs):
+    """Read a stage artifact, from Parquet when there is a fresh copy.
+
+    columns limits the read to those columns (in file order, like usecols).
+    genre/director come back as plain strings unless keep_categories is set.
+    csv_kwargs are only used for the CSV fallback.
+    """
+    pq_file = fresh_parquet(csv_path)
+    if pq_file is None:
+        return pd.read_csv(csv_path, usecols=columns, **csv_kwargs)
+
+    if columns is not None:
+        names = pq.read_schema(pq_file).names
+        columns = [col for col in names if col in set(columns)]
+    df = pd.read_parquet(pq_file, columns=columns)
+    return df if keep_categories else plain_strings(df)
+
+
+def iter_artifact(csv_path, chunksize):
+    """read_artifact() in chunks of up to chunksize rows."""
+    pq_file = fresh_parquet(csv_path)
+    if pq_file is None:
+        yield from pd.read_csv(csv_path, chunksize=chunksize)
+        return
+    for batch in pq.ParquetFile(pq_file).iter_batches(batch_size=chunksize):
+        yield plain_strings(batch.to_pandas())
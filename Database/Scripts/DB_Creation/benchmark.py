@@ -0,0 +1,281 @@
+"""
+Benchmark of the DB_Creation stages on synthetic data.
+
+For each --rows size a synthetic movies.csv is generated (synthetic_movies.py)
+and the stages run one after another on the files, like the standalone
+scripts do:
+
+    normalize -> column_drop -> clean (data_cleaning.clean_data) -> encode
+    -> load (movies.db) -> genre_averages (compute_genre_averages_from_df)
+
+Every stage runs in its own child process, so its peak RSS is its own. The
+wall/CPU time only covers the stage itself, not the interpreter start-up and
+imports. The result is a JSON report (rows/sec and peak RSS per stage, plus
+the git commit) that can be compared with one from another commit via
+--compare.
+
+Usage (from Database/Scripts/DB_Creation):
+    python benchmark.py --rows 10K 1M --out bench.json
+    python benchmark.py --rows 10K 1M --out new.json --compare bench.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+STAGES = ["normalize", "column_drop", "clean", "encode", "load", "genre_averages"]
+
+
+#############################################
+# Stages (run inside the child process)
+#############################################
+
+def artifact_rows(csv_path):
+    from artifacts import fresh_parquet, read_artifact
+    pq_file = fresh_parquet(csv_path)
+    if pq_file is not None:
+        import pyarrow.parquet as pq
+        return pq.read_metadata(pq_file).num_rows
+    return len(read_artifact(csv_path))
+
+
+def stage_normalize(args):
+    import pandas as pd
+    from Normalize import normalize
+    from artifacts import write_artifact
+
+    def run():
+        df = pd.read_csv("movies.csv")
+        rows_in = len(df)
+        df = normalize(df)
+        write_artifact(df, "movies-normalized.csv")
+        return rows_in, len(df)
+    return run
+
+
+def stage_column_drop(args):
+    from Column_Drop import drop_sparse_columns
+    from artifacts import read_artifact, write_artifact
+
+    def run():
+        df = read_artifact("movies-normalized.csv")
+        rows_in = len(df)
+        df, _ = drop_sparse_columns(df)
+        write_artifact(df, "movies-column-dropped.csv")
+        return rows_in, len(df)
+    return run
+
+
+def stage_clean(args):
+    from data_cleaning import clean_data
+
+    def run():
+        clean_data("movies-column-dropped.csv")
+        return None, None
+    return run
+
+
+def stage_encode(args):
+    from Encode_Categorical import encode_categorical
+    from artifacts import read_artifact, write_artifact
+
+    def run():
+        df = read_artifact("movies-cleaned.csv")
+        df = encode_categorical(df)
+        write_artifact(df, "movies_category_cleaned.csv")
+        return len(df), len(df)
+    return run
+
+
+def stage_load(args):
+    from artifacts import read_artifact
+    from db_loader import bulk_load_movies, load_movies
+
+    loader = bulk_load_movies if args.bulk else load_movies
+    df = read_artifact("movies_category_cleaned.csv")
+
+    def run():
+        rows = loader(df, "movies.db")
+        return len(df), rows
+    return run
+
+
+def stage_genre_averages(args):
+    import sqlite3
+    import pandas as pd
+    from Genre_Avg_Rating_DB import compute_genre_averages_from_df
+
+    with sqlite3.connect("movies.db") as conn:
+        df = pd.read_sql_query("SELECT genre, rating FROM movies", conn)
+
+    def run():
+        agg = compute_genre_averages_from_df(df, "genre", "rating")
+        return len(df), len(agg)
+    return run
+
+
+# rows of the stages whose function doesn't report them
+STAGE_FILES = {"clean": ("movies-column-dropped.csv", "movies-cleaned.csv")}
+
+
+def run_stage(name, args):
+    """Child process: set up the stage, time it, print one JSON line."""
+    from profiling import megabytes, peak_rss  # resource is Unix-only; peak_rss falls back
+
+    run = globals()[f"stage_{name}"](args)  # reads the inputs, outside the timing
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        rows_in, rows_out = run()
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+    if name in STAGE_FILES:
+        rows_in, rows_out = (artifact_rows(path) for path in STAGE_FILES[name])
+
+    print(json.dumps({
+        "stage": name,
+        "seconds": round(wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "rows_per_sec": round(rows_in / max(wall, 1e-9), 1),
+        "peak_rss_mb": megabytes(peak_rss()),  # None where it can't be measured
+    }))
+
+
+#############################################
+# Harness
+#############################################
+
+def child_env():
+    # the stage modules import their siblings, genre_averages the Scripts folder
+    env = dict(os.environ, MPLBACKEND="Agg")
+    paths = [str(HERE), str(HERE.parent), env.get("PYTHONPATH", "")]
+    env["PYTHONPATH"] = os.pathsep.join(p for p in paths if p)
+    return env
+
+
+def benchmark_size(rows, workdir, args):
+    from synthetic_movies import write_movies_csv
+
+    workdir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    write_movies_csv(workdir / "movies.csv", rows, args.seed)
+    generate_seconds = time.perf_counter() - start
+    result = {
+        "rows": rows,
+        "csv_mb": round((workdir / "movies.csv").stat().st_size / 1024 ** 2, 1),
+        "generate_seconds": round(generate_seconds, 3),
+        "stages": [],
+    }
+
+    # earlier stages still run when they produce a selected stage's input
+    last = max(STAGES.index(name) for name in args.stages)
+    for name in STAGES[:last + 1]:
+        cmd = [sys.executable, str(Path(__file__).resolve()), "--run-stage", name]
+        if args.bulk:
+            cmd.append("--bulk")
+        proc = subprocess.run(cmd, cwd=workdir, env=child_env(), capture_output=True, text=True)
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            raise SystemExit(f"stage {name} failed at {rows} rows")
+        stage = json.loads(proc.stdout.strip().splitlines()[-1])
+        if name not in args.stages:
+            continue
+        result["stages"].append(stage)
+        print(f"{rows:>11,} rows  {name:<15}{stage['seconds']:>9.2f}s"
+              f"{stage['rows_per_sec']:>14,.0f} rows/s{rss(stage['peak_rss_mb'], 10)} MB", flush=True)
+
+    result["total_seconds"] = round(sum(s["seconds"] for s in result["stages"]), 4)
+    return result
+
+
+def rss(value, width=0, decimals=1):
+    # peak_rss_mb is None where the platform can't measure it
+    return f"{value:>{width}.{decimals}f}" if value is not None else f"{'n/a':>{width}}"
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import numpy as np
+    import pandas as pd
+    return {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(report, baseline):
+    # stage time ratios against a report from another commit (> 1 = faster now)
+    old = {(run["rows"], s["stage"]): s for run in baseline["runs"] for s in run["stages"]}
+    print(f"\nvs {baseline['environment'].get('commit')}:")
+    for run in report["runs"]:
+        for stage in run["stages"]:
+            before = old.get((run["rows"], stage["stage"]))
+            if before is None:
+                continue
+            speedup = before["seconds"] / max(stage["seconds"], 1e-9)
+            print(f"{run['rows']:>11,} rows  {stage['stage']:<15}{before['seconds']:>9.2f}s ->"
+                  f"{stage['seconds']:>9.2f}s  x{speedup:.2f}  "
+                  f"RSS {rss(before['peak_rss_mb'], decimals=0)} -> {rss(stage['peak_rss_mb'], decimals=0)} MB")
+
+
+def main():
+    from synthetic_movies import parse_rows
+
+    ap = argparse.ArgumentParser(description="Time the pipeline stages on synthetic movies.csv files.")
+    ap.add_argument("--rows", nargs="+", default=["10K"], help="dataset sizes, e.g. 10K 1M 10M")
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES,
+                    help="stages to report (the ones before them still run to produce their input)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--bulk", action="store_true", help="load with bulk_load_movies")
+    ap.add_argument("--workdir", default=None, help="keep the generated files here (default: a temp dir)")
+    ap.add_argument("--out", default="benchmark.json", help="JSON report")
+    ap.add_argument("--compare", default=None, metavar="REPORT", help="earlier report to compare against")
+    ap.add_argument("--run-stage", choices=STAGES, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.run_stage:
+        run_stage(args.run_stage, args)
+        return
+
+    report = {"environment": environment(), "bulk": args.bulk, "seed": args.seed, "runs": []}
+    with tempfile.TemporaryDirectory(prefix="movies-bench-") as tmp:
+        root = Path(args.workdir or tmp)
+        for size in args.rows:
+            rows = parse_rows(size)
+            report["runs"].append(benchmark_size(rows, root / f"rows_{rows}", args))
+
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print("Saved:", args.out)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            compare(report, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,18 +9,41 @@
 # the second boxplot shows the numeric columns after dropping sparse rows and mean imputation
 # AKA the state of the data after cleaning
 
-import pandas as pd
+# both plots come from the data profile (data_profile.py): the null patterns give the
+# row-missingness histogram, the kept rows, the means and the value histograms,
+# so the data itself is not loaded here (a column with too many distinct values
+# for the profile's histogram gets one chunked scan instead)
+
+import argparse
+
+import headless
+import profiling
+from data_profile import boxplot_stats, cleaned_histograms, ensure_profile
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--input", default="movies-column-dropped.csv")
+headless.add_arguments(ap)
+profiling.add_arguments(ap)
+args = ap.parse_args()
+headless.configure(args)
+profiling.configure(args)
+
+# after the arguments, so --help doesn't load matplotlib
+headless.select_backend()
 import matplotlib.pyplot as plt
 
-# load data
-df = pd.read_csv("movies-column-dropped.csv")   # change path if needed
+# load the profile (one chunked scan of the input if it has none yet)
+with profiling.stage("profile") as st:
+    profile = ensure_profile(args.input)   # change path if needed
+    st.rows_out = profile.rows
 
-# calculate missingness per row (fraction of columns that are NaN)
-row_missing_ratio = df.isna().mean(axis=1)   # example; 0.33 means 33% of that row is missing
+# missingness per row (fraction of columns that are NaN) -> number of rows
+row_missing_ratio = profile.row_missing_histogram()
+row_missing_ratio.index = row_missing_ratio.index / len(profile.columns)   # example; 0.33 means 33% of that row is missing
 
 # boxplot of row-level missingness
 plt.figure(figsize=(5, 5))
-plt.boxplot(row_missing_ratio, vert=True)
+plt.gca().bxp([boxplot_stats(row_missing_ratio)])
 plt.title("Row-level missingness (before cleaning)")
 plt.xlabel("rows")
 plt.ylabel("fraction of missing values per row")
@@ -30,31 +53,33 @@ plt.ylabel("fraction of missing values per row")
 plt.axhline(0.5, color="red", linestyle="--", label="drop if > 0.5 missing")
 plt.legend()
 plt.tight_layout()
-plt.show()
+with profiling.stage("render"):
+    headless.show("row_missingness_boxplot.png")
 
 # drop rows with >= 50% missing
-to_drop = row_missing_ratio >= 0.5
-print("Original total rows:", len(df))
-print("Rows to drop (>50% missing):", to_drop.sum())
-print("Rows kept:", len(df) - to_drop.sum())
-
-df_clean = df.loc[~to_drop].copy()
-
-# fill missing numeric columns with the column mean
-numeric_cols = df_clean.select_dtypes(include=["number"]).columns
-for col in numeric_cols:
-    mean_val = df_clean[col].mean()
-    df_clean[col] = df_clean[col].fillna(mean_val)
+rows_kept = profile.kept_rows(0.5)
+print("Original total rows:", profile.rows)
+print("Rows to drop (>50% missing):", profile.rows - rows_kept)
+print("Rows kept:", rows_kept)
 
-# round numeric columns to 2 decimals
-df_clean[numeric_cols] = df_clean[numeric_cols].round(2)
+# fill missing numeric columns with the column mean (of the kept rows), rounded to 2 decimals
+numeric_cols = profile.numeric
+fill_values = profile.fill_values(numeric_cols)
+histograms = {col: profile.cleaned_histogram(col, fill_values[col]) for col in numeric_cols}
+wide = [col for col, histogram in histograms.items() if histogram is None]
+if wide:
+    with profiling.stage("scan_histograms") as st:
+        histograms.update(cleaned_histograms(args.input, wide, fill_values))
+        st.rows_in = profile.rows
+stats = [boxplot_stats(histograms[col], label=col) for col in numeric_cols]
 
 # boxplot of numeric data AFTER cleaning
 plt.figure(figsize=(8, 5))
-df_clean[numeric_cols].boxplot()
+plt.gca().bxp(stats)
+plt.grid(True)
 plt.title("Numeric columns after dropping sparse rows + mean imputation")
 plt.tight_layout()
-plt.show()
+with profiling.stage("render"):
+    headless.show("numeric_after_cleaning_boxplot.png")
 
-# df_clean.to_csv("movies-cleaned-boxplot.csv", index=False)
-# commented out as it's similar to movies-cleaned.csv
\ No newline at end of file
+# the cleaned rows themselves are written by data_cleaning.py (movies-cleaned.csv)
@@ -7,12 +7,59 @@ Subtasks:
 > Dealing with Missing values
 """
 
+import argparse
+
 import numpy as np
 import pandas as pd
 
-def clean_data(file):
-    # Load the original file
-    df = pd.read_csv(file)
+import profiling
+from artifacts import ArtifactWriter, iter_artifact, read_artifact, write_artifact
+from data_profile import load_profile
+from imputation import STRATEGIES, Imputer
+
+# Numeric columns that get imputed (mean by default, see imputation.py)
+impute_columns = ['runtime', 'rating', 'votes']
+
+# full: the per-row Series and the frame (as before), summary: counts only, quiet: nothing
+LOG_MODES = ['summary', 'full', 'quiet']
+
+
+def clean_data(file, strategy='mean', log='summary', chunksize=0):
+    if chunksize > 0:
+        clean_chunked(file, 'movies-cleaned.csv', chunksize, strategy, log)
+    else:
+        # Load the original file
+        with profiling.stage("read") as st:
+            df = read_artifact(file)
+            st.rows_out = len(df)
+
+        # the saved data profile (if current) already has the column means
+        df = clean_frame(df, load_profile(file), strategy, log)
+
+        # Save processed data to csv file
+        with profiling.stage("write", len(df)):
+            write_artifact(df, 'movies-cleaned.csv')
+    print("Cleaned dataset saved to 'movies-cleaned.csv'.")
+
+
+def print_summary(missing_per_row, rows_in, rows_out, imputer):
+    # missing_per_row: number of missing columns -> rows
+    print("\nRows by number of missing values:")
+    print(missing_per_row.sort_index().to_string())
+    print(f"\nDropped {rows_in - rows_out} of {rows_in} rows with >50% missing values ({rows_out} kept)")
+    print("Filled missing values in 'runtime', 'rating' and 'votes' with", imputer.describe())
+
+
+def fit_imputer(strategy, profile=None, chunks=()):
+    imputer = Imputer(impute_columns, strategy)
+    if strategy == 'mean' and profile is not None:
+        return imputer.fit_profile(profile)
+    return imputer.fit(chunks)
+
+
+def clean_frame(df, profile=None, strategy='mean', log='summary'):
+    # profile: the data profile of df (data_profile.py), which has the column means
+    rows_in = len(df)
 
     # Number of columns
     num_columns = df.shape[1]
@@ -23,18 +70,23 @@ def clean_data(file):
     # If more than 50% missing values per row - drop this row.
     # Calculate missing values(columns) per row
     missing_values_rows = df.isnull().sum(axis=1)
-    print('\nCount missing values per row')
-    print(missing_values_rows)
+    if log == 'full':
+        print('\nCount missing values per row')
+        print(missing_values_rows)
 
     # Calculate percentage of missing values per row
     missing_values_rows_percent = (missing_values_rows / num_columns) * 100
-    print("\nPercentage of missing values per row:")
-    print(missing_values_rows_percent.round(2))
+    if log == 'full':
+        print("\nPercentage of missing values per row:")
+        print(missing_values_rows_percent.round(2))
 
     # Drop rows with >50% missing values
-    df = df[missing_values_rows_percent < 50]
-    print("\nDrop rows with >50% missing values")
-    print(df)
+    with profiling.stage("drop_sparse_rows", len(df)) as st:
+        df = df[missing_values_rows_percent < 50]
+        st.rows_out = len(df)
+    if log == 'full':
+        print("\nDrop rows with >50% missing values")
+        print(df)
 
     ########################################################
     # Dealing with missing values
@@ -43,17 +95,59 @@ def clean_data(file):
     Missing Value Imputation:
     Replaced missing values in numeric columns with column-wise mean to preserve row count
     and enable complete visualizations in the next epic. 
+    (--impute median / genre_mean use the other strategies of imputation.py)
+    """
+    with profiling.stage("impute", len(df)) as st:
+        imputer = fit_imputer(strategy, profile, [df])
+        df = imputer.transform(df)
+        st.rows_out = len(df)
+    if log == 'full':
+        if strategy == 'mean':
+            print("Filled missing values in 'runtime', 'rating' and 'votes' with average values.")
+        else:
+            print("Filled missing values in 'runtime', 'rating' and 'votes' with", imputer.describe())
+    elif log == 'summary':
+        print_summary(missing_values_rows.value_counts(), rows_in, len(df), imputer)
+
+    return df
+
+
+def clean_chunked(file, dst, chunksize, strategy='mean', log='summary'):
+    """clean_frame() in two streaming passes over chunks of the input.
+
+    Pass 1 fits the imputer on the rows that survive the row drop (skipped for
+    the mean when the input has a current data profile), pass 2 drops, fills
+    and writes each chunk. Memory is bounded by the chunk size.
     """
-    df['runtime'] = df['runtime'].fillna(df['runtime'].mean().round(2))
-    df['rating'] = df['rating'].fillna(df['rating'].mean().round(2))
-    df['votes'] = df['votes'].fillna(df['votes'].mean().round(2))
-    print("Filled missing values in 'runtime', 'rating' and 'votes' with average values.")
+    profile = load_profile(file) if strategy == 'mean' else None
+    with profiling.stage("impute_fit") as st:
+        chunks = () if profile is not None else (drop_sparse_rows(chunk) for chunk in iter_artifact(file, chunksize))
+        imputer = fit_imputer(strategy, profile, chunks)
 
+    rows_in = rows_out = 0
+    missing_per_row = pd.Series(dtype=np.int64)
+    writer = ArtifactWriter(dst)
+    try:
+        with profiling.stage("clean") as st:
+            for chunk in iter_artifact(file, chunksize):
+                rows_in += len(chunk)
+                if log != 'quiet':
+                    missing_per_row = missing_per_row.add(chunk.isnull().sum(axis=1).value_counts(), fill_value=0)
+                chunk = imputer.transform(drop_sparse_rows(chunk))
+                writer.write(chunk)
+                rows_out += len(chunk)
+            st.rows_in, st.rows_out = rows_in, rows_out
+    finally:
+        writer.close()
+    if log != 'quiet':
+        print_summary(missing_per_row.astype(np.int64), rows_in, rows_out, imputer)
+    return rows_out
 
 
-    # Save processed data to csv file
-    df.to_csv('movies-cleaned.csv', index=False)
-    print("Cleaned dataset saved to 'movies-cleaned.csv'.")
+def drop_sparse_rows(df):
+    # Same >50% rule as clean_frame, without the printouts (used per chunk)
+    missing_values_rows_percent = (df.isnull().sum(axis=1) / df.shape[1]) * 100
+    return df[missing_values_rows_percent < 50]
 
 
 
@@ -73,8 +167,18 @@ def clean_data(file):
 
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--impute", choices=STRATEGIES, default="mean", help="imputation strategy (default: mean)")
+    ap.add_argument("--log", choices=LOG_MODES, default="summary",
+                    help="summary: counts only (default), full: also the per-row Series and the frame")
+    ap.add_argument("--chunksize", type=int, default=0,
+                    help="two-pass streaming mode with this many rows per chunk (0 = load the whole file)")
+    profiling.add_arguments(ap)
+    args = ap.parse_args()
+    profiling.configure(args)
+
     dataset = "movies-column-dropped.csv"
-    clean_data(dataset)
+    clean_data(dataset, args.impute, args.log, args.chunksize)
 
 
 
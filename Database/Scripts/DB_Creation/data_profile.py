@@ -0,0 +1,466 @@
+"""
+Single-pass data profile of a stage artifact.
+
+One chunked scan (or the chunks as they are written, see ArtifactWriter)
+collects everything Column_Drop, data_cleaning and boxplot_rows_drop used to
+recompute from the full frame:
+- rows, and null counts per column
+- min / max / mean of the numeric columns
+- HyperLogLog distinct counts per column (about 1.6% error)
+- the row-missingness histogram (rows per number of missing columns)
+
+The histogram is kept as a table of null patterns: for every distinct set of
+missing columns, the number of rows, and per numeric column the sum, count
+and value histogram of those rows. There are few patterns (at most 2**columns,
+about a hundred for movies.csv), and they are enough to answer the later
+stages exactly without reading the data again:
+- select(columns) gives the profile after a column drop
+- fill_values() gives the column means over the rows that survive the row drop
+- boxplot_stats() gives the QA boxplots, before and after cleaning
+
+A numeric column with more than MAX_HISTOGRAM_VALUES distinct values keeps
+only its sums and counts; cleaned_histograms() then recomputes its cleaned
+value histogram exactly with one more chunked scan.
+
+The profile is saved as <name>.profile.json next to the CSV and is only
+used while the CSV is unchanged (size and mtime are recorded).
+
+Usage:
+    python data_profile.py movies-normalized.csv
+    python data_profile.py movies-column-dropped.csv --rebuild --chunksize 100000
+"""
+
+import argparse
+import base64
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from artifacts import CSV_NA_STRINGS, iter_artifact
+
+PROFILE_VERSION = 1
+HLL_PRECISION = 12              # 4096 registers per column
+MAX_HISTOGRAM_VALUES = 10_000   # per column; wider numeric columns keep only sum/count
+CHUNKSIZE = 100_000
+
+
+def profile_path(csv_path):
+    return Path(csv_path).with_suffix(".profile.json")
+
+
+def bit_length(values):
+    # vectorized int.bit_length() for uint64 arrays
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = values >= np.uint64(1 << shift)
+        length[big] += shift
+        values[big] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit hashes (registers merge with max)."""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add_hashes(self, hashes):
+        if not len(hashes):
+            return
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        rank = (bits - bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small sets
+        return int(round(estimate))
+
+    def to_text(self):
+        return base64.b64encode(self.registers.tobytes()).decode("ascii")
+
+    @classmethod
+    def from_text(cls, text):
+        registers = np.frombuffer(base64.b64decode(text), dtype=np.uint8).copy()
+        return cls(int(math.log2(len(registers))), registers)
+
+
+def null_mask(df):
+    # what read_csv will see as NaN once the frame is written out
+    mask = df.isna()
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col].dtype):
+            mask[col] |= df[col].isin(CSV_NA_STRINGS)
+    return mask
+
+
+def new_pattern():
+    return {"rows": 0, "sums": {}, "counts": {}, "values": {}}
+
+
+def weighted_percentile(values, counts, share):
+    # np.percentile (linear) of the data where values[i] occurs counts[i] times
+    ends = np.cumsum(counts)
+    position = (ends[-1] - 1) * share
+    below = math.floor(position)
+    low = values[np.searchsorted(ends, below, side="right")]
+    high = values[np.searchsorted(ends, min(below + 1, ends[-1] - 1), side="right")]
+    return low + (high - low) * (position - below)
+
+
+def boxplot_stats(histogram, label=None, whis=1.5):
+    """matplotlib's boxplot_stats() from a value -> count Series, for Axes.bxp()."""
+    histogram = histogram[histogram > 0].sort_index()
+    values, counts = histogram.index.to_numpy(dtype=float), histogram.to_numpy()
+    q1, med, q3 = (weighted_percentile(values, counts, share) for share in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    inside_hi = values[values <= q3 + whis * iqr]
+    inside_lo = values[values >= q1 - whis * iqr]
+    whishi = q3 if not len(inside_hi) or inside_hi.max() < q3 else inside_hi.max()
+    whislo = q1 if not len(inside_lo) or inside_lo.min() > q1 else inside_lo.min()
+    stats = {"med": med, "q1": q1, "q3": q3, "whislo": whislo, "whishi": whishi,
+             "mean": float(np.average(values, weights=counts)),
+             # one marker per distinct outlier value (repeats would be drawn on top of each other)
+             "fliers": values[(values < whislo) | (values > whishi)]}
+    if label is not None:
+        stats["label"] = label
+    return stats
+
+
+class DataProfile:
+    """Null / numeric / distinct-count profile, built with update() chunk by chunk."""
+
+    def __init__(self, distinct=True, histograms=True):
+        self.distinct = distinct
+        self.histograms = histograms
+        self.rows = 0
+        self.columns = None
+        self.numeric = []
+        self.nulls = {}
+        self.min = {}
+        self.max = {}
+        self.hll = {}
+        self.histogram_columns = []
+        self.patterns = {}  # tuple of missing columns -> new_pattern()
+
+    def start(self, df):
+        self.columns = list(df.columns)
+        self.numeric = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col].dtype)
+                        and not pd.api.types.is_bool_dtype(df[col].dtype)]
+        self.nulls = {col: 0 for col in self.columns}
+        self.min = {col: math.nan for col in self.numeric}
+        self.max = {col: math.nan for col in self.numeric}
+        self.hll = {col: HyperLogLog() for col in self.columns} if self.distinct else {}
+        self.histogram_columns = list(self.numeric) if self.histograms else []
+
+    def update(self, df):
+        if self.columns is None:
+            self.start(df)
+        df = df[self.columns]
+        self.rows += len(df)
+        if not len(df):
+            return self
+
+        missing = null_mask(df)
+        for col, count in missing.sum().items():
+            self.nulls[col] += int(count)
+
+        # null patterns of this chunk (unique rows of the null mask)
+        bits = missing.to_numpy()
+        if bits.shape[1] < 63:
+            # one integer per row, hashed instead of sorting the rows of the mask
+            weights = np.left_shift(1, np.arange(bits.shape[1], dtype=np.int64))
+            inverse, codes = pd.factorize(bits.astype(np.int64) @ weights)
+            shapes = (codes[:, None] & weights) > 0
+        else:
+            shapes, inverse = np.unique(bits, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        keys = [tuple(col for col, isnull in zip(self.columns, shape) if isnull) for shape in shapes]
+        for key, rows in zip(keys, np.bincount(inverse, minlength=len(keys))):
+            self.patterns.setdefault(key, new_pattern())["rows"] += int(rows)
+
+        for col in self.numeric:
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            ok = ~missing[col].to_numpy() & ~np.isnan(values)
+            values, where = values[ok], inverse[ok]
+            if not len(values):
+                continue
+            self.min[col] = np.fmin(self.min[col], values.min())
+            self.max[col] = np.fmax(self.max[col], values.max())
+            sums = np.bincount(where, weights=values, minlength=len(keys))
+            counts = np.bincount(where, minlength=len(keys))
+            for key, total, count in zip(keys, sums, counts):
+                if count:
+                    pattern = self.patterns[key]
+                    pattern["sums"][col] = pattern["sums"].get(col, 0.0) + float(total)
+                    pattern["counts"][col] = pattern["counts"].get(col, 0) + int(count)
+            if col in self.histogram_columns:
+                self.add_to_histogram(col, keys, where, values)
+
+        for col, sketch in self.hll.items():
+            present = df[col][~missing[col].to_numpy()]
+            if col in self.numeric:
+                present = pd.to_numeric(present, errors="coerce").astype(float)
+            else:
+                present = present.astype(str).astype(object)
+            sketch.add_hashes(pd.util.hash_array(present.to_numpy()))
+        return self
+
+    def add_to_histogram(self, col, keys, where, values):
+        local = pd.DataFrame({"pattern": where, "value": values}).value_counts(sort=False)
+        held = sum(len(pattern["values"].get(col, ())) for pattern in self.patterns.values())
+        if held + len(local) > MAX_HISTOGRAM_VALUES:
+            # too many distinct values: keep sums/counts only for this column
+            self.histogram_columns.remove(col)
+            for pattern in self.patterns.values():
+                pattern["values"].pop(col, None)
+            return
+        for (index, value), count in local.items():
+            histogram = self.patterns[keys[index]]["values"].setdefault(col, {})
+            histogram[value] = histogram.get(value, 0) + int(count)
+
+    #############################################
+    # Questions the later stages ask
+    #############################################
+
+    def columns_to_drop(self, max_missing=0.5):
+        # same rule as Column_Drop.drop_sparse_columns
+        threshold = self.rows * max_missing
+        return [col for col in self.columns if self.nulls[col] > self.rows - threshold]
+
+    def select(self, columns):
+        """The profile of df[columns]: patterns merge once the other columns are gone."""
+        columns = list(columns)
+        keep = set(columns)
+        out = DataProfile(self.distinct, self.histograms)
+        out.rows = self.rows
+        out.columns = columns
+        out.numeric = [col for col in self.numeric if col in keep]
+        out.nulls = {col: self.nulls[col] for col in columns}
+        out.min = {col: self.min[col] for col in out.numeric}
+        out.max = {col: self.max[col] for col in out.numeric}
+        out.hll = {col: self.hll[col] for col in columns if col in self.hll}
+        out.histogram_columns = [col for col in self.histogram_columns if col in keep]
+        for key, pattern in self.patterns.items():
+            merged = out.patterns.setdefault(tuple(col for col in key if col in keep), new_pattern())
+            merged["rows"] += pattern["rows"]
+            for col in out.numeric:
+                if col in pattern["counts"]:
+                    merged["sums"][col] = merged["sums"].get(col, 0.0) + pattern["sums"][col]
+                    merged["counts"][col] = merged["counts"].get(col, 0) + pattern["counts"][col]
+                if col in pattern["values"]:
+                    histogram = merged["values"].setdefault(col, {})
+                    for value, count in pattern["values"][col].items():
+                        histogram[value] = histogram.get(value, 0) + count
+        return out
+
+    def row_missing_histogram(self):
+        # rows per number of missing columns
+        histogram = pd.Series(0, index=range(len(self.columns) + 1), name="rows")
+        for key, pattern in self.patterns.items():
+            histogram[len(key)] += pattern["rows"]
+        return histogram
+
+    def kept(self, key, max_row_missing):
+        # the row drop of data_cleaning / boxplot_rows_drop: keep rows under the threshold
+        return len(key) / len(self.columns) < max_row_missing
+
+    def kept_rows(self, max_row_missing=0.5):
+        return sum(p["rows"] for key, p in self.patterns.items() if self.kept(key, max_row_missing))
+
+    def kept_totals(self, columns, max_row_missing=0.5):
+        # (sums, counts) of the non-null values per column, over the rows the row drop keeps
+        sums = dict.fromkeys(columns, 0.0)
+        counts = dict.fromkeys(columns, 0)
+        for key, pattern in self.patterns.items():
+            if self.kept(key, max_row_missing):
+                for col in columns:
+                    sums[col] += pattern["sums"].get(col, 0.0)
+                    counts[col] += pattern["counts"].get(col, 0)
+        return sums, counts
+
+    def fill_values(self, columns, max_row_missing=0.5, decimals=2):
+        """Column means over the rows that survive the row drop, rounded like clean_frame."""
+        sums, counts = self.kept_totals(columns, max_row_missing)
+        return {col: np.round(sums[col] / counts[col] if counts[col] else np.nan, decimals)
+                for col in columns}
+
+    def cleaned_histogram(self, col, fill_value, max_row_missing=0.5, decimals=2):
+        """value -> rows of col after the row drop and the fill (rounded), None without a histogram."""
+        if col not in self.histogram_columns:
+            return None
+        totals = {}
+        filled = 0
+        for key, pattern in self.patterns.items():
+            if not self.kept(key, max_row_missing):
+                continue
+            for value, count in pattern["values"].get(col, {}).items():
+                totals[value] = totals.get(value, 0) + count
+            filled += pattern["rows"] - pattern["counts"].get(col, 0)
+        histogram = pd.Series(totals, dtype=np.int64)
+        if filled:
+            histogram = pd.concat([histogram, pd.Series({fill_value: filled})])
+        histogram.index = np.round(histogram.index.to_numpy(dtype=float), decimals)
+        return histogram.groupby(level=0).sum()
+
+    def column_stats(self):
+        totals = {col: [0.0, 0] for col in self.numeric}
+        for pattern in self.patterns.values():
+            for col in self.numeric:
+                totals[col][0] += pattern["sums"].get(col, 0.0)
+                totals[col][1] += pattern["counts"].get(col, 0)
+        stats = {}
+        for col in self.columns:
+            entry = {"nulls": self.nulls[col]}
+            if col in self.hll:
+                entry["distinct"] = self.hll[col].estimate()
+            if col in self.numeric:
+                total, count = totals[col]
+                entry.update(min=self.min[col], max=self.max[col], mean=total / count if count else math.nan)
+            stats[col] = entry
+        return stats
+
+    #############################################
+    # JSON artifact
+    #############################################
+
+    def to_dict(self):
+        number = lambda value: None if value is None or math.isnan(value) else float(value)
+        return {
+            "version": PROFILE_VERSION,
+            "rows": self.rows,
+            "columns": self.columns,
+            "numeric": self.numeric,
+            "column_stats": {col: {name: number(value) if name in ("min", "max", "mean") else value
+                                   for name, value in entry.items()}
+                             for col, entry in self.column_stats().items()},
+            "row_missing_histogram": {str(k): int(v) for k, v in self.row_missing_histogram().items()},
+            "histogram_columns": self.histogram_columns,
+            "patterns": [{"missing": list(key), "rows": p["rows"], "sums": p["sums"], "counts": p["counts"],
+                          "values": {col: [[value, count] for value, count in sorted(histogram.items())]
+                                     for col, histogram in p["values"].items()}}
+                         for key, p in self.patterns.items()],
+            "hll": {col: sketch.to_text() for col, sketch in self.hll.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profile = cls(distinct=bool(data["hll"]), histograms=bool(data["histogram_columns"]))
+        profile.rows = data["rows"]
+        profile.columns = data["columns"]
+        profile.numeric = data["numeric"]
+        stats = data["column_stats"]
+        profile.nulls = {col: stats[col]["nulls"] for col in profile.columns}
+        nan = lambda value: math.nan if value is None else value
+        profile.min = {col: nan(stats[col]["min"]) for col in profile.numeric}
+        profile.max = {col: nan(stats[col]["max"]) for col in profile.numeric}
+        profile.hll = {col: HyperLogLog.from_text(text) for col, text in data["hll"].items()}
+        profile.histogram_columns = data["histogram_columns"]
+        for entry in data["patterns"]:
+            profile.patterns[tuple(entry["missing"])] = {
+                "rows": entry["rows"], "sums": entry["sums"], "counts": entry["counts"],
+                "values": {col: {value: count for value, count in pairs}
+                           for col, pairs in entry["values"].items()}}
+        return profile
+
+
+def source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {"file": Path(csv_path).name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def save_profile(profile, csv_path):
+    # call after the CSV is complete: the profile is tied to its size and mtime
+    data = profile.to_dict()
+    data["source"] = source_stamp(csv_path)
+    with open(profile_path(csv_path), "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+
+
+def load_profile(csv_path):
+    """The saved profile of csv_path, or None when there is none or the CSV changed since."""
+    path = profile_path(csv_path)
+    if not path.exists() or not Path(csv_path).exists():
+        return None
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if data.get("version") != PROFILE_VERSION or data.get("source") != source_stamp(csv_path):
+        return None
+    return DataProfile.from_dict(data)
+
+
+def build_profile(csv_path, chunksize=CHUNKSIZE):
+    # the single chunked scan (Parquet copy when fresh, else the CSV)
+    profile = DataProfile()
+    for chunk in iter_artifact(csv_path, chunksize):
+        profile.update(chunk)
+    return profile
+
+
+def ensure_profile(csv_path, df=None, chunksize=CHUNKSIZE):
+    """Saved profile of csv_path, else one built from df (already in memory) or a chunked scan."""
+    profile = load_profile(csv_path)
+    if profile is None:
+        profile = DataProfile().update(df) if df is not None else build_profile(csv_path, chunksize)
+        save_profile(profile, csv_path)
+    return profile
+
+
+def cleaned_histograms(csv_path, columns, fill_values, max_row_missing=0.5, decimals=2,
+                       chunksize=CHUNKSIZE):
+    """DataProfile.cleaned_histogram() for columns the profile has no histogram of, from a chunked scan."""
+    totals = {col: pd.Series(dtype=np.int64) for col in columns}
+    for chunk in iter_artifact(csv_path, chunksize):
+        # the row drop, as DataProfile.kept() sees it
+        chunk = chunk[null_mask(chunk).sum(axis=1) / chunk.shape[1] < max_row_missing]
+        for col in columns:
+            values = pd.to_numeric(chunk[col], errors="coerce").fillna(fill_values[col])
+            counts = values.round(decimals).value_counts(sort=False)
+            totals[col] = totals[col].add(counts, fill_value=0)
+    return {col: histogram.astype(np.int64).sort_index() for col, histogram in totals.items()}
+
+
+def describe(profile):
+    stats = profile.column_stats()
+    table = pd.DataFrame(stats).T.reindex(columns=["nulls", "distinct", "min", "max", "mean"])
+    table[["nulls", "distinct"]] = table[["nulls", "distinct"]].astype("Int64")
+    lines = [f"{profile.rows:,} rows, {len(profile.columns)} columns, {len(profile.patterns)} null patterns",
+             table.to_string(float_format=lambda value: f"{value:.4g}"),
+             "",
+             "rows by number of missing columns:",
+             profile.row_missing_histogram().to_string()]
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Profile a stage artifact in one chunked scan.")
+    ap.add_argument("input", nargs="?", default="movies-normalized.csv")
+    ap.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    ap.add_argument("--rebuild", action="store_true", help="rescan even if the saved profile is current")
+    args = ap.parse_args()
+
+    profile = None if args.rebuild else load_profile(args.input)
+    if profile is None:
+        profile = build_profile(args.input, args.chunksize)
+        save_profile(profile, args.input)
+        print("Saved:", profile_path(args.input))
+    print(describe(profile))
+
+
+if __name__ == "__main__":
+    main()
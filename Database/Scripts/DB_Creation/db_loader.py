@@ -0,0 +1,524 @@
+# schema and load helpers shared by DB-Schema-after-cleaning.py and pipeline.py
+
+import hashlib
+import sqlite3
+
+import pandas as pd
+
+MOVIES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    movie TEXT NOT NULL,
+    genre TEXT,
+    runtime REAL,
+    rating REAL,
+    stars TEXT,
+    description TEXT,
+    votes REAL,
+    director TEXT
+)
+"""
+
+MOVIE_COLUMNS = ["movie", "genre", "runtime", "rating", "stars", "description", "votes", "director"]
+
+# secondary indexes on the columns the analytics scripts filter / group on
+MOVIES_INDEXES = {
+    "idx_movies_genre": "genre",
+    "idx_movies_director": "director",
+    "idx_movies_rating": "rating",
+    "idx_movies_runtime": "runtime",
+}
+
+# normalized lookup + bridge tables built from the comma-joined genre/stars/director columns;
+# a bridge row is one position in a movie's list (ord), so a name listed twice counts twice
+BRIDGE_TABLES = ["genre_stats", "person_stats", "movie_person", "movie_genre", "people", "genres"]
+
+BRIDGE_SCHEMA = [
+    """
+    CREATE TABLE genres (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE people (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE movie_genre (
+        movie_id INTEGER NOT NULL REFERENCES movies(id),
+        ord INTEGER NOT NULL,
+        genre_id INTEGER NOT NULL REFERENCES genres(id),
+        PRIMARY KEY (movie_id, ord)
+    )
+    """,
+    """
+    CREATE TABLE movie_person (
+        movie_id INTEGER NOT NULL REFERENCES movies(id),
+        person_id INTEGER NOT NULL REFERENCES people(id),
+        role TEXT NOT NULL CHECK (role IN ('star', 'director')),
+        ord INTEGER NOT NULL,
+        PRIMARY KEY (movie_id, role, ord)
+    )
+    """,
+    # per-group rating totals, kept up to date group by group on incremental loads
+    """
+    CREATE TABLE genre_stats (
+        genre_id INTEGER PRIMARY KEY REFERENCES genres(id),
+        rating_sum REAL NOT NULL,
+        rating_count INTEGER NOT NULL,
+        movie_count INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE person_stats (
+        person_id INTEGER NOT NULL REFERENCES people(id),
+        role TEXT NOT NULL,
+        rating_sum REAL NOT NULL,
+        rating_count INTEGER NOT NULL,
+        movie_count INTEGER NOT NULL,
+        PRIMARY KEY (person_id, role)
+    )
+    """,
+    "CREATE INDEX idx_movie_genre_genre ON movie_genre (genre_id)",
+    "CREATE INDEX idx_movie_person_person ON movie_person (role, person_id)",
+]
+
+GENRE_STATS_SQL = """
+INSERT INTO genre_stats (genre_id, rating_sum, rating_count, movie_count)
+SELECT mg.genre_id, TOTAL(m.rating), COUNT(m.rating), COUNT(*)
+FROM movie_genre mg
+JOIN movies m ON m.id = mg.movie_id
+{where}
+GROUP BY mg.genre_id
+"""
+
+PERSON_STATS_SQL = """
+INSERT INTO person_stats (person_id, role, rating_sum, rating_count, movie_count)
+SELECT mp.person_id, mp.role, TOTAL(m.rating), COUNT(m.rating), COUNT(*)
+FROM movie_person mp
+JOIN movies m ON m.id = mp.movie_id
+{where}
+GROUP BY mp.person_id, mp.role
+"""
+
+# natural key of a row for incremental loads: title + director, plus the release year
+# when the movies table has one (the cleaned data has none). stars is an ordinary
+# column, so a changed cast updates the row instead of inserting a second copy
+KEY_COLUMNS = ["movie", "director"]
+OPTIONAL_KEY_COLUMNS = ["year"]
+
+# bumped whenever the key columns change, so existing natural_key values get recomputed
+NATURAL_KEY_VERSION = 2
+
+# truthy in a delta file = delete the row with that natural key
+TOMBSTONE_COLUMN = "deleted"
+
+# movie_person.role -> movies column holding the comma-joined names
+PERSON_ROLES = {"star": "stars", "director": "director"}
+
+# one row per key; 'generation' is bumped by every load so cached aggregates
+# (see aggregate_cache.py) know when they are stale
+LOAD_META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS load_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+)
+"""
+
+# connection settings for a one-off batch load: WAL keeps readers working during
+# the load and synchronous=NORMAL is still crash-safe in WAL mode
+BULK_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",
+]
+
+
+def create_schema(conn, table="movies"):
+    conn.execute(MOVIES_SCHEMA.format(table=table))
+
+
+def create_indexes(conn, table="movies"):
+    for name, col in MOVIES_INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" ("{col}")')
+
+
+def has_bridge_tables(conn):
+    found = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' * len(BRIDGE_TABLES))})",
+        BRIDGE_TABLES,
+    ).fetchone()[0]
+    if found != len(BRIDGE_TABLES):
+        return False
+    # bridge tables from before the ord column dropped repeated names: treat them
+    # as missing, so readers fall back to pandas and the next load rebuilds them
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(movie_person)")]
+    return "ord" in columns
+
+
+def bump_generation(conn):
+    conn.execute(LOAD_META_SCHEMA)
+    conn.execute(
+        "INSERT INTO load_meta (key, value) VALUES ('generation', 1) "
+        "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+    )
+
+
+def load_generation(conn):
+    # None for databases written before load_meta existed
+    try:
+        row = conn.execute("SELECT value FROM load_meta WHERE key = 'generation'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def split_names(values, delimiter=","):
+    # comma-joined names -> one stripped name per row, index = movie id
+    names = values.dropna().astype(str).str.split(delimiter).explode().str.strip()
+    return names[names != ""]
+
+
+def name_ids(conn, table, names):
+    # add unseen names to a lookup table and map name -> id; names are inserted
+    # in sorted order, so a freshly created table gets ids in name order
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted_names (name TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.wanted_names")
+    conn.executemany("INSERT INTO temp.wanted_names (name) VALUES (?)",
+                     ((name,) for name in names.unique().tolist()))
+    conn.execute(f"INSERT OR IGNORE INTO {table} (name) SELECT name FROM temp.wanted_names ORDER BY name")
+    rows = conn.execute(
+        f"SELECT t.name, t.id FROM {table} t JOIN temp.wanted_names w ON w.name = t.name"
+    ).fetchall()
+    return pd.Series(dict(rows), dtype="int64")
+
+
+def bridge_rows(names, ids):
+    # (movie_id, ord, ref_id) per name, ord = position in the movie's list
+    ords = names.groupby(level=0).cumcount()
+    return zip(names.index.tolist(), ords.tolist(), names.map(ids).tolist())
+
+
+def insert_bridge_rows(conn, movies):
+    """Split genre/stars/director of `movies` (indexed by movie id) into the bridge tables."""
+    genres = split_names(movies["genre"])
+    conn.executemany("INSERT INTO movie_genre (movie_id, ord, genre_id) VALUES (?, ?, ?)",
+                     bridge_rows(genres, name_ids(conn, "genres", genres)))
+
+    people = {role: split_names(movies[col]) for role, col in PERSON_ROLES.items()}
+    person_ids = name_ids(conn, "people", pd.concat(list(people.values())))
+    for role, names in people.items():
+        conn.executemany(
+            f"INSERT INTO movie_person (movie_id, ord, person_id, role) VALUES (?, ?, ?, '{role}')",
+            bridge_rows(names, person_ids),
+        )
+
+
+def refresh_stats(conn, touched_only=False):
+    """Recompute genre_stats / person_stats, either fully or only for the groups
+    listed in temp.touched_genres / temp.touched_people."""
+    if touched_only:
+        conn.execute("DELETE FROM genre_stats WHERE genre_id IN (SELECT id FROM temp.touched_genres)")
+        conn.execute(GENRE_STATS_SQL.format(where="WHERE mg.genre_id IN (SELECT id FROM temp.touched_genres)"))
+        conn.execute(
+            "DELETE FROM person_stats "
+            "WHERE (person_id, role) IN (SELECT person_id, role FROM temp.touched_people)"
+        )
+        conn.execute(PERSON_STATS_SQL.format(
+            where="WHERE (mp.person_id, mp.role) IN (SELECT person_id, role FROM temp.touched_people)"))
+    else:
+        conn.execute("DELETE FROM genre_stats")
+        conn.execute(GENRE_STATS_SQL.format(where=""))
+        conn.execute("DELETE FROM person_stats")
+        conn.execute(PERSON_STATS_SQL.format(where=""))
+
+
+def build_bridge_tables(conn):
+    """(Re)build the lookup, bridge and stats tables from the movies table.
+
+    Runs on the caller's connection and does not commit, so it can be part
+    of the load transaction.
+    """
+    movies = pd.read_sql_query("SELECT id, genre, stars, director FROM movies ORDER BY id", conn, index_col="id")
+
+    for table in BRIDGE_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    for statement in BRIDGE_SCHEMA:
+        conn.execute(statement)
+
+    insert_bridge_rows(conn, movies)
+    refresh_stats(conn)
+
+
+def as_chunks(chunks):
+    # accept a single DataFrame or any iterable of DataFrames
+    if hasattr(chunks, "to_sql"):
+        return [chunks]
+    return chunks
+
+
+def load_movies(chunks, db_path="movies.db"):
+    """Replace the contents of the movies table with the given DataFrame chunks.
+
+    `chunks` can be a single DataFrame or any iterable of DataFrames, so the
+    pipeline can stream chunks straight into the table. Returns the row count.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        create_schema(conn)
+
+        # clears the table before inserting new data to avoid duplicates
+        conn.execute("DELETE FROM movies")
+
+        # insert data
+        # pandas maps to existing columns by name
+        rows = 0
+        for df in as_chunks(chunks):
+            df.to_sql("movies", conn, if_exists="append", index=False)
+            rows += len(df)
+
+        build_bridge_tables(conn)
+        bump_generation(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return rows
+
+
+def row_tuples(df, columns):
+    # NaN -> NULL, numpy scalars -> python objects sqlite3 can bind
+    values = df[columns].astype(object)
+    return values.where(df[columns].notna(), None).itertuples(index=False, name=None)
+
+
+def bulk_load_movies(chunks, db_path="movies.db"):
+    """Bulk-load the movies table in a single transaction.
+
+    Rows go into a staging table with executemany; the old table is then
+    dropped, the staging table renamed to movies, and the secondary indexes
+    and bridge tables built after the data is in. Readers see either the old or the new table,
+    never a half-loaded one. Returns the row count.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for pragma in BULK_PRAGMAS:
+            conn.execute(pragma)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DROP TABLE IF EXISTS movies_staging")
+            create_schema(conn, "movies_staging")
+
+            rows = 0
+            for df in as_chunks(chunks):
+                columns = [col for col in MOVIE_COLUMNS if col in df.columns]
+                col_clause = ", ".join(f'"{col}"' for col in columns)
+                placeholders = ", ".join("?" for _ in columns)
+                conn.executemany(
+                    f"INSERT INTO movies_staging ({col_clause}) VALUES ({placeholders})",
+                    row_tuples(df, columns),
+                )
+                rows += len(df)
+
+            # swap the staging table in
+            conn.execute("DROP TABLE IF EXISTS movies")
+            conn.execute("ALTER TABLE movies_staging RENAME TO movies")
+            create_indexes(conn)
+            build_bridge_tables(conn)
+            bump_generation(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return rows
+
+
+#############################################
+# Incremental (upsert) loads
+#############################################
+
+def key_columns(table_columns):
+    return KEY_COLUMNS + [col for col in OPTIONAL_KEY_COLUMNS if col in table_columns]
+
+
+def natural_keys(df, columns=KEY_COLUMNS):
+    """Stable key per row: sha1 of the key columns (missing values count as '')."""
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"natural key column(s) missing: {', '.join(missing)}")
+    parts = [df[col].astype(object).where(df[col].notna(), "").astype(str) for col in columns]
+    joined = parts[0].str.cat(parts[1:], sep="\x1f")
+    return joined.map(lambda value: hashlib.sha1(value.encode("utf-8")).hexdigest())
+
+
+def ensure_natural_keys(conn):
+    """Add + backfill movies.natural_key for tables written by a full load -> key columns.
+
+    Keys written with other key columns (an older NATURAL_KEY_VERSION) are recomputed.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(movies)")]
+    if "natural_key" not in columns:
+        conn.execute("ALTER TABLE movies ADD COLUMN natural_key TEXT")
+    key_cols = key_columns(columns)
+
+    conn.execute(LOAD_META_SCHEMA)
+    version = conn.execute("SELECT value FROM load_meta WHERE key = 'natural_key_version'").fetchone()
+    if version is None or version[0] != NATURAL_KEY_VERSION:
+        conn.execute("DROP INDEX IF EXISTS idx_movies_natural_key")
+        conn.execute("UPDATE movies SET natural_key = NULL")
+        conn.execute("INSERT OR REPLACE INTO load_meta (key, value) VALUES ('natural_key_version', ?)",
+                     (NATURAL_KEY_VERSION,))
+
+    key_clause = ", ".join(f'"{col}"' for col in key_cols)
+    missing = pd.read_sql_query(
+        f"SELECT id, {key_clause} FROM movies WHERE natural_key IS NULL ORDER BY id", conn
+    )
+    if len(missing):
+        keys = natural_keys(missing, key_cols)
+        # rows that are already duplicated in the table keep distinct keys
+        occurrence = keys.groupby(keys).cumcount()
+        keys = keys.where(occurrence == 0, keys + "#" + occurrence.astype(str))
+        conn.executemany("UPDATE movies SET natural_key = ? WHERE id = ?",
+                         zip(keys.tolist(), missing["id"].tolist()))
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_movies_natural_key ON movies (natural_key)")
+    return key_cols
+
+
+def columns_differ(columns, left, right):
+    # NULL-safe "any column changed" condition
+    return " OR ".join(f'{left}."{col}" IS NOT {right}."{col}"' for col in columns)
+
+
+def split_delta(delta, key_cols=KEY_COLUMNS):
+    # -> (rows to upsert, natural keys to delete)
+    delta = delta.copy()
+    delta["natural_key"] = natural_keys(delta, key_cols)
+    if TOMBSTONE_COLUMN in delta.columns:
+        tombstone = delta[TOMBSTONE_COLUMN].fillna(False).astype(bool)
+        delta = delta.drop(columns=TOMBSTONE_COLUMN)
+    else:
+        tombstone = pd.Series(False, index=delta.index)
+
+    deletes = delta.loc[tombstone, "natural_key"].unique().tolist()
+    # a tombstone wins over an update of the same key in the same delta
+    upserts = delta.loc[~tombstone & ~delta["natural_key"].isin(deletes)]
+    upserts = upserts.drop_duplicates("natural_key", keep="last")
+    return upserts, deletes
+
+
+def upsert_movies(delta, db_path="movies.db"):
+    """Apply a delta of cleaned rows to the movies table by natural key.
+
+    Rows are matched on movie + director (+ year, see KEY_COLUMNS).
+    New keys are inserted, rows whose columns changed are updated in place
+    (ids stay stable), identical rows are left alone and rows flagged in the
+    `deleted` column are removed. The bridge tables and genre/person stats
+    are refreshed only for the movies and groups that were touched.
+    Returns a dict with inserted/updated/deleted/unchanged counts.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for pragma in BULK_PRAGMAS:
+            conn.execute(pragma)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            create_schema(conn)
+            key_cols = ensure_natural_keys(conn)
+            bridges = has_bridge_tables(conn)
+
+            upserts, deletes = split_delta(delta, key_cols)
+            columns = [col for col in MOVIE_COLUMNS if col in upserts.columns]
+            columns += [col for col in key_cols if col not in columns]
+            col_clause = ", ".join(f'"{col}"' for col in columns)
+            differs = columns_differ(columns, "m", "d")
+
+            # stage the delta next to the table
+            conn.execute(f"CREATE TEMP TABLE delta_movies AS SELECT natural_key, {col_clause} FROM movies WHERE 0")
+            conn.executemany(
+                f"INSERT INTO temp.delta_movies (natural_key, {col_clause}) "
+                f"VALUES (?, {', '.join('?' for _ in columns)})",
+                row_tuples(upserts, ["natural_key"] + columns),
+            )
+            conn.execute("CREATE TEMP TABLE touched_movies (id INTEGER PRIMARY KEY)")
+            conn.execute("CREATE TEMP TABLE new_keys (natural_key TEXT PRIMARY KEY)")
+
+            updated = conn.execute(
+                f"INSERT INTO temp.touched_movies SELECT m.id FROM temp.delta_movies d "
+                f"JOIN movies m ON m.natural_key = d.natural_key WHERE {differs}"
+            ).rowcount
+            inserted = conn.execute(
+                "INSERT INTO temp.new_keys SELECT d.natural_key FROM temp.delta_movies d "
+                "LEFT JOIN movies m ON m.natural_key = d.natural_key WHERE m.id IS NULL"
+            ).rowcount
+            conn.executemany(
+                "INSERT OR IGNORE INTO temp.touched_movies SELECT id FROM movies WHERE natural_key = ?",
+                ((key,) for key in deletes),
+            )
+
+            if bridges:
+                # groups the old versions of the touched movies belonged to
+                conn.execute("CREATE TEMP TABLE touched_genres (id INTEGER PRIMARY KEY)")
+                conn.execute("CREATE TEMP TABLE touched_people (person_id INTEGER, role TEXT, "
+                             "PRIMARY KEY (person_id, role))")
+                conn.execute("INSERT OR IGNORE INTO temp.touched_genres SELECT genre_id FROM movie_genre "
+                             "WHERE movie_id IN (SELECT id FROM temp.touched_movies)")
+                conn.execute("INSERT OR IGNORE INTO temp.touched_people SELECT person_id, role FROM movie_person "
+                             "WHERE movie_id IN (SELECT id FROM temp.touched_movies)")
+                conn.execute("DELETE FROM movie_genre WHERE movie_id IN (SELECT id FROM temp.touched_movies)")
+                conn.execute("DELETE FROM movie_person WHERE movie_id IN (SELECT id FROM temp.touched_movies)")
+
+            deleted = conn.executemany("DELETE FROM movies WHERE natural_key = ?",
+                                       ((key,) for key in deletes)).rowcount
+            # separate UPDATE + INSERT (rather than ON CONFLICT) so unchanged and
+            # updated rows do not use up AUTOINCREMENT ids
+            conn.execute(
+                "UPDATE movies SET "
+                + ", ".join(f'"{col}" = d."{col}"' for col in columns)
+                + " FROM temp.delta_movies d WHERE movies.natural_key = d.natural_key AND ("
+                + columns_differ(columns, "movies", "d") + ")"
+            )
+            conn.execute(
+                f"INSERT INTO movies (natural_key, {col_clause}) "
+                f"SELECT natural_key, {col_clause} FROM temp.delta_movies "
+                f"WHERE natural_key IN (SELECT natural_key FROM temp.new_keys)"
+            )
+            conn.execute("INSERT OR IGNORE INTO temp.touched_movies SELECT id FROM movies "
+                         "WHERE natural_key IN (SELECT natural_key FROM temp.new_keys)")
+
+            if bridges:
+                # re-split only the touched movies that still exist
+                movies = pd.read_sql_query(
+                    "SELECT id, genre, stars, director FROM movies "
+                    "WHERE id IN (SELECT id FROM temp.touched_movies) ORDER BY id",
+                    conn, index_col="id",
+                )
+                insert_bridge_rows(conn, movies)
+                conn.execute("INSERT OR IGNORE INTO temp.touched_genres SELECT genre_id FROM movie_genre "
+                             "WHERE movie_id IN (SELECT id FROM temp.touched_movies)")
+                conn.execute("INSERT OR IGNORE INTO temp.touched_people SELECT person_id, role FROM movie_person "
+                             "WHERE movie_id IN (SELECT id FROM temp.touched_movies)")
+                refresh_stats(conn, touched_only=True)
+            else:
+                build_bridge_tables(conn)
+
+            bump_generation(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": len(upserts) - inserted - updated,
+    }
@@ -0,0 +1,72 @@
+"""
+Headless batch mode for the plotting scripts.
+
+select_backend() has to run before matplotlib.pyplot is imported: with
+--headless on the command line (or MOVIES_HEADLESS=1 in the environment) it
+selects the Agg backend, so no GUI toolkit is probed or loaded. show() then
+saves figures to the output directory instead of opening a window.
+
+Usage in a script (from Database/Scripts: import etl_path first, see etl_path.py):
+
+    import headless
+    headless.select_backend()
+    import matplotlib.pyplot as plt
+    ...
+    headless.add_arguments(ap)
+    args = ap.parse_args()
+    headless.configure(args)
+    ...
+    headless.show("figure.png")
+"""
+
+import os
+import sys
+from pathlib import Path
+
+state = {"headless": False, "out_dir": Path(".")}
+
+
+def headless_requested(argv=None):
+    argv = sys.argv if argv is None else argv
+    return "--headless" in argv or os.environ.get("MOVIES_HEADLESS", "") not in ("", "0")
+
+
+def select_backend(argv=None):
+    if headless_requested(argv):
+        import matplotlib
+        matplotlib.use("Agg")
+        state["headless"] = True
+    return state["headless"]
+
+
+def add_arguments(ap):
+    ap.add_argument("--headless", action="store_true",
+                    help="no GUI: use the Agg backend and save figures instead of showing them "
+                         "(also MOVIES_HEADLESS=1)")
+    ap.add_argument("--out-dir", default=".", help="directory the figures are written to")
+
+
+def configure(args):
+    state["headless"] = state["headless"] or args.headless
+    state["out_dir"] = Path(args.out_dir)
+    state["out_dir"].mkdir(parents=True, exist_ok=True)
+
+
+def is_headless():
+    return state["headless"]
+
+
+def output_path(name):
+    return state["out_dir"] / name
+
+
+def show(name=None, dpi=150):
+    """plt.show() normally; headless, save the figure as <out_dir>/<name> (if named) and close it."""
+    import matplotlib.pyplot as plt
+    if not state["headless"]:
+        plt.show()
+        return
+    if name:
+        plt.savefig(output_path(name), dpi=dpi)
+        print(f"Saved: {output_path(name)}")
+    plt.close()
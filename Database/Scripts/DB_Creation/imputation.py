@@ -0,0 +1,126 @@
+"""
+Missing-value imputation for data_cleaning, in two streaming passes.
+
+Pass 1 feeds the kept rows to Imputer.fit_chunk() chunk by chunk, which only
+accumulates small statistics with vectorized sums / value_counts / groupby.
+Pass 2 fills every chunk with Imputer.transform(). The state is bounded by
+the number of columns, histogram buckets and groups, not by the file size.
+
+Strategies:
+- mean: the column mean (what clean_frame always did)
+- median: an approximate median, from a histogram of the values bucketed to
+  MEDIAN_DECIMALS decimals (exact for the normalized 2-decimal columns)
+- genre_mean: the mean per primary genre (the first genre listed). Rows
+  without a genre, and genres without a value for the column, get the
+  column mean.
+
+Fill values are rounded to 2 decimals like the column means always were.
+With the mean strategy, pass 1 can come from a data profile instead
+(fit_profile(), see data_profile.py).
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_profile import weighted_percentile
+
+STRATEGIES = ["mean", "median", "genre_mean"]
+MEDIAN_DECIMALS = 3
+GROUP_COLUMN = "genre"
+
+
+def primary_genre(values):
+    # "\nDrama, Romance    " -> "Drama" (NaN stays NaN); a chunk without any
+    # genre is read as float64, so go through object for the .str accessor
+    return values.astype(object).str.split(",").str[0].str.strip()
+
+
+class Imputer:
+    """Fill values per column, fitted on chunks (pass 1) and applied to chunks (pass 2)."""
+
+    def __init__(self, columns, strategy="mean", group_col=GROUP_COLUMN, decimals=2):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown imputation strategy {strategy!r} (one of {', '.join(STRATEGIES)})")
+        self.columns = list(columns)
+        self.strategy = strategy
+        self.group_col = group_col
+        self.decimals = decimals
+        self.sums = dict.fromkeys(self.columns, 0.0)
+        self.counts = dict.fromkeys(self.columns, 0)
+        self.histograms = {col: pd.Series(dtype=np.int64) for col in self.columns}
+        self.group_sums = None
+        self.group_counts = None
+
+    def fit_chunk(self, chunk):
+        # chunk: rows that survived the row drop
+        for col in self.columns:
+            self.sums[col] += float(chunk[col].sum())
+            self.counts[col] += int(chunk[col].count())
+        if self.strategy == "median":
+            for col in self.columns:
+                buckets = chunk[col].dropna().round(MEDIAN_DECIMALS).value_counts()
+                self.histograms[col] = self.histograms[col].add(buckets, fill_value=0)
+        elif self.strategy == "genre_mean":
+            grouped = chunk[self.columns].groupby(primary_genre(chunk[self.group_col]))
+            sums, counts = grouped.sum(), grouped.count()
+            if self.group_sums is None:
+                self.group_sums, self.group_counts = sums, counts
+            else:
+                self.group_sums = self.group_sums.add(sums, fill_value=0)
+                self.group_counts = self.group_counts.add(counts, fill_value=0)
+        return self
+
+    def fit(self, chunks):
+        for chunk in chunks:
+            self.fit_chunk(chunk)
+        return self
+
+    def fit_profile(self, profile, max_row_missing=0.5):
+        # the mean strategy's pass 1 from a data profile of the (column-dropped) input
+        if self.strategy != "mean":
+            raise ValueError("only the mean strategy can be fitted from a data profile")
+        self.sums, self.counts = profile.kept_totals(self.columns, max_row_missing)
+        return self
+
+    def column_means(self):
+        return {col: np.round(self.sums[col] / self.counts[col] if self.counts[col] else np.nan,
+                              self.decimals)
+                for col in self.columns}
+
+    def fill_values(self):
+        """Column -> fill value (for genre_mean: the fallback for rows without a group mean)."""
+        if self.strategy != "median":
+            return self.column_means()
+        values = {}
+        for col, histogram in self.histograms.items():
+            histogram = histogram[histogram > 0].sort_index()
+            median = (weighted_percentile(histogram.index.to_numpy(dtype=float), histogram.to_numpy(), 0.5)
+                      if len(histogram) else np.nan)
+            values[col] = np.round(median, self.decimals)
+        return values
+
+    def group_means(self):
+        # genre x column table of rounded means (NaN where a genre has no value)
+        if self.group_sums is None:
+            return pd.DataFrame(columns=self.columns, dtype=float)
+        return (self.group_sums / self.group_counts.where(self.group_counts > 0)).round(self.decimals)
+
+    def transform(self, chunk):
+        chunk = chunk.copy()
+        fill_values = self.fill_values()
+        if self.strategy == "genre_mean":
+            groups = primary_genre(chunk[self.group_col])
+            table = self.group_means()
+            for col in self.columns:
+                chunk[col] = chunk[col].fillna(groups.map(table[col])).fillna(fill_values[col])
+        else:
+            for col in self.columns:
+                chunk[col] = chunk[col].fillna(fill_values[col])
+        return chunk
+
+    def describe(self):
+        # one line for the cleaning summary
+        values = ", ".join(f"{col}={value}" for col, value in self.fill_values().items())
+        if self.strategy == "genre_mean":
+            return f"genre means over {len(self.group_means())} genres (fallback {values})"
+        return f"{self.strategy} ({values})"
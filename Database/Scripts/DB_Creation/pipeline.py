@@ -0,0 +1,273 @@
+"""
+Runs the whole DB_Creation pipeline in one process:
+
+movies.csv -> Normalize -> Column_Drop -> data_cleaning -> Encode_Categorical -> movies.db
+
+The stages are chained in memory, so the intermediate files are only
+written when --write-intermediates is given (CSV plus a typed Parquet copy,
+see artifacts.py). With --chunksize the input is
+streamed in chunks (for files bigger than RAM): a first pass collects the
+min/max and null counts, a second pass profiles the normalized chunks for
+the imputation means (data_profile.py), and the last pass transforms the
+chunks and appends them straight into SQLite.
+
+Wall time and peak (traced) memory are reported per stage at the end.
+
+Usage:
+    python pipeline.py --input movies.csv --db movies.db
+    python pipeline.py --chunksize 100000 --write-intermediates
+"""
+
+import argparse
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+from Normalize import (raw_text_dtypes, cols_to_normalize, parse_numeric_columns, normalize,
+                       min_max_params, apply_min_max)
+from Column_Drop import drop_sparse_columns
+from data_cleaning import clean_frame, impute_columns, drop_sparse_rows
+from Encode_Categorical import encode_categorical
+from db_loader import load_movies, bulk_load_movies
+from artifacts import ArtifactWriter, write_artifact
+from data_profile import DataProfile, save_profile
+from imputation import STRATEGIES, Imputer
+import profiling
+
+# file names used by the standalone scripts
+STAGE_OUTPUTS = {
+    "normalize": "movies-normalized.csv",
+    "column_drop": "movies-column-dropped.csv",
+    "clean": "movies-cleaned.csv",
+    "encode": "movies_category_cleaned.csv",
+}
+
+
+class StageTimer:
+    """Collects wall time and peak traced memory per named stage."""
+
+    def __init__(self):
+        self.stats = {}
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        # also a profiling stage (JSON line with --profile); yields it for rows_out
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            with profiling.stage(name, rows_in) as st:
+                yield st
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            entry = self.stats.setdefault(name, {"seconds": 0.0, "peak_bytes": 0, "calls": 0})
+            entry["seconds"] += elapsed
+            entry["peak_bytes"] = max(entry["peak_bytes"], peak)
+            entry["calls"] += 1
+
+    def report(self):
+        print(f"\n{'stage':<14}{'calls':>7}{'time (s)':>12}{'peak mem (MB)':>16}")
+        total = 0.0
+        for name, entry in self.stats.items():
+            total += entry["seconds"]
+            print(f"{name:<14}{entry['calls']:>7}{entry['seconds']:>12.3f}"
+                  f"{entry['peak_bytes'] / 1024 ** 2:>16.1f}")
+        print(f"{'total':<14}{'':>7}{total:>12.3f}")
+
+
+def write_intermediate(df, name):
+    write_artifact(df, STAGE_OUTPUTS[name])
+
+
+#############################################
+# In-memory mode
+#############################################
+
+def run_in_memory(src, db_path, timer, write_intermediates=False, loader=load_movies, strategy="mean"):
+    with timer.stage("read") as st:
+        df = pd.read_csv(src)
+        st.rows_out = len(df)
+
+    with timer.stage("normalize", len(df)) as st:
+        df = normalize(df)
+        st.rows_out = len(df)
+    if write_intermediates:
+        with timer.stage("write"):
+            write_intermediate(df, "normalize")
+
+    with timer.stage("column_drop", len(df)) as st:
+        df, dropped = drop_sparse_columns(df)
+        st.rows_out = len(df)
+    print("Dropped columns:", dropped)
+    if write_intermediates:
+        with timer.stage("write"):
+            write_intermediate(df, "column_drop")
+
+    with timer.stage("clean", len(df)) as st:
+        df = clean_frame(df, strategy=strategy)
+        st.rows_out = len(df)
+    if write_intermediates:
+        with timer.stage("write"):
+            write_intermediate(df, "clean")
+
+    with timer.stage("encode", len(df)) as st:
+        df = encode_categorical(df)
+        st.rows_out = len(df)
+    if write_intermediates:
+        with timer.stage("write"):
+            write_intermediate(df, "encode")
+
+    with timer.stage("load", len(df)) as st:
+        rows = loader(df, db_path)
+        st.rows_out = rows
+    return rows
+
+
+#############################################
+# Chunked mode
+#############################################
+
+def read_chunks(src, chunksize):
+    return pd.read_csv(src, chunksize=chunksize, dtype=raw_text_dtypes)
+
+
+def scan_source(src, chunksize, timer):
+    # pass 1: min/max of the parsed numeric columns + null counts per column
+    profile = DataProfile(distinct=False, histograms=False)
+    for chunk in read_chunks(src, chunksize):
+        with timer.stage("scan"):
+            profile.update(parse_numeric_columns(chunk))
+
+    cols_to_drop = profile.columns_to_drop()
+    data_min = pd.Series(profile.min)[cols_to_normalize]
+    data_max = pd.Series(profile.max)[cols_to_normalize]
+    scale, offset = min_max_params(data_min, data_max)
+    return scale, offset, cols_to_drop
+
+
+def iter_cleaned(src, chunksize, timer, scale, offset, cols_to_drop):
+    # pass 3 up to the imputation: normalize, drop columns, drop rows
+    for chunk in read_chunks(src, chunksize):
+        with timer.stage("normalize"):
+            chunk = apply_min_max(parse_numeric_columns(chunk), scale, offset)
+        normalized = chunk
+        with timer.stage("column_drop"):
+            chunk = chunk.drop(columns=cols_to_drop)
+        dropped = chunk
+        with timer.stage("clean"):
+            chunk = drop_sparse_rows(chunk)
+        yield normalized, dropped, chunk
+
+
+def scan_fill_values(src, chunksize, timer, scale, offset, cols_to_drop, strategy="mean", full=False):
+    # pass 2: profile of the normalized chunks; its null patterns give the column
+    # means over the rows that survive the row drop (full: also distinct counts and
+    # value histograms, for the saved profiles of the intermediate files). The other
+    # imputation strategies are fitted on those rows here.
+    profile = DataProfile(distinct=full, histograms=full)
+    imputer = Imputer(impute_columns, strategy)
+    for chunk in read_chunks(src, chunksize):
+        with timer.stage("normalize"):
+            chunk = apply_min_max(parse_numeric_columns(chunk), scale, offset)
+        with timer.stage("scan"):
+            profile.update(chunk)
+            if strategy != "mean":
+                imputer.fit_chunk(drop_sparse_rows(chunk.drop(columns=cols_to_drop)))
+    dropped = profile.select([col for col in profile.columns if col not in cols_to_drop])
+    if strategy == "mean":
+        imputer.fit_profile(dropped)
+    return profile, dropped, imputer
+
+
+def iter_transformed(src, chunksize, timer, write_intermediates=False, strategy="mean"):
+    scale, offset, cols_to_drop = scan_source(src, chunksize, timer)
+    print("Dropped columns:", cols_to_drop)
+    profile, dropped_profile, imputer = scan_fill_values(src, chunksize, timer, scale, offset,
+                                                         cols_to_drop, strategy, write_intermediates)
+    print("Imputation:", imputer.describe())
+
+    # pass 3: finish each chunk and hand it to the loader
+    writers = {name: ArtifactWriter(path) for name, path in STAGE_OUTPUTS.items()} \
+        if write_intermediates else {}
+    try:
+        for normalized, dropped, chunk in iter_cleaned(src, chunksize, timer, scale, offset, cols_to_drop):
+            with timer.stage("clean"):
+                chunk = imputer.transform(chunk)
+            if writers:
+                with timer.stage("write"):
+                    writers["normalize"].write(normalized)
+                    writers["column_drop"].write(dropped)
+                    writers["clean"].write(chunk)
+            with timer.stage("encode"):
+                chunk = encode_categorical(chunk)
+            if writers:
+                with timer.stage("write"):
+                    writers["encode"].write(chunk)
+            yield chunk
+        if writers:
+            # the profiles Column_Drop / data_cleaning / boxplot_rows_drop would build
+            for writer in writers.values():
+                writer.close()
+            save_profile(profile, STAGE_OUTPUTS["normalize"])
+            save_profile(dropped_profile, STAGE_OUTPUTS["column_drop"])
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+
+class TimedChunks:
+    """Wraps a chunk iterator so the time spent producing chunks is not billed to 'load'."""
+
+    def __init__(self, chunks, timer):
+        self.chunks = chunks
+        self.timer = timer
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            with self.timer.stage("load"):
+                yield chunk
+
+
+def run_chunked(src, db_path, chunksize, timer, write_intermediates=False, loader=load_movies, strategy="mean"):
+    chunks = iter_transformed(src, chunksize, timer, write_intermediates, strategy)
+    return loader(TimedChunks(chunks, timer), db_path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the movies.csv -> movies.db pipeline in one process.")
+    ap.add_argument("--input", default="movies.csv")
+    ap.add_argument("--db", default="movies.db")
+    ap.add_argument("--chunksize", type=int, default=0,
+                    help="stream the input in chunks of this many rows (0 = load it all)")
+    ap.add_argument("--write-intermediates", action="store_true",
+                    help="also write the per-stage CSV (+ Parquet) files of the standalone scripts")
+    ap.add_argument("--impute", choices=STRATEGIES, default="mean",
+                    help="imputation strategy of the clean stage (see imputation.py)")
+    ap.add_argument("--bulk", action="store_true",
+                    help="bulk-load via a staging table in one transaction and create indexes")
+    profiling.add_arguments(ap)
+    args = ap.parse_args()
+    profiling.configure(args)
+    loader = bulk_load_movies if args.bulk else load_movies
+
+    timer = StageTimer()
+    tracemalloc.start()
+    try:
+        if args.chunksize > 0:
+            rows = run_chunked(args.input, args.db, args.chunksize, timer, args.write_intermediates, loader,
+                               args.impute)
+        else:
+            rows = run_in_memory(args.input, args.db, timer, args.write_intermediates, loader, args.impute)
+    finally:
+        tracemalloc.stop()
+
+    print("Loaded", rows, "rows into", args.db)
+    timer.report()
+    load_seconds = timer.stats["load"]["seconds"]
+    print(f"load throughput: {rows / max(load_seconds, 1e-9):,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
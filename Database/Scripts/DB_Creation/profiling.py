@@ -0,0 +1,194 @@
+"""
+Opt-in per-stage instrumentation for the pipeline and analytics scripts.
+
+With --profile (or MOVIES_PROFILE=1) every named stage writes one JSON line:
+wall and CPU seconds, rows in/out, RSS before/after and the process' peak
+RSS (null where the platform does not report them, e.g. Windows without
+psutil). --profile FILE appends the lines to FILE instead of stderr.
+--profile-stage NAME additionally runs that stage under cProfile and dumps
+<NAME>.prof next to the output (open it with `python -m pstats` or snakeviz);
+a stage that runs once per chunk accumulates into the same profile.
+
+Without --profile, stage() hands back a shared no-op object, so the hooks
+cost a function call and an attribute check.
+
+Usage in a script (from Database/Scripts: import etl_path first, see etl_path.py):
+
+    import profiling
+    ...
+    profiling.add_arguments(ap)
+    args = ap.parse_args()
+    profiling.configure(args)
+
+    with profiling.stage("read") as st:
+        df = pd.read_csv(path)
+        st.rows_out = len(df)
+
+    @profiling.profiled("clean")   # rows_in/out from the first argument / the result
+    def clean_frame(df): ...
+"""
+
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+state = {"enabled": False, "out": None, "cprofile": set(), "prof_dir": Path("."), "profilers": {}}
+
+
+def profiling_requested(argv=None):
+    argv = sys.argv if argv is None else argv
+    return "--profile" in argv or os.environ.get("MOVIES_PROFILE", "") not in ("", "0")
+
+
+def add_arguments(ap):
+    ap.add_argument("--profile", nargs="?", const="-", default=None, metavar="FILE",
+                    help="write per-stage timing/memory JSON lines to FILE (default: stderr; "
+                         "also MOVIES_PROFILE=1)")
+    ap.add_argument("--profile-stage", action="append", default=[], metavar="NAME",
+                    help="also run this stage under cProfile and write NAME.prof (repeatable)")
+
+
+def configure(args):
+    target = getattr(args, "profile", None)
+    env = os.environ.get("MOVIES_PROFILE", "")
+    if target is None and env not in ("", "0"):
+        target = "-" if env == "1" else env  # MOVIES_PROFILE=1 or =FILE
+    state["enabled"] = target is not None
+    state["out"] = None if target in (None, "-") else Path(target)
+    state["cprofile"] = set(getattr(args, "profile_stage", []) or [])
+    state["prof_dir"] = state["out"].parent if state["out"] is not None else Path(".")
+
+
+def is_enabled():
+    return state["enabled"]
+
+
+def current_rss():
+    # resident set size now (Linux /proc); peak RSS where that is not available
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def peak_rss():
+    # resource is Unix-only; elsewhere psutil's peak working set if it is installed, else None
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def megabytes(value):
+    return None if value is None else round(value / 1024 ** 2, 1)
+
+
+def emit(record):
+    line = json.dumps(record, default=str)
+    if state["out"] is None:
+        print(line, file=sys.stderr, flush=True)
+    else:
+        with open(state["out"], "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+
+class NullStage:
+    """What stage() returns when profiling is off: accepts and ignores everything."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+class Stage:
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.profiler = None
+        if name in state["cprofile"]:
+            self.profiler = state["profilers"].setdefault(name, cProfile.Profile())
+
+    def __enter__(self):
+        self.rss = current_rss()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profiler is not None:
+            self.profiler.disable()
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        rss = current_rss()
+        record = {
+            "script": Path(sys.argv[0]).name,
+            "stage": self.name,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rss_mb": megabytes(rss),
+            "rss_delta_mb": None if None in (rss, self.rss) else megabytes(rss - self.rss),
+            "peak_rss_mb": megabytes(peak_rss()),
+            "ok": exc_type is None,
+        }
+        if self.profiler is not None:
+            prof_path = state["prof_dir"] / f"{self.name}.prof"
+            self.profiler.dump_stats(prof_path)
+            record["cprofile"] = str(prof_path)
+        emit(record)
+        return False
+
+
+def stage(name, rows_in=None):
+    if not state["enabled"]:
+        return NULL_STAGE
+    return Stage(name, rows_in)
+
+
+def row_count(value):
+    # rows of a DataFrame / Series / array (or of the first item of a returned tuple)
+    if isinstance(value, tuple) and value:
+        value = value[0]  # e.g. (df, dropped_columns)
+    shape = getattr(value, "shape", None)
+    return int(shape[0]) if shape else None
+
+
+def profiled(name=None):
+    """Decorator: run the function as a stage; rows from the first argument and the result."""
+    def wrap(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            if not state["enabled"]:
+                return func(*args, **kwargs)
+            with Stage(stage_name, row_count(args[0]) if args else None) as st:
+                result = func(*args, **kwargs)
+                st.rows_out = row_count(result)
+            return result
+        return inner
+    return wrap
@@ -0,0 +1,110 @@
+"""
+Synthetic movies.csv in the shape of the scraped original, for benchmarks.
+
+The same columns, with the same messiness the pipeline has to deal with:
+- genre: 1-3 comma-joined genres, often with a leading newline and trailing
+  padding ("\\nAction, Drama            ")
+- runtime: "93 min" strings
+- votes: thousands separators ("1,873,426")
+- stars / director: bracketed Python list strings ("['A', 'B']", "[]")
+- certificate mostly empty (Column_Drop drops it), missing cells in every
+  other column, and a few nearly empty rows (data_cleaning drops them)
+
+Rows are generated chunk by chunk with numpy, so 10M rows never have to fit
+in memory. The output only depends on --rows, --seed and --chunksize.
+
+Usage:
+    python synthetic_movies.py --rows 1M --output movies.csv
+"""
+
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["movie", "genre", "runtime", "certificate", "rating", "stars", "description", "votes", "director"]
+
+GENRES = ["Action", "Adventure", "Animation", "Biography", "Comedy", "Crime", "Documentary", "Drama",
+          "Family", "Fantasy", "History", "Horror", "Music", "Mystery", "Romance", "Sci-Fi", "Thriller"]
+CERTIFICATES = ["PG", "PG-13", "R", "TV-MA", "TV-14"]
+
+# share of missing cells per column
+MISSING = {"genre": 0.01, "runtime": 0.2, "certificate": 0.7, "rating": 0.15, "stars": 0.05,
+           "description": 0.05, "votes": 0.2, "director": 0.3}
+SPARSE_ROW_SHARE = 0.03
+
+
+def parse_rows(text):
+    # "10K" / "1M" / "2.5M" / "10000" -> int
+    text = str(text).strip().upper()
+    factor = {"K": 1_000, "M": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if factor > 1 else text) * factor)
+
+
+def genre_strings():
+    # every ordered 1-3 genre combination, in the scraped formatting variants
+    combos = [", ".join(c) for k in (1, 2, 3) for c in itertools.permutations(GENRES, k)]
+    return np.array(combos + ["\n" + c + " " * 12 for c in combos], dtype=object)
+
+
+def person_lists(rng, n, pool, max_people):
+    counts = rng.integers(0, max_people + 1, size=n)
+    ids = rng.integers(0, pool, size=counts.sum())
+    names = [f"'Person {i}'" for i in ids]
+    ends = np.cumsum(counts)
+    return np.array(["[" + ", ".join(names[end - k:end]) + "]" for k, end in zip(counts, ends)],
+                    dtype=object)
+
+
+def generate_chunk(rng, start, n, pool):
+    genres = genre_strings()
+    df = pd.DataFrame({
+        "movie": [f"Movie {i}" for i in range(start, start + n)],
+        "genre": genres[rng.integers(0, len(genres), size=n)],
+        "runtime": [f"{m} min" for m in rng.integers(5, 240, size=n)],
+        "certificate": np.array(CERTIFICATES, dtype=object)[rng.integers(0, len(CERTIFICATES), size=n)],
+        "rating": np.round(rng.uniform(1.0, 10.0, size=n), 1),
+        "stars": person_lists(rng, n, pool, 4),
+        "description": [f"Synthetic description {i}." for i in range(start, start + n)],
+        "votes": [f"{v:,}" for v in rng.integers(5, 2_500_000, size=n)],
+        "director": person_lists(rng, n, max(pool // 4, 1), 1),
+    }, columns=COLUMNS)
+
+    for col, share in MISSING.items():
+        df.loc[rng.random(n) < share, col] = None
+    sparse = rng.random(n) < SPARSE_ROW_SHARE
+    df.loc[sparse, COLUMNS[1:]] = None
+    return df
+
+
+def write_movies_csv(path, rows, seed=0, chunksize=500_000):
+    """Write `rows` synthetic movies to `path`; returns the number of rows written."""
+    # people pool grows with the table, like a real catalogue
+    pool = max(300, rows // 20)
+    seeds = np.random.SeedSequence(seed).spawn(max(1, -(-rows // chunksize)))
+    written = 0
+    for i, chunk_seed in enumerate(seeds):
+        n = min(chunksize, rows - written)
+        if n <= 0:
+            break
+        df = generate_chunk(np.random.default_rng(chunk_seed), written, n, pool)
+        df.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        written += n
+    return written
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write a synthetic movies.csv.")
+    ap.add_argument("--rows", default="10K", help="number of rows, e.g. 10000, 10K, 1M, 10M")
+    ap.add_argument("--output", default="movies.csv")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--chunksize", type=int, default=500_000)
+    args = ap.parse_args()
+
+    rows = write_movies_csv(args.output, parse_rows(args.rows), args.seed, args.chunksize)
+    print("Wrote", rows, "synthetic rows to", args.output)
+
+
+if __name__ == "__main__":
+    main()
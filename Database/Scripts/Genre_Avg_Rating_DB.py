@@ -2,6 +2,18 @@
 Reads movie, genre, rating from SQLite (movies.db),
 splits multi-genre rows, computes average rating per genre,
 ranks genres, and saves both CSV + chart (PNG).
+
+--engine sql does the split, average, min-count filter and rank inside
+SQLite on the raw genre column, so only the small result set leaves the
+database; its averages are the pandas ones bit for bit. On a database built
+by the DB_Creation loader (it has the genres/movie_genre bridge tables) the
+default engine is sql, otherwise pandas. --engine bridge reads the per-genre
+totals in genre_stats instead: fastest, but a plain SQL sum, so averages can
+differ from pandas in the last digit (which can swap genres tied on rating).
+
+--bootstrap N adds a shrunk (Bayesian) average and a bootstrap confidence
+interval per genre (see group_confidence.py), computed from the exploded
+genre/rating rows.
 """
 
 import argparse
@@ -9,11 +21,130 @@ import sqlite3
 from pathlib import Path
 
 import pandas as pd
-import matplotlib.pyplot as plt
 
+import etl_path  # noqa: F401  (DB_Creation on sys.path)
+import headless
+import profiling
+headless.select_backend()
 
-def compute_genre_averages_from_df(df: pd.DataFrame, genre_col: str, rating_col: str,
-                                   delimiter: str = ",", min_count: int = 1) -> pd.DataFrame:
+from aggregate_cache import cached_frame
+from db_loader import has_bridge_tables
+from group_confidence import group_intervals
+
+ENGINES = ["auto", "pandas", "bridge", "sql"]
+
+# every character str.strip() removes (str.isspace(): ASCII and Unicode whitespace,
+# including the \x1c-\x1f separators, NEL and NBSP), for SQLite's trim()
+STRIP_CHARS = ("\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004"
+               "\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000")
+
+# genre_stats holds the per-genre rating totals maintained by the loaders
+GENRE_AVERAGES_BRIDGE_SQL = """
+SELECT g.name AS genre, s.rating_sum / s.rating_count AS avg_rating, s.rating_count AS count
+FROM genre_stats s
+JOIN genres g ON g.id = s.genre_id
+WHERE s.rating_count > 0
+ORDER BY g.name
+"""
+
+# one row per (genre, rating) pair, for the bootstrap
+GENRE_RATINGS_BRIDGE_SQL = """
+SELECT g.name AS genre, m.rating
+FROM movie_genre mg
+JOIN genres g ON g.id = mg.genre_id
+JOIN movies m ON m.id = mg.movie_id
+WHERE typeof(m.rating) IN ('integer', 'real')
+"""
+
+# split the delimited genre column with a recursive CTE (json_each would need
+# every value escaped into a JSON array first), then average, filter and rank.
+# pandas sums each genre in row order; the window ORDER BY pins pandas_mean to
+# that order (a GROUP BY re-sort would leave it undefined), rn = 1 keeps one row per genre
+GENRE_AVERAGES_SQL = """
+WITH RECURSIVE split(rid, pos, item, rest, rating) AS (
+    SELECT rowid, 0, NULL, CAST("{genre_col}" AS TEXT) || :delimiter, "{rating_col}"
+    FROM "{table}"
+    WHERE "{genre_col}" IS NOT NULL AND typeof("{rating_col}") IN ('integer', 'real')
+    UNION ALL
+    SELECT rid, pos + 1,
+           substr(rest, 1, instr(rest, :delimiter) - 1),
+           substr(rest, instr(rest, :delimiter) + length(:delimiter)),
+           rating
+    FROM split
+    WHERE rest <> ''
+),
+exploded AS (
+    SELECT trim(item, :strip_chars) AS genre, rating, rid, pos
+    FROM split
+    WHERE item IS NOT NULL
+),
+agg AS (
+    SELECT genre, avg_rating, count
+    FROM (
+        SELECT genre,
+               pandas_mean(rating) OVER w AS avg_rating,
+               COUNT(*) OVER w AS count,
+               ROW_NUMBER() OVER w AS rn
+        FROM exploded
+        WHERE genre <> ''
+        WINDOW w AS (PARTITION BY genre ORDER BY rid, pos
+                     ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+    )
+    WHERE rn = 1 AND count >= :min_count
+)
+SELECT ROW_NUMBER() OVER (ORDER BY avg_rating DESC, count DESC, genre) AS rank,
+       genre, avg_rating, count
+FROM agg
+ORDER BY rank
+"""
+
+
+class PandasMean:
+    """SQLite window aggregate that repeats pandas' compensated (Kahan) group mean.
+
+    Stepped in the same row order as the pandas groupby, it returns the
+    same float bit for bit, which AVG() does not.
+    """
+
+    def __init__(self):
+        self.total = 0.0
+        self.compensation = 0.0
+        self.count = 0
+
+    def add(self, value):
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = t - self.total - y
+        if self.compensation != self.compensation:
+            self.compensation = 0.0
+        self.total = t
+
+    def step(self, value):
+        if value is None:
+            return
+        self.count += 1
+        self.add(value)
+
+    def inverse(self, value):
+        # a row leaving a sliding frame (the unbounded frames here never remove rows)
+        if value is None:
+            return
+        self.count -= 1
+        self.add(-value)
+
+    def value(self):
+        return self.total / self.count if self.count else None
+
+    def finalize(self):
+        return self.value()
+
+
+def register_functions(conn):
+    conn.create_window_function("pandas_mean", 1, PandasMean)
+
+
+def explode_genres(df: pd.DataFrame, genre_col: str, rating_col: str,
+                   delimiter: str = ",") -> pd.DataFrame:
     # Make rating numeric and drop missing
     df = df.copy()
     df[rating_col] = pd.to_numeric(df[rating_col], errors="coerce")
@@ -23,14 +154,23 @@ def compute_genre_averages_from_df(df: pd.DataFrame, genre_col: str, rating_col:
     df[genre_col] = df[genre_col].astype(str).str.split(delimiter)
     df = df.explode(genre_col)
     df[genre_col] = df[genre_col].astype(str).str.strip()
-    df = df[df[genre_col] != ""]
+    return df[df[genre_col] != ""]
+
+
+@profiling.profiled("genre_averages")
+def compute_genre_averages_from_df(df: pd.DataFrame, genre_col: str, rating_col: str,
+                                   delimiter: str = ",", min_count: int = 1) -> pd.DataFrame:
+    df = explode_genres(df, genre_col, rating_col, delimiter)
 
     # Group and aggregate
     agg = (
         df.groupby(genre_col, as_index=False)[rating_col]
           .agg(avg_rating="mean", count="size")
     )
+    return rank_genre_averages(agg, genre_col, min_count)
 
+
+def rank_genre_averages(agg: pd.DataFrame, genre_col: str, min_count: int = 1) -> pd.DataFrame:
     # Optional min count filter
     if min_count > 1:
         agg = agg[agg["count"] >= min_count]
@@ -41,10 +181,113 @@ def compute_genre_averages_from_df(df: pd.DataFrame, genre_col: str, rating_col:
     return agg[["rank", genre_col, "avg_rating", "count"]]
 
 
+@profiling.profiled("genre_averages_bridge")
+def compute_genre_averages_from_bridge(conn, min_count: int = 1) -> pd.DataFrame:
+    # genre rows come back in name order, like the pandas groupby keys
+    agg = pd.read_sql_query(GENRE_AVERAGES_BRIDGE_SQL, conn)
+    return rank_genre_averages(agg, "genre", min_count)
+
+
+@profiling.profiled("genre_averages_sql")
+def compute_genre_averages_in_sql(conn, table: str, genre_col: str, rating_col: str,
+                                  delimiter: str = ",", min_count: int = 1) -> pd.DataFrame:
+    """Same result as compute_genre_averages_from_df, computed inside SQLite.
+
+    The delimiter is matched literally.
+    """
+    if not delimiter:
+        raise ValueError("delimiter must not be empty")
+    register_functions(conn)
+    query = GENRE_AVERAGES_SQL.format(table=table, genre_col=genre_col, rating_col=rating_col)
+    params = {"delimiter": delimiter, "strip_chars": STRIP_CHARS, "min_count": min_count}
+    return pd.read_sql_query(query, conn, params=params)
+
+
+def compute_genre_averages(conn, table: str, genre_col: str, rating_col: str,
+                           delimiter: str, min_count: int, engine: str) -> pd.DataFrame:
+    if engine == "bridge":
+        return compute_genre_averages_from_bridge(conn, min_count)
+    if engine == "sql":
+        return compute_genre_averages_in_sql(conn, table, genre_col, rating_col, delimiter, min_count)
+
+    # Read the needed columns from SQLite
+    df = pd.read_sql_query(
+        f'SELECT "{genre_col}" AS genre, "{rating_col}" AS rating FROM "{table}"',
+        conn
+    )
+    return compute_genre_averages_from_df(df, "genre", "rating", delimiter, min_count)
+
+
+def load_genre_averages(db_path, table: str = "movies", genre_col: str = "genre",
+                        rating_col: str = "rating", delimiter: str = ",", min_count: int = 1,
+                        engine: str = "auto", use_cache: bool = True) -> pd.DataFrame:
+    """Average rating per genre from SQLite; the genre column is returned as "genre".
+
+    The result is served from the aggregate cache in the database while the
+    data has not been reloaded since it was computed.
+    """
+    with sqlite3.connect(db_path) as conn:
+        return genre_averages(conn, table, genre_col, rating_col, delimiter, min_count, engine, use_cache)
+
+
+def genre_averages(conn, table: str = "movies", genre_col: str = "genre", rating_col: str = "rating",
+                   delimiter: str = ",", min_count: int = 1, engine: str = "auto",
+                   use_cache: bool = True) -> pd.DataFrame:
+    """load_genre_averages on an open connection (e.g. a pooled one in query_service.py)."""
+    # the bridge tables are built from movies.genre split on ","
+    bridge_fits = (table, genre_col, rating_col, delimiter) == ("movies", "genre", "rating", ",")
+    if engine == "auto":
+        # loader-built databases have numeric ratings, so sql gives exactly the pandas result
+        engine = "sql" if bridge_fits and has_bridge_tables(conn) else "pandas"
+    if engine == "bridge" and not bridge_fits:
+        raise ValueError("the bridge engine only covers movies.genre/rating split on ','")
+
+    params = {"table": table, "genre_col": genre_col, "rating_col": rating_col,
+              "delimiter": delimiter, "min_count": min_count, "engine": engine}
+    return cached_frame(
+        conn, "genre_averages", params,
+        lambda: compute_genre_averages(conn, table, genre_col, rating_col, delimiter, min_count, engine),
+        use_cache,
+    )
+
+
+def load_genre_intervals(db_path, table: str = "movies", genre_col: str = "genre",
+                         rating_col: str = "rating", delimiter: str = ",", n_resamples: int = 1000,
+                         confidence: float = 0.95, prior_weight: float = None, seed: int = 42,
+                         n_jobs: int = 1, use_cache: bool = True) -> pd.DataFrame:
+    """Per genre: shrunk_rating, ci_low, ci_high (cached like the averages)."""
+    bridge_fits = (table, genre_col, rating_col, delimiter) == ("movies", "genre", "rating", ",")
+    with sqlite3.connect(db_path) as conn:
+        def compute():
+            if bridge_fits and has_bridge_tables(conn):
+                rows = pd.read_sql_query(GENRE_RATINGS_BRIDGE_SQL, conn)
+            else:
+                df = pd.read_sql_query(
+                    f'SELECT "{genre_col}" AS genre, "{rating_col}" AS rating FROM "{table}"', conn)
+                rows = explode_genres(df, "genre", "rating", delimiter)
+            intervals = group_intervals(rows, "genre", "rating", n_resamples, confidence,
+                                        prior_weight, seed, n_jobs)
+            return intervals[["genre", "shrunk_rating", "ci_low", "ci_high"]]
+
+        # n_jobs does not change the result, so it is not part of the key
+        params = {"table": table, "genre_col": genre_col, "rating_col": rating_col,
+                  "delimiter": delimiter, "resamples": n_resamples, "confidence": confidence,
+                  "prior_weight": prior_weight, "seed": seed}
+        return cached_frame(conn, "genre_intervals", params, compute, use_cache)
+
+
+@profiling.profiled("render_barh")
 def plot_barh(agg: pd.DataFrame, genre_col: str, rating_col_name: str, out_png: Path = None,
               title: str = "Average Rating per Genre"):
+    import matplotlib.pyplot as plt  # only when plotting: --help and the CSV path stay fast
     plt.figure(figsize=(10, max(4, 0.35 * len(agg))))
-    plt.barh(agg[genre_col], agg[rating_col_name])
+    if "ci_low" in agg.columns:
+        # bootstrap interval around each bar
+        xerr = [(agg[rating_col_name] - agg["ci_low"]).clip(lower=0),
+                (agg["ci_high"] - agg[rating_col_name]).clip(lower=0)]
+        plt.barh(agg[genre_col], agg[rating_col_name], xerr=xerr, ecolor="gray", capsize=2)
+    else:
+        plt.barh(agg[genre_col], agg[rating_col_name])
     plt.xlabel("Average Rating")
     plt.ylabel("Genre")
     plt.title(title)
@@ -54,9 +297,13 @@ def plot_barh(agg: pd.DataFrame, genre_col: str, rating_col_name: str, out_png:
         out_png = Path(out_png)
         out_png.parent.mkdir(parents=True, exist_ok=True)
         plt.savefig(out_png, dpi=200, bbox_inches="tight")
+    elif headless.is_headless():
+        out_png = headless.output_path("genre_avg_ratings.png")
+        plt.savefig(out_png, dpi=200, bbox_inches="tight")
     else:
         plt.show()
     plt.close()
+    return out_png
 
 
 def main():
@@ -70,16 +317,34 @@ def main():
     ap.add_argument("--out-csv", default="./genre_avg_ratings_from_db.csv")
     ap.add_argument("--out-png", default="./genre_avg_ratings_from_db.png")
     ap.add_argument("--title", default="Average Rating per Genre (from SQLite)")
+    ap.add_argument("--engine", choices=ENGINES, default="auto",
+                    help="pandas = split/explode in Python, sql = split + aggregate inside SQLite "
+                         "(same result), bridge = per-genre totals in genre_stats (fastest, averages "
+                         "may differ from pandas in the last digit), auto = sql on a loader-built "
+                         "database, else pandas")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="always recompute instead of using the aggregate cache in the database")
+    ap.add_argument("--bootstrap", type=int, default=0, metavar="N",
+                    help="add shrunk averages and bootstrap confidence intervals from N resamples")
+    ap.add_argument("--confidence", type=float, default=0.95)
+    ap.add_argument("--prior-weight", type=float, default=None,
+                    help="pseudo-movies pulling each genre towards the overall mean (default: median count)")
+    ap.add_argument("--jobs", type=int, default=1, help="bootstrap in this many processes")
+    headless.add_arguments(ap)
+    profiling.add_arguments(ap)
     args = ap.parse_args()
+    headless.configure(args)
+    profiling.configure(args)
 
-    # Read the needed columns from SQLite
-    with sqlite3.connect(args.db) as conn:
-        df = pd.read_sql_query(
-            f'SELECT "{args.genre_col}" AS genre, "{args.rating_col}" AS rating FROM "{args.table}"',
-            conn
-        )
-
-    agg = compute_genre_averages_from_df(df, "genre", "rating", args.delimiter, args.min_count)
+    agg = load_genre_averages(args.db, args.table, args.genre_col, args.rating_col,
+                              args.delimiter, args.min_count, args.engine, not args.no_cache)
+    if args.bootstrap > 0:
+        with profiling.stage("bootstrap"):
+            intervals = load_genre_intervals(args.db, args.table, args.genre_col, args.rating_col,
+                                             args.delimiter, args.bootstrap, args.confidence,
+                                             args.prior_weight, n_jobs=args.jobs,
+                                             use_cache=not args.no_cache)
+        agg = agg.merge(intervals, on="genre", how="left")
 
     # Save CSV
     out_csv = Path(args.out_csv)
@@ -87,10 +352,11 @@ def main():
     agg.to_csv(out_csv, index=False)
 
     # Plot PNG
-    plot_barh(agg, "genre", "avg_rating", args.out_png, args.title)
+    out_png = plot_barh(agg, "genre", "avg_rating", args.out_png, args.title)
 
     print(f"Saved: {out_csv}")
-    print(f"Saved: {args.out_png}")
+    if out_png:
+        print(f"Saved: {out_png}")
 
 
 if __name__ == "__main__":
@@ -1,56 +1,107 @@
 # This script performs ML analyses and integrates LLM OpenAI API
 
 
+import argparse
+import asyncio
 import sqlite3
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import LabelEncoder
-from openai import OpenAI
-import traceback
+
+import etl_path  # noqa: F401  (DB_Creation on sys.path)
+import llm_client
+import profiling
+from llm_client import LLMClient, ResponseCache
+from ml_models import load_movies, load_person_pairs, people_model, runtime_model
 
 
 #############################################
 #  Load data from sqlite
 #############################################
 
+@profiling.profiled("read")
 def load_movies_from_db(db_path='movies.db'):
     conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query('SELECT * FROM movies', conn)
+    df = load_movies(conn)
     conn.close()
     return df
 
+def load_people_from_db(df, db_path='movies.db'):
+    # (movie, role, name) pairs from the bridge tables, None if the db has none
+    conn = sqlite3.connect(db_path)
+    pairs = load_person_pairs(conn, df)
+    conn.close()
+    return pairs
+
 #############################################
 # Machine Learning analysis tasks
 #############################################
 
+# see ml_models.py; fitted models are cached in .model_cache/
+
+@profiling.profiled()
 def analyze_runtime_rating(df):
-    pass
+    return runtime_model(df)
 
-def analyze_stars_rating(df):
-    pass
+@profiling.profiled()
+def analyze_stars_rating(df, pairs=None):
+    return people_model(df, pairs, "star")
 
-def analyze_director_rating(df):
-    pass
+@profiling.profiled()
+def analyze_director_rating(df, pairs=None):
+    return people_model(df, pairs, "director")
 
-def extract_all_insights(df):
+def extract_all_insights(df, pairs=None):
     return {
         "runtime_rating": analyze_runtime_rating(df),
-        "stars_rating": analyze_stars_rating(df),
-        "director_rating": analyze_director_rating(df)
+        "stars_rating": analyze_stars_rating(df, pairs),
+        "director_rating": analyze_director_rating(df, pairs)
     }
 
 #############################################
-# LLM client (OpenAI)
+# LLM client (see llm_client.py: OpenAI or offline stub, cached)
 #############################################
 
-def call_llm(insights: dict, audience_preferences=None):
-    client = OpenAI()
-
+# one client for the whole process, so its HTTP connection pool is reused
+_default_client = []
+
+def default_client():
+    if not _default_client:
+        _default_client.append(LLMClient(cache=ResponseCache()))
+    return _default_client[0]
+
+# one summary per audience; audience_preferences can name these or describe new ones
+AUDIENCES = {
+    "general": "General Audience -> wants easy explanations and movie/TV recommendations.",
+    "industry": "Industry Stakeholders -> want data-driven behaviour patterns and correlations.",
+}
+
+def audience_profiles(audience_preferences=None):
+    # None -> both built-in audiences; a dict is used as is; a list may mix
+    # AUDIENCES keys and free-text descriptions
+    if audience_preferences is None:
+        return dict(AUDIENCES)
+    if isinstance(audience_preferences, dict):
+        return dict(audience_preferences)
+    if isinstance(audience_preferences, str):
+        audience_preferences = [audience_preferences]
+    profiles = {}
+    for i, pref in enumerate(audience_preferences):
+        if pref in AUDIENCES:
+            profiles[pref] = AUDIENCES[pref]
+        else:
+            profiles[f"profile_{i + 1}"] = pref
+    return profiles
+
+def format_results(insights: dict):
     # Format insights into a readable string
     runtime_insights = insights.get("runtime_rating", {})
     stars_insights = insights.get("stars_rating", {})
     director_insights = insights.get("director_rating", {})
+    return f"""Analysis Results:
+- Runtime vs Rating: {runtime_insights}
+- Stars vs Rating: {stars_insights}
+- Directors vs Rating: {director_insights}
+"""
 
+def build_messages(insights: dict):
     prompt = f"""
 You are an AI data analyst for a movie intelligence platform.
 
@@ -58,29 +109,92 @@ STAKEHOLDERS:
 - General Audience -> wants easy explanations and movie/TV recommendations.
 - Industry Stakeholders -> want data-driven behaviour patterns and correlations.
 
-Analysis Results:
-- Runtime vs Rating: {runtime_insights}
-- Stars vs Rating: {stars_insights}
-- Directors vs Rating: {director_insights}
-
+{format_results(insights)}
 Please generate a clear, user-friendly summary for both audiences and stakeholders. 
 """
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": "You are a helpful data analyst."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return response.choices[0].message.content
-
-if __name__ == "__main__":
-    df = load_movies_from_db()
-    insights = extract_all_insights(df)
-    summary = call_llm(insights)
-    print(summary)
-
+    return [
+        {"role": "system", "content": "You are a helpful data analyst."},
+        {"role": "user", "content": prompt}
+    ]
 
+def build_audience_messages(insights: dict, audience: str):
+    prompt = f"""
+You are an AI data analyst for a movie intelligence platform.
 
+AUDIENCE:
+- {audience}
 
+{format_results(insights)}
+Please generate a clear summary written for this audience only.
+"""
+    return [
+        {"role": "system", "content": "You are a helpful data analyst."},
+        {"role": "user", "content": prompt}
+    ]
+
+async def acall_llm_audiences(insights: dict, audience_preferences=None, client=None,
+                              max_concurrency=4, on_token=None):
+    """One concurrent, streamed request per audience -> {audience name: summary}."""
+    client = client or default_client()
+    requests = {name: build_audience_messages(insights, description)
+                for name, description in audience_profiles(audience_preferences).items()}
+    return await client.afan_out(requests, max_concurrency, on_token)
+
+def call_llm_audiences(insights: dict, audience_preferences=None, client=None,
+                       max_concurrency=4, on_token=None):
+    return asyncio.run(acall_llm_audiences(insights, audience_preferences, client,
+                                           max_concurrency, on_token))
+
+def join_summaries(summaries: dict):
+    return "\n\n".join(f"## {name}\n{text}" for name, text in summaries.items())
+
+def call_llm(insights: dict, audience_preferences=None, client=None):
+    # unchanged insights -> same prompt -> answered from the response cache
+    client = client or default_client()
+    if audience_preferences is None:
+        return client.complete(build_messages(insights))
+    return join_summaries(call_llm_audiences(insights, audience_preferences, client))
+
+class LinePrinter:
+    # prints streamed tokens as complete "name | line" lines, so concurrent
+    # summaries don't interleave mid-line
+    def __init__(self):
+        self.pending = {}
+
+    def __call__(self, name, token):
+        text = self.pending.get(name, "") + token
+        *lines, self.pending[name] = text.split("\n")
+        for line in lines:
+            print(f"{name} | {line}", flush=True)
+
+    def flush(self):
+        for name, text in self.pending.items():
+            if text:
+                print(f"{name} | {text}", flush=True)
+        self.pending.clear()
 
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="movies.db")
+    ap.add_argument("--audience", action="append", default=None,
+                    help=f"one summary per audience: {', '.join(AUDIENCES)} or a free-text profile "
+                         "(repeatable; default: one combined summary)")
+    ap.add_argument("--stream", action="store_true", help="print the summaries as they are generated")
+    llm_client.add_arguments(ap)
+    profiling.add_arguments(ap)
+    args = ap.parse_args()
+    profiling.configure(args)
+
+    df = load_movies_from_db(args.db)
+    insights = extract_all_insights(df, load_people_from_db(df, args.db))
+    client = llm_client.client_from_args(args)
+    with profiling.stage("llm"):
+        if args.audience is None and not args.stream:
+            print(call_llm(insights, client=client))
+        elif args.stream:
+            printer = LinePrinter()
+            call_llm_audiences(insights, args.audience, client, args.llm_concurrency, printer)
+            printer.flush()
+        else:
+            summaries = call_llm_audiences(insights, args.audience, client, args.llm_concurrency)
+            print(join_summaries(summaries))
@@ -1,155 +1,305 @@
 
 import sqlite3
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
-
-# -------------------------------
-# Step 1. Load data
-# -------------------------------
-conn = sqlite3.connect("movies.db")
-df = pd.read_sql_query("SELECT movie, director, stars, rating FROM movies", conn)
-conn.close()
-
-# -------------------------------
-# Step 2. Select top 50 directors
-# -------------------------------
-top_directors = df['director'].value_counts().head(50).index
-df_directors = df[df['director'].isin(top_directors)]
-
-# -------------------------------
-# Step 3. Select top 50 stars
-# -------------------------------
-df_stars = df.copy()
-df_stars['stars'] = df_stars['stars'].str.split(',')
-df_stars = df_stars.explode('stars')
-df_stars['stars'] = df_stars['stars'].str.strip()
-
-top_stars = df_stars['stars'].value_counts().head(50).index
-df_stars = df_stars[df_stars['stars'].isin(top_stars)]
-
-# -------------------------------
-# Step 4. Aggregations
-# -------------------------------
-avg_rating_director = df_directors.groupby('director')['rating'].mean().sort_values(ascending=False)
-avg_rating_star = df_stars.groupby('stars')['rating'].mean().sort_values(ascending=False)
-
-movies_per_director = df_directors.groupby('director').size().sort_values(ascending=False)
-movies_per_star = df_stars.groupby('stars').size().sort_values(ascending=False)
-
-# -------------------------------
-# Step 5. Visualizations 
-# -------------------------------
-
-# -------------------------------
-# Combined Director Plots
-# -------------------------------
-# Boxplot: Shows rating distribution per director (median, spread, consistency)
-# Scatter: Shows relationship between number of movies (X) and average rating (Y)
-
-fig, axes = plt.subplots(2, 1, figsize=(16, 12))
-
-# 1. Boxplot of ratings per director
-sns.boxplot(
-    data=df_directors,
-    x="director",
-    y="rating",
-    showfliers=False,
-    ax=axes[0]
-)
-plt.setp(axes[0].get_xticklabels(), rotation=90)
-axes[0].set_title("Director Rating Distributions (Box Plot)")
-axes[0].set_ylabel("Normalized Rating")
-axes[0].set_xlabel("Director")
-
-# 2. Scatter plot of avg rating vs movie count
-axes[1].scatter(
-    movies_per_director,
-    avg_rating_director,
-    alpha=0.7,
-    color="royalblue"
-)
-axes[1].set_title("Directors: Avg Rating vs Movie Count (Scatter Plot)")
-axes[1].set_xlabel("Number of Movies")
-axes[1].set_ylabel("Average Rating")
-axes[1].grid(True, linestyle="--", alpha=0.5)
-
-plt.tight_layout()
-plt.savefig("directors_combined.png")
-plt.close()
-
-
-# -------------------------------
-# Combined Star Plots
-# -------------------------------
-# Boxplot: Shows rating distribution per star (median, spread, consistency)
-# Scatter: Shows relationship between number of movies (X) and average rating (Y)
-
-fig, axes = plt.subplots(2, 1, figsize=(16, 12))
-
-# 1. Boxplot of ratings per star
-sns.boxplot(
-    data=df_stars,
-    x="stars",
-    y="rating",
-    showfliers=False,
-    ax=axes[0]
-)
-plt.setp(axes[0].get_xticklabels(), rotation=90) 
-axes[0].set_title("Star Rating Distributions (Box Plot)")
-axes[0].set_ylabel("Normalized Rating")
-axes[0].set_xlabel("Star")
-
-# 2. Scatter plot of avg rating vs movie count
-axes[1].scatter(
-    movies_per_star,
-    avg_rating_star,
-    alpha=0.7,
-    color="darkorange"
-)
-axes[1].set_title("Stars: Avg Rating vs Movie Count (Scatter Plot)")
-axes[1].set_xlabel("Number of Movies")
-axes[1].set_ylabel("Average Rating")
-axes[1].grid(True, linestyle="--", alpha=0.5)
-
-plt.tight_layout()
-plt.savefig("stars_combined.png")
-plt.close()
-
-
-
-
+import argparse
 
+import pandas as pd
 
-# -------------------------------
-# Step 6. Insights
-# -------------------------------
-top_director = avg_rating_director.head(1)
-top_star = avg_rating_star.head(1)
-
-print("=== Insights ===")
-print(f"Highest-rated director: {top_director.index[0]} with average normalized rating {top_director.values[0]:.3f}")
-print(f"Highest-rated star: {top_star.index[0]} with average normalized rating {top_star.values[0]:.3f}")
-
-print("\nNew visualizations saved:")
-print("- directors_combined.png  # Boxplot + Scatter Plot for directors")
-print("- stars_combined.png      # Boxplot + Scatter Plot for stars")
-
-
-
-# -------------------------------
-# Step 7. Save CSV
-# -------------------------------
-df_directors_avg = avg_rating_director.reset_index()
-df_directors_avg.columns = ['director', 'avg_rating_director']
-df_directors_avg['movies_director'] = movies_per_director.values
-
-df_stars_avg = avg_rating_star.reset_index()
-df_stars_avg.columns = ['star', 'avg_rating_star']
-df_stars_avg['movies_star'] = movies_per_star.values
-
-combined_df = pd.concat([df_directors_avg, df_stars_avg], axis=1)
-combined_df.to_csv("avg_ratings_directors_stars.csv", index=False)
-
-print("\nCombined CSV saved as avg_ratings_directors_stars.csv")
+import etl_path  # noqa: F401  (DB_Creation on sys.path)
+import headless
+import profiling
+headless.select_backend()  # figures are only saved, never shown
+
+from aggregate_cache import cached_frame
+from db_loader import has_bridge_tables
+from group_confidence import group_intervals
+from heavy_hitters import BATCH_SIZE, CAPACITY, exact_top_rows, explode_names, streaming_top_rows
+from typed_loader import expand_frame, read_typed
+
+# top-N stars straight from the movie_person bridge table; ties are broken by
+# first appearance (bridge rowid follows movie id + position), like value_counts
+TOP_STARS_SQL = """
+WITH top_stars AS (
+    SELECT person_id
+    FROM movie_person
+    WHERE role = 'star'
+    GROUP BY person_id
+    ORDER BY COUNT(*) DESC, MIN(rowid)
+    LIMIT ?
+)
+SELECT m.movie, m.director, p.name AS stars, m.rating
+FROM movie_person mp
+JOIN top_stars t ON t.person_id = mp.person_id
+JOIN people p ON p.id = mp.person_id
+JOIN movies m ON m.id = mp.movie_id
+WHERE mp.role = 'star'
+ORDER BY mp.rowid
+"""
+
+# every (star, rating) pair, for the bootstrap over all stars
+STAR_RATINGS_SQL = """
+SELECT p.name AS stars, m.rating
+FROM movie_person mp
+JOIN people p ON p.id = mp.person_id
+JOIN movies m ON m.id = mp.movie_id
+WHERE mp.role = 'star'
+"""
+
+
+@profiling.profiled("read")
+def load_movies(conn):
+    # categorical director, float32 rating (see typed_loader)
+    return read_typed(conn, "SELECT movie, director, stars, rating FROM movies")
+
+
+@profiling.profiled()
+def top_director_rows(df, top_n=50):
+    top_directors = df['director'].value_counts().head(top_n).index
+    return expand_frame(df[df['director'].isin(top_directors)].reset_index(drop=True))
+
+
+@profiling.profiled()
+def top_star_rows(conn, df, use_bridge, top_n=50):
+    # with the bridge tables the selection is an indexed GROUP BY inside SQLite,
+    # otherwise split + explode the comma-joined stars strings
+    if use_bridge:
+        return pd.read_sql_query(TOP_STARS_SQL, conn, params=(top_n,))
+    return exact_top_rows(expand_frame(df()), 'stars', top_n, delimiter=',')
+
+
+@profiling.profiled("sketch")
+def sketch_top_rows(conn, columns, top_n=50, capacity=CAPACITY):
+    # two batched passes over movies instead of value_counts over the whole
+    # (exploded) table; None where the sketch can't vouch for an exact top-N
+    rows, info = streaming_top_rows(
+        lambda: pd.read_sql_query("SELECT movie, director, stars, rating FROM movies", conn,
+                                  chunksize=BATCH_SIZE),
+        columns, top_n, capacity)
+    for col in columns:
+        if not info[col]["exact"]:
+            print(f"Sketch top-{top_n} {col} not provably exact (floor {info[col]['floor']}); "
+                  "using value_counts")
+    return {col: rows[col] if info[col]["exact"] else None for col in columns}
+
+
+def star_rating_rows(conn, df, use_bridge):
+    if use_bridge:
+        return pd.read_sql_query(STAR_RATINGS_SQL, conn)
+    df_stars = explode_names(expand_frame(df()[['stars', 'rating']]), 'stars')
+    return df_stars[df_stars['stars'].notna() & (df_stars['stars'] != "")]
+
+
+@profiling.profiled("bootstrap")
+def rating_intervals(rows, col, args):
+    # all directors/stars, ranked by the shrunk average instead of the bare mean
+    intervals = group_intervals(rows, col, 'rating', args.bootstrap, args.confidence,
+                                args.prior_weight, n_jobs=args.jobs)
+    return intervals.sort_values(['shrunk_rating', 'count'], ascending=False).reset_index(drop=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="movies.db")
+    ap.add_argument("--bootstrap", type=int, default=0, metavar="N",
+                    help="also write shrunk averages + bootstrap confidence intervals for every "
+                         "director and star (N resamples)")
+    ap.add_argument("--confidence", type=float, default=0.95)
+    ap.add_argument("--prior-weight", type=float, default=None,
+                    help="pseudo-movies pulling each average towards the overall mean (default: median count)")
+    ap.add_argument("--jobs", type=int, default=1, help="bootstrap in this many processes")
+    ap.add_argument("--sketch", action="store_true",
+                    help="find the top directors (and, without bridge tables, stars) with a streaming "
+                         "heavy-hitter sketch in bounded memory instead of value_counts over all rows")
+    ap.add_argument("--sketch-capacity", type=int, default=CAPACITY,
+                    help="candidates the sketch keeps per ranking")
+    headless.add_arguments(ap)
+    profiling.add_arguments(ap)
+    args = ap.parse_args()
+    headless.configure(args)
+    profiling.configure(args)
+
+    # -------------------------------
+    # Step 1. Load data
+    # -------------------------------
+    # the top-50 rows are cached in movies.db until the next reload, so the
+    # full table is only read when they have to be recomputed
+    conn = sqlite3.connect(args.db)
+    use_bridge = has_bridge_tables(conn)
+    loaded = []
+
+    def movies_df():
+        if not loaded:
+            loaded.append(load_movies(conn))
+        return loaded[0]
+
+    # the sketch gives the same rows as value_counts (or defers to it), so both share the cache entries
+    sketched = []
+    sketch_columns = {"director": None} if use_bridge else {"director": None, "stars": ","}
+
+    def sketch_rows(col):
+        if not args.sketch or col not in sketch_columns:
+            return None
+        if not sketched:
+            sketched.append(sketch_top_rows(conn, sketch_columns, 50, args.sketch_capacity))
+        return sketched[0][col]
+
+    def top_rows(col, exact):
+        rows = sketch_rows(col)
+        return rows if rows is not None else exact()
+
+    # -------------------------------
+    # Step 2. Select top 50 directors
+    # -------------------------------
+    df_directors = cached_frame(conn, "top_director_rows", {"top_n": 50},
+                                lambda: top_rows('director', lambda: top_director_rows(movies_df())))
+
+    # -------------------------------
+    # Step 3. Select top 50 stars
+    # -------------------------------
+    df_stars = cached_frame(conn, "top_star_rows", {"top_n": 50, "bridge": use_bridge},
+                            lambda: top_rows('stars', lambda: top_star_rows(conn, movies_df, use_bridge)))
+
+    if args.bootstrap > 0:
+        params = {"resamples": args.bootstrap, "confidence": args.confidence,
+                  "prior_weight": args.prior_weight, "bridge": use_bridge}
+        director_ci = cached_frame(
+            conn, "director_intervals", params,
+            lambda: rating_intervals(expand_frame(movies_df()[['director', 'rating']]), 'director', args))
+        star_ci = cached_frame(
+            conn, "star_intervals", params,
+            lambda: rating_intervals(star_rating_rows(conn, movies_df, use_bridge), 'stars', args))
+    conn.close()
+
+    # -------------------------------
+    # Step 4. Aggregations
+    # -------------------------------
+    avg_rating_director = df_directors.groupby('director')['rating'].mean().sort_values(ascending=False)
+    avg_rating_star = df_stars.groupby('stars')['rating'].mean().sort_values(ascending=False)
+
+    movies_per_director = df_directors.groupby('director').size().sort_values(ascending=False)
+    movies_per_star = df_stars.groupby('stars').size().sort_values(ascending=False)
+
+    # -------------------------------
+    # Step 5. Visualizations 
+    # -------------------------------
+    # seaborn + matplotlib take seconds to import, so only load them once there is something to draw
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # -------------------------------
+    # Combined Director Plots
+    # -------------------------------
+    # Boxplot: Shows rating distribution per director (median, spread, consistency)
+    # Scatter: Shows relationship between number of movies (X) and average rating (Y)
+
+    fig, axes = plt.subplots(2, 1, figsize=(16, 12))
+
+    # 1. Boxplot of ratings per director
+    sns.boxplot(
+        data=df_directors,
+        x="director",
+        y="rating",
+        showfliers=False,
+        ax=axes[0]
+    )
+    plt.setp(axes[0].get_xticklabels(), rotation=90)
+    axes[0].set_title("Director Rating Distributions (Box Plot)")
+    axes[0].set_ylabel("Normalized Rating")
+    axes[0].set_xlabel("Director")
+
+    # 2. Scatter plot of avg rating vs movie count
+    axes[1].scatter(
+        movies_per_director,
+        avg_rating_director,
+        alpha=0.7,
+        color="royalblue"
+    )
+    axes[1].set_title("Directors: Avg Rating vs Movie Count (Scatter Plot)")
+    axes[1].set_xlabel("Number of Movies")
+    axes[1].set_ylabel("Average Rating")
+    axes[1].grid(True, linestyle="--", alpha=0.5)
+
+    plt.tight_layout()
+    with profiling.stage("render_directors"):
+        plt.savefig(headless.output_path("directors_combined.png"))
+    plt.close()
+
+    # -------------------------------
+    # Combined Star Plots
+    # -------------------------------
+    # Boxplot: Shows rating distribution per star (median, spread, consistency)
+    # Scatter: Shows relationship between number of movies (X) and average rating (Y)
+
+    fig, axes = plt.subplots(2, 1, figsize=(16, 12))
+
+    # 1. Boxplot of ratings per star
+    sns.boxplot(
+        data=df_stars,
+        x="stars",
+        y="rating",
+        showfliers=False,
+        ax=axes[0]
+    )
+    plt.setp(axes[0].get_xticklabels(), rotation=90) 
+    axes[0].set_title("Star Rating Distributions (Box Plot)")
+    axes[0].set_ylabel("Normalized Rating")
+    axes[0].set_xlabel("Star")
+
+    # 2. Scatter plot of avg rating vs movie count
+    axes[1].scatter(
+        movies_per_star,
+        avg_rating_star,
+        alpha=0.7,
+        color="darkorange"
+    )
+    axes[1].set_title("Stars: Avg Rating vs Movie Count (Scatter Plot)")
+    axes[1].set_xlabel("Number of Movies")
+    axes[1].set_ylabel("Average Rating")
+    axes[1].grid(True, linestyle="--", alpha=0.5)
+
+    plt.tight_layout()
+    with profiling.stage("render_stars"):
+        plt.savefig(headless.output_path("stars_combined.png"))
+    plt.close()
+
+    # -------------------------------
+    # Step 6. Insights
+    # -------------------------------
+    top_director = avg_rating_director.head(1)
+    top_star = avg_rating_star.head(1)
+
+    print("=== Insights ===")
+    print(f"Highest-rated director: {top_director.index[0]} with average normalized rating {top_director.values[0]:.3f}")
+    print(f"Highest-rated star: {top_star.index[0]} with average normalized rating {top_star.values[0]:.3f}")
+
+    print("\nNew visualizations saved:")
+    print(f"- {headless.output_path('directors_combined.png')}  # Boxplot + Scatter Plot for directors")
+    print(f"- {headless.output_path('stars_combined.png')}  # Boxplot + Scatter Plot for stars")
+
+    # -------------------------------
+    # Step 7. Save CSV
+    # -------------------------------
+    df_directors_avg = avg_rating_director.reset_index()
+    df_directors_avg.columns = ['director', 'avg_rating_director']
+    df_directors_avg['movies_director'] = movies_per_director.values
+
+    df_stars_avg = avg_rating_star.reset_index()
+    df_stars_avg.columns = ['star', 'avg_rating_star']
+    df_stars_avg['movies_star'] = movies_per_star.values
+
+    combined_df = pd.concat([df_directors_avg, df_stars_avg], axis=1)
+    combined_df.to_csv("avg_ratings_directors_stars.csv", index=False)
+
+    print("\nCombined CSV saved as avg_ratings_directors_stars.csv")
+
+    if args.bootstrap > 0:
+        director_ci.to_csv("director_rating_intervals.csv", index=False)
+        star_ci.to_csv("star_rating_intervals.csv", index=False)
+        print(f"Highest shrunk director rating: {director_ci['director'].iloc[0]} "
+              f"({director_ci['shrunk_rating'].iloc[0]:.3f}, {director_ci['count'].iloc[0]} movies)")
+        print(f"Highest shrunk star rating: {star_ci['stars'].iloc[0]} "
+              f"({star_ci['shrunk_rating'].iloc[0]:.3f}, {star_ci['count'].iloc[0]} movies)")
+        print("Bootstrap intervals saved as director_rating_intervals.csv and star_rating_intervals.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Materialized aggregate cache inside movies.db.
+
+Each cached aggregate is a DataFrame stored in its own table (agg_<hash>)
+and registered in aggregate_cache together with the load generation it was
+computed from. The DB_Creation loaders bump that generation on every load,
+so a cached result is reused until the next reload and recomputed after it.
+Tables left over from earlier generations are dropped on the next write.
+
+Databases without a load generation (loaded before load_meta existed), or
+that cannot be written to, are simply not cached.
+"""
+
+import hashlib
+import json
+import sqlite3
+
+import pandas as pd
+
+import etl_path  # noqa: F401  (DB_Creation on sys.path)
+from db_loader import load_generation
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aggregate_cache (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    params TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    table_name TEXT NOT NULL
+)
+"""
+
+
+def cache_key(name, params):
+    params_json = json.dumps(params, sort_keys=True, default=str)
+    digest = hashlib.sha1(f"{name}:{params_json}".encode("utf-8")).hexdigest()[:16]
+    return digest, params_json
+
+
+def read_cached(conn, name, params, generation):
+    key, _ = cache_key(name, params)
+    try:
+        row = conn.execute(
+            "SELECT generation, table_name FROM aggregate_cache WHERE key = ?", (key,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if row is None or row[0] != generation:
+        return None
+    return pd.read_sql_query(f'SELECT * FROM "{row[1]}"', conn)
+
+
+def prune_stale(conn, generation):
+    # aggregates of an earlier load are never read again
+    stale = conn.execute(
+        "SELECT table_name FROM aggregate_cache WHERE generation != ?", (generation,)
+    ).fetchall()
+    for (table_name,) in stale:
+        conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    conn.execute("DELETE FROM aggregate_cache WHERE generation != ?", (generation,))
+
+
+def write_cached(conn, name, params, generation, df):
+    key, params_json = cache_key(name, params)
+    table_name = f"agg_{key}"
+    try:
+        conn.execute(CACHE_SCHEMA)
+        df.to_sql(table_name, conn, if_exists="replace", index=False)
+        conn.execute(
+            "INSERT OR REPLACE INTO aggregate_cache (key, name, params, generation, table_name) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, name, params_json, generation, table_name),
+        )
+        prune_stale(conn, generation)
+        conn.commit()
+    except sqlite3.OperationalError:
+        # read-only database: serve the freshly computed result uncached
+        conn.rollback()
+
+
+def cached_frame(conn, name, params, compute, use_cache=True):
+    """Return the aggregate `name` for `params`, calling compute() only on a cache miss.
+
+    compute() must return a DataFrame whose index carries no information
+    (reset it first), because only the columns are stored.
+    """
+    generation = load_generation(conn) if use_cache else None
+    if generation is None:
+        return compute()
+
+    df = read_cached(conn, name, params, generation)
+    if df is None:
+        df = compute()
+        write_cached(conn, name, params, generation, df)
+    return df
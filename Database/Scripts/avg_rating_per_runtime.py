@@ -1,34 +1,104 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
+import sqlite3
 
-# load the CSV
-df = pd.read_csv("movies_category_cleaned.csv")
+import pandas as pd
 
-# keep only rows that have both runtime and rating
-df = df.dropna(subset=["runtime", "rating"])
+import etl_path  # noqa: F401  (DB_Creation on sys.path)
+import profiling
+from Genre_Avg_Rating_DB import register_functions
+from aggregate_cache import cached_frame
+from artifacts import read_artifact
+from density import NUMERIC_WHERE
 
-# task: average rating for each runtime value
-# groupby runtime and compute the mean rating
-avg_by_runtime = (
-    df.groupby("runtime", as_index=False)["rating"]
-      .mean()
-      .rename(columns={"rating": "avg_rating"})
-      .sort_values("runtime")
+# average_rating_by_runtime() inside SQLite, bit for bit: pandas_mean over each
+# runtime's ratings in row order (AVG() would sum in an undefined order, uncompensated)
+RUNTIME_AVERAGES_SQL = f"""
+SELECT runtime, avg_rating
+FROM (
+    SELECT runtime,
+           pandas_mean(rating) OVER w AS avg_rating,
+           ROW_NUMBER() OVER w AS rn
+    FROM movies
+    WHERE {NUMERIC_WHERE.format(x="runtime", y="rating")}
+    WINDOW w AS (PARTITION BY runtime ORDER BY rowid
+                 ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
 )
+WHERE rn = 1
+ORDER BY runtime
+"""
+
+
+@profiling.profiled()
+def average_rating_by_runtime(df):
+    # keep only rows that have both runtime and rating
+    df = df.dropna(subset=["runtime", "rating"])
+
+    # task: average rating for each runtime value
+    # groupby runtime and compute the mean rating
+    return (
+        df.groupby("runtime", as_index=False)["rating"]
+          .mean()
+          .rename(columns={"rating": "avg_rating"})
+          .sort_values("runtime")
+          .reset_index(drop=True)
+    )
+
+
+def load_runtime_averages(db_path, use_cache=True):
+    # same aggregate from movies.db, served from the aggregate cache while the DB is unchanged
+    with sqlite3.connect(db_path) as conn:
+        return runtime_averages(conn, use_cache)
+
+
+@profiling.profiled()
+def query_runtime_averages(conn):
+    register_functions(conn)
+    return pd.read_sql_query(RUNTIME_AVERAGES_SQL, conn)
+
+
+def runtime_averages(conn, use_cache=True):
+    # the one cached "runtime_averages" (also used by rating_runtime_correlation and the query service);
+    # "mean" keeps entries computed with AVG() by earlier versions from being reused
+    return cached_frame(conn, "runtime_averages", {"table": "movies", "engine": "sql", "mean": "pandas"},
+                        lambda: query_runtime_averages(conn), use_cache)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", default="movies_category_cleaned.csv")
+    ap.add_argument("--db", default=None,
+                    help="read from this SQLite database (with aggregate cache) instead of the CSV")
+    ap.add_argument("--no-cache", action="store_true")
+    profiling.add_arguments(ap)
+    args = ap.parse_args()
+    profiling.configure(args)
+
+    if args.db:
+        avg_by_runtime = load_runtime_averages(args.db, not args.no_cache)
+    else:
+        # load the cleaned data (Parquet copy when fresh), only the two columns used
+        with profiling.stage("read") as st:
+            df = read_artifact(args.csv, columns=["runtime", "rating"])
+            st.rows_out = len(df)
+        avg_by_runtime = average_rating_by_runtime(df)
+
+    # for readability - 2 decimal places
+    avg_by_runtime_2dp = avg_by_runtime.copy()
+    avg_by_runtime_2dp["runtime"] = avg_by_runtime_2dp["runtime"].round(2)
+    avg_by_runtime_2dp["avg_rating"] = avg_by_runtime_2dp["avg_rating"].round(2)
+
+    # save to a CSV file
+    # full version
+    avg_by_runtime.to_csv("avg_rating_by_runtime.csv", index=False)
+    # 2 decimal points version
+    avg_by_runtime_2dp.to_csv("avg_rating_by_runtime_2dp.csv", index=False)
 
-# for readability - 2 decimal places
-avg_by_runtime_2dp = avg_by_runtime.copy()
-avg_by_runtime_2dp["runtime"] = avg_by_runtime_2dp["runtime"].round(2)
-avg_by_runtime_2dp["avg_rating"] = avg_by_runtime_2dp["avg_rating"].round(2)
+    # both can be used. full version is better for further analysis. 2 decimal points version is for reports (clean)
 
-# save to a CSV file
-# full version
-avg_by_runtime.to_csv("avg_rating_by_runtime.csv", index=False)
-# 2 decimal points version
-avg_by_runtime_2dp.to_csv("avg_rating_by_runtime_2dp.csv", index=False)
+    # preview in your console
+    print("Preview (2 d.p.):")
+    print(avg_by_runtime_2dp.head(10))
 
-# both can be used. full version is better for further analysis. 2 decimal points version is for reports (clean)
 
-# preview in your console
-print("Preview (2 d.p.):")
-print(avg_by_runtime_2dp.head(10))
+if __name__ == "__main__":
+    main()
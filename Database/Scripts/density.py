@@ -0,0 +1,159 @@
+"""
+Density-aware scatter plots.
+
+Instead of plotting a random 2000-row sample, every point is counted into a
+fixed bins x bins grid and the grid is drawn as a hexbin or heatmap. The
+rows are streamed from SQLite in chunks and binned with np.bincount, so
+memory and drawing cost depend on the grid size, not on the row count.
+
+density_grid() returns two small frames that can go through the aggregate
+cache: the non-empty cells (ix, iy, count) and a one-row meta frame with the
+grid range, the number of points and the least-squares line over all of them.
+"""
+
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+SCATTER_MODES = ["sample", "hexbin", "heatmap"]
+
+# only values SQLite stores as numbers are plotted (pd.to_numeric would drop the rest)
+NUMERIC_WHERE = "typeof(\"{x}\") IN ('integer', 'real') AND typeof(\"{y}\") IN ('integer', 'real')"
+
+
+def value_range(conn, table, x_col, y_col):
+    # ((x_lo, x_hi), (y_lo, y_hi)) of the numeric pairs; one full scan of the table
+    # (the typeof() filter and the four aggregates rule out SQLite's index min/max lookup)
+    where = NUMERIC_WHERE.format(x=x_col, y=y_col)
+    row = conn.execute(
+        f'SELECT MIN("{x_col}"), MAX("{x_col}"), MIN("{y_col}"), MAX("{y_col}") '
+        f'FROM "{table}" WHERE {where}'
+    ).fetchone()
+    if row[0] is None:
+        return (0.0, 0.0), (0.0, 0.0)
+    return (float(row[0]), float(row[1])), (float(row[2]), float(row[3]))
+
+
+def iter_batches(conn, table, x_col, y_col, batch_size=500_000, shard=0, n_shards=1):
+    """Yield (x, y) float arrays of the numeric pairs in `table`, batch_size rows at a time."""
+    where = NUMERIC_WHERE.format(x=x_col, y=y_col)
+    if n_shards > 1:
+        where += f" AND rowid % {int(n_shards)} = {int(shard)}"
+    cur = conn.execute(f'SELECT "{x_col}", "{y_col}" FROM "{table}" WHERE {where}')
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        xy = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=2 * len(rows))
+        yield xy[0::2], xy[1::2]
+
+
+def cell_index(values, lo, hi, bins):
+    # equal-width cells over [lo, hi]; the maximum lands in the last cell
+    width = (hi - lo) or 1.0
+    idx = ((values - lo) * (bins / width)).astype(np.int64)
+    return np.clip(idx, 0, bins - 1)
+
+
+class DensityGrid:
+    """bins x bins point counts plus the sums needed for a least-squares line."""
+
+    def __init__(self, bins, x_range, y_range):
+        self.bins = bins
+        self.x_lo, self.x_hi = x_range
+        self.y_lo, self.y_hi = y_range
+        self.counts = np.zeros(bins * bins, dtype=np.int64)
+        # sums are taken around the range midpoints to keep the fit well conditioned
+        self.x0 = (self.x_lo + self.x_hi) / 2
+        self.y0 = (self.y_lo + self.y_hi) / 2
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    def add(self, x, y):
+        ix = cell_index(x, self.x_lo, self.x_hi, self.bins)
+        iy = cell_index(y, self.y_lo, self.y_hi, self.bins)
+        self.counts += np.bincount(ix * self.bins + iy, minlength=self.bins * self.bins)
+
+        dx = x - self.x0
+        dy = y - self.y0
+        self.n += len(x)
+        self.sx += dx.sum()
+        self.sy += dy.sum()
+        self.sxx += (dx * dx).sum()
+        self.sxy += (dx * dy).sum()
+
+    def fit(self):
+        denom = self.n * self.sxx - self.sx * self.sx
+        if self.n <= 1 or denom == 0:
+            return np.nan, np.nan
+        m = (self.n * self.sxy - self.sx * self.sy) / denom
+        b = (self.sy - m * self.sx) / self.n
+        # undo the midpoint shift: y - y0 = m (x - x0) + b
+        return m, b + self.y0 - m * self.x0
+
+    def frames(self):
+        cells = np.flatnonzero(self.counts)
+        grid = pd.DataFrame({
+            "ix": cells // self.bins,
+            "iy": cells % self.bins,
+            "count": self.counts[cells],
+        })
+        m, b = self.fit()
+        meta = pd.DataFrame({
+            "bins": [self.bins],
+            "x_lo": [self.x_lo], "x_hi": [self.x_hi],
+            "y_lo": [self.y_lo], "y_hi": [self.y_hi],
+            "n": [self.n], "slope": [m], "intercept": [b],
+        })
+        return grid, meta
+
+
+def density_grid(conn, table, x_col, y_col, bins=100, chunksize=500_000):
+    """Bin every numeric (x, y) pair of `table` into a bins x bins grid -> (grid, meta)."""
+    acc = DensityGrid(bins, *value_range(conn, table, x_col, y_col))
+    for x, y in iter_batches(conn, table, x_col, y_col, chunksize):
+        acc.add(x, y)
+    return acc.frames()
+
+
+def cell_edges(meta):
+    bins = int(meta["bins"].iloc[0])
+    x_lo, x_hi = meta["x_lo"].iloc[0], meta["x_hi"].iloc[0]
+    y_lo, y_hi = meta["y_lo"].iloc[0], meta["y_hi"].iloc[0]
+    return (np.linspace(x_lo, x_hi if x_hi > x_lo else x_lo + 1.0, bins + 1),
+            np.linspace(y_lo, y_hi if y_hi > y_lo else y_lo + 1.0, bins + 1))
+
+
+def draw_density(ax, grid, meta, mode="hexbin", cmap="viridis"):
+    """Draw the grid on `ax` (log colour scale) and return the mappable for a colorbar."""
+    from matplotlib.colors import LogNorm  # ax already means matplotlib is loaded
+    x_edges, y_edges = cell_edges(meta)
+    bins = len(x_edges) - 1
+    if grid.empty:
+        return None
+
+    if mode == "heatmap":
+        counts = np.zeros((bins, bins))
+        counts[grid["ix"], grid["iy"]] = grid["count"]
+        counts = np.ma.masked_equal(counts, 0)
+        return ax.pcolormesh(x_edges, y_edges, counts.T, cmap=cmap, norm=LogNorm(), shading="flat")
+
+    # hexbin over the cell centres, weighted by their counts
+    x_mid = (x_edges[:-1] + x_edges[1:]) / 2
+    y_mid = (y_edges[:-1] + y_edges[1:]) / 2
+    return ax.hexbin(
+        x_mid[grid["ix"]], y_mid[grid["iy"]], C=grid["count"], reduce_C_function=np.sum,
+        gridsize=max(bins // 2, 1), extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+        cmap=cmap, norm=LogNorm(), mincnt=1,
+    )
+
+
+def draw_fit(ax, meta, color="red", fmt=".3f"):
+    m, b = meta["slope"].iloc[0], meta["intercept"].iloc[0]
+    if np.isnan(m):
+        return
+    x_edges, _ = cell_edges(meta)
+    xx = np.linspace(x_edges[0], x_edges[-1], 100)
+    ax.plot(xx, m * xx + b, linewidth=2, color=color, label=f"y = {m:{fmt}}x + {b:{fmt}}")
+    ax.legend()
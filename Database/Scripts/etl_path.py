@@ -0,0 +1,21 @@
+"""
+Makes the DB_Creation modules importable from the analytics scripts.
+
+The ETL scripts in DB_Creation import each other as top-level modules
+(import profiling, from db_loader import ...). The analytics scripts import
+this module first and then use the same names, so every module is loaded
+once: profiling and headless keep one shared state, whichever script
+configured them.
+
+    import etl_path  # noqa: F401  (puts DB_Creation on sys.path)
+    import profiling
+    from db_loader import has_bridge_tables
+"""
+
+import sys
+from pathlib import Path
+
+DB_CREATION = str(Path(__file__).resolve().parent / "DB_Creation")
+
+if DB_CREATION not in sys.path:
+    sys.path.append(DB_CREATION)
@@ -3,31 +3,45 @@ Genre analytics:
 - Average rating per genre (clean DataFrame + CSV)
 - Bar chart of rating vs genre
 - Popular genre dashboard (frequency + avg rating)
-- Scatterplot of rating vs another numeric field (e.g., votes)
+- Scatterplot of rating vs another numeric field (e.g., votes), either a
+  sample of the points or a hexbin/heatmap of all of them (see density.py)
 
 Relies on existing helpers and plotting style from Genre_Avg_Rating_DB.py.
+
+The four figures only need the small aggregated frames, so with --jobs N
+they are rendered in a process pool (Agg backend) instead of one by one.
+matplotlib is imported inside the plot functions, so --help and the data
+loading start without it.
 """
 
 import argparse
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
-from Genre_Avg_Rating_DB import compute_genre_averages_from_df, plot_barh
+import etl_path  # noqa: F401  (DB_Creation on sys.path)
+import profiling
+from Genre_Avg_Rating_DB import ENGINES, load_genre_averages, plot_barh
+from aggregate_cache import cached_frame
+from density import SCATTER_MODES, density_grid, draw_density, draw_fit
+from typed_loader import exact_values, read_typed
 
 
+@profiling.profiled("read")
 def load_movie_columns(db_path: str, table: str, columns) -> pd.DataFrame:
     with sqlite3.connect(db_path) as conn:
         col_clause = ", ".join([f'"{col}"' for col in columns])
         query = f'SELECT {col_clause} FROM "{table}"'
-        return pd.read_sql_query(query, conn)
+        return read_typed(conn, query)
 
 
 def plot_genre_correlation_bar(agg: pd.DataFrame, genre_col: str, rating_col_name: str,
                                out_png: Path, title: str, top_n: int = None):
+    import matplotlib.pyplot as plt
     data = agg
     if top_n:
         data = data.head(top_n)
@@ -46,6 +60,7 @@ def plot_genre_correlation_bar(agg: pd.DataFrame, genre_col: str, rating_col_nam
 
 def plot_genre_dashboard(agg: pd.DataFrame, genre_col: str, rating_col_name: str,
                          out_png: Path, title: str, top_n: int = 15):
+    import matplotlib.pyplot as plt
     top_by_count = agg.sort_values("count", ascending=False).head(top_n)
     top_by_rating = agg.sort_values(rating_col_name, ascending=False).head(top_n)
 
@@ -71,16 +86,24 @@ def plot_genre_dashboard(agg: pd.DataFrame, genre_col: str, rating_col_name: str
     plt.close()
 
 
-def plot_rating_scatter(df: pd.DataFrame, x_col: str, y_col: str,
-                        out_png: Path, title: str):
+@profiling.profiled("scatter_points")
+def scatter_points(df: pd.DataFrame, x_col: str, y_col: str, seed: int = 42) -> pd.DataFrame:
+    # numeric, non-missing points; large frames are downsampled for readability
     df = df.copy()
-    df[x_col] = pd.to_numeric(df[x_col], errors="coerce")
-    df[y_col] = pd.to_numeric(df[y_col], errors="coerce")
+    df[x_col] = pd.to_numeric(exact_values(df[x_col]), errors="coerce")
+    df[y_col] = pd.to_numeric(exact_values(df[y_col]), errors="coerce")
     df = df.dropna(subset=[x_col, y_col])
 
     plot_df = df
     if len(plot_df) > 5000:
-        plot_df = plot_df.sample(2000, random_state=42)
+        plot_df = plot_df.sample(2000, random_state=seed)
+    return plot_df.reset_index(drop=True)
+
+
+def plot_rating_scatter(df: pd.DataFrame, x_col: str, y_col: str,
+                        out_png: Path, title: str):
+    import matplotlib.pyplot as plt
+    plot_df = scatter_points(df, x_col, y_col)
 
     plt.figure(figsize=(8, 6))
     plt.scatter(plot_df[x_col], plot_df[y_col], s=12, alpha=0.35, color="darkorange")
@@ -103,6 +126,68 @@ def plot_rating_scatter(df: pd.DataFrame, x_col: str, y_col: str,
     plt.close()
 
 
+def plot_rating_density(grid: pd.DataFrame, meta: pd.DataFrame, x_col: str, y_col: str,
+                        out_png: Path, title: str, mode: str = "hexbin"):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(8, 6))
+    mappable = draw_density(ax, grid, meta, mode)
+    if mappable is not None:
+        fig.colorbar(mappable, ax=ax, label="Movies per cell")
+    draw_fit(ax, meta)
+
+    ax.set_title(f"{title} (all {int(meta['n'].iloc[0]):,} points)")
+    ax.set_xlabel(x_col.replace("_", " ").title())
+    ax.set_ylabel(y_col.replace("_", " ").title())
+    plt.tight_layout()
+    out_path = Path(out_png)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    plt.savefig(out_path, dpi=300, bbox_inches="tight")
+    plt.close()
+
+
+@profiling.profiled("density")
+def load_density(db_path: str, table: str, x_col: str, y_col: str, bins: int, use_cache: bool = True):
+    # grid + meta are computed in one pass over the table and cached separately
+    params = {"table": table, "x": x_col, "y": y_col, "bins": bins}
+    with sqlite3.connect(db_path) as conn:
+        frames = []
+
+        def computed():
+            if not frames:
+                frames.extend(density_grid(conn, table, x_col, y_col, bins))
+            return frames
+
+        grid = cached_frame(conn, "rating_density", params, lambda: computed()[0], use_cache)
+        meta = cached_frame(conn, "rating_density_meta", params, lambda: computed()[1], use_cache)
+    return grid, meta
+
+
+def init_render_worker():
+    # non-interactive backend, chosen before any figure exists in the worker
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def timed_render(name, func, args):
+    start = time.perf_counter()
+    with profiling.stage(f"render_{name}"):
+        func(*args)
+    return name, time.perf_counter() - start
+
+
+def render_figures(jobs, n_jobs: int = 1):
+    """Render (name, plot_func, args) jobs; returns [(name, seconds)] in job order.
+
+    Each job writes its own PNG, so the files are the same whether they are
+    rendered serially or in parallel.
+    """
+    if n_jobs <= 1 or len(jobs) <= 1:
+        return [timed_render(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(jobs)), initializer=init_render_worker) as pool:
+        futures = [pool.submit(timed_render, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--db", default="./movies.db")
@@ -122,30 +207,71 @@ def main():
     ap.add_argument("--scatter-x", default="votes")
     ap.add_argument("--scatter-png", default="./rating_vs_votes_scatter.png")
     ap.add_argument("--scatter-title", default="Rating vs Votes (scatter)")
+    ap.add_argument("--engine", choices=ENGINES, default="auto",
+                    help="genre averages engine, see Genre_Avg_Rating_DB.py (auto = sql on a "
+                         "loader-built database, else pandas; bridge may differ in the last digit)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="always recompute instead of using the aggregate cache in the database")
+    ap.add_argument("--seed", type=int, default=42, help="random_state of the scatter downsample")
+    ap.add_argument("--scatter-mode", choices=SCATTER_MODES, default="sample",
+                    help="sample = scatter of up to 2000 sampled points, hexbin/heatmap = density of all points")
+    ap.add_argument("--bins", type=int, default=100, help="grid size of the hexbin/heatmap scatter")
+    ap.add_argument("--jobs", type=int, default=1, help="render the figures in this many processes")
+    profiling.add_arguments(ap)
     args = ap.parse_args()
+    profiling.configure(args)
 
-    cols_to_load = {args.genre_col, args.rating_col, args.scatter_x}
-    df = load_movie_columns(args.db, args.table, list(cols_to_load))
+    # only the (sampled) scatter points or the density grid are needed from the raw rows,
+    # and they are cached
+    if args.scatter_mode == "sample":
+        cols_to_load = {args.rating_col, args.scatter_x}
+        with sqlite3.connect(args.db) as conn:
+            scatter_df = cached_frame(
+                conn, "rating_scatter",
+                {"table": args.table, "x": args.scatter_x, "y": args.rating_col, "seed": args.seed},
+                lambda: scatter_points(load_movie_columns(args.db, args.table, list(cols_to_load)),
+                                       args.scatter_x, args.rating_col, args.seed),
+                not args.no_cache,
+            )
+        scatter_job = ("scatter", plot_rating_scatter,
+                       (scatter_df, args.scatter_x, args.rating_col, args.scatter_png, args.scatter_title))
+    else:
+        grid, meta = load_density(args.db, args.table, args.scatter_x, args.rating_col,
+                                  args.bins, not args.no_cache)
+        scatter_job = ("scatter", plot_rating_density,
+                       (grid, meta, args.scatter_x, args.rating_col, args.scatter_png,
+                        args.scatter_title, args.scatter_mode))
 
-    genre_avg = compute_genre_averages_from_df(
-        df[[args.genre_col, args.rating_col]],
+    genre_avg = load_genre_averages(
+        args.db,
+        args.table,
         args.genre_col,
         args.rating_col,
         args.delimiter,
-        args.min_count
-    )
+        args.min_count,
+        args.engine,
+        not args.no_cache
+    ).rename(columns={"genre": args.genre_col})
 
     out_csv = Path(args.out_csv)
     out_csv.parent.mkdir(parents=True, exist_ok=True)
     genre_avg.to_csv(out_csv, index=False)
 
-    plot_barh(genre_avg, args.genre_col, "avg_rating", args.avg_rating_bar_png, args.avg_rating_title)
-    plot_genre_correlation_bar(genre_avg, args.genre_col, "avg_rating",
-                               args.genre_corr_png, args.genre_corr_title)
-    plot_genre_dashboard(genre_avg, args.genre_col, "avg_rating",
-                         args.dashboard_png, args.dashboard_title, args.dashboard_top_n)
-    plot_rating_scatter(df, args.scatter_x, args.rating_col,
-                        args.scatter_png, args.scatter_title)
+    jobs = [
+        ("avg_rating_bar", plot_barh,
+         (genre_avg, args.genre_col, "avg_rating", args.avg_rating_bar_png, args.avg_rating_title)),
+        ("genre_corr", plot_genre_correlation_bar,
+         (genre_avg, args.genre_col, "avg_rating", args.genre_corr_png, args.genre_corr_title)),
+        ("dashboard", plot_genre_dashboard,
+         (genre_avg, args.genre_col, "avg_rating", args.dashboard_png, args.dashboard_title,
+          args.dashboard_top_n)),
+        scatter_job,
+    ]
+    start = time.perf_counter()
+    timings = render_figures(jobs, args.jobs)
+    for name, seconds in timings:
+        print(f"Rendered {name} in {seconds:.2f}s")
+    print(f"Rendered {len(jobs)} figures in {time.perf_counter() - start:.2f}s (jobs={args.jobs})")
 
     print(f"Saved: {out_csv}")
     print(f"Saved: {args.avg_rating_bar_png}")
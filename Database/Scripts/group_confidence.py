@@ -0,0 +1,148 @@
+"""
+Bootstrap confidence intervals and shrunk averages per group.
+
+A bare mean ranks a genre with 3 movies (or a director with one film) next to
+genres with thousands; these columns show how much each average can be trusted:
+
+- shrunk_rating: Bayesian average, the group mean pulled towards the overall
+  mean by prior_weight pseudo-movies: (n * mean + m * overall) / (n + m)
+- ci_low / ci_high: percentile bootstrap interval of the group mean
+
+Resampling is one vectorized draw per unit of work: a (resamples x n) index
+matrix for a large group, or, when it has few distinct values (ratings are
+rounded to 2 decimals), a (resamples x distinct) multinomial count matrix,
+which is the same resampling distribution at a fraction of the cost. Small
+groups of equal size (the many one- and two-film directors) are stacked and
+resampled together. Units are spread over a process pool; each has its own
+seed, so the result does not depend on the number of jobs.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# cap on the size of one resample index matrix (elements)
+MAX_BLOCK = 4_000_000
+
+# groups up to this size are stacked by size and resampled together
+SMALL_GROUP = 1000
+
+
+def shrunk_means(means, counts, overall_mean, prior_weight):
+    return (counts * means + prior_weight * overall_mean) / (counts + prior_weight)
+
+
+def bootstrap_means(values, n_resamples, rng):
+    """Resampled means of equal-size groups: values (groups x n) -> (groups x resamples)."""
+    n_groups, n = values.shape
+    if n == 1:
+        return np.repeat(values, n_resamples, axis=1)
+
+    if n_groups == 1:
+        distinct, freq = np.unique(values[0], return_counts=True)
+        if len(distinct) * 4 < n:
+            # how often each distinct value is drawn in each resample
+            picks = rng.multinomial(n, freq / n, size=n_resamples)
+            return (picks @ distinct / n)[None, :]
+
+    means = np.empty((n_groups, n_resamples))
+    flat = values.ravel()
+    offsets = (np.arange(n_groups) * n)[:, None, None]
+    resample_block = max(1, MAX_BLOCK // (n_groups * n))
+    for start in range(0, n_resamples, resample_block):
+        stop = min(start + resample_block, n_resamples)
+        idx = rng.integers(0, n, size=(n_groups, stop - start, n), dtype=np.int64)
+        means[:, start:stop] = np.take(flat, idx + offsets).sum(axis=2) / n
+    return means
+
+
+def bootstrap_unit(unit, n_resamples, confidence):
+    # unit: (group positions, values matrix, seed sequence) -> (positions, low, high)
+    positions, values, seed = unit
+    tail = (1 - confidence) / 2
+    means = bootstrap_means(values, n_resamples, np.random.default_rng(seed))
+    low, high = np.quantile(means, [tail, 1 - tail], axis=1)
+    return positions, low, high
+
+
+def bootstrap_batch(units, n_resamples, confidence):
+    return [bootstrap_unit(unit, n_resamples, confidence) for unit in units]
+
+
+def resample_units(values, counts):
+    # large groups on their own, small groups stacked by size (a few hundred per unit)
+    units = []
+    for pos in np.flatnonzero(counts > SMALL_GROUP):
+        units.append((np.array([pos]), values[pos][None, :]))
+    for size in np.unique(counts[counts <= SMALL_GROUP]):
+        same = np.flatnonzero(counts == size)
+        step = max(1, MAX_BLOCK // (size * 100))
+        for start in range(0, len(same), step):
+            chunk = same[start:start + step]
+            units.append((chunk, np.vstack([values[pos] for pos in chunk])))
+    return units
+
+
+def split_batches(sizes, n_batches):
+    # greedy: largest units first, each into the currently lightest batch
+    batches = [[] for _ in range(n_batches)]
+    loads = [0] * n_batches
+    for pos in np.argsort(sizes, kind="stable")[::-1]:
+        lightest = loads.index(min(loads))
+        batches[lightest].append(pos)
+        loads[lightest] += sizes[pos]
+    return [b for b in batches if b]
+
+
+def group_intervals(df: pd.DataFrame, group_col: str, value_col: str, n_resamples: int = 1000,
+                    confidence: float = 0.95, prior_weight: float = None, seed: int = 42,
+                    n_jobs: int = 1) -> pd.DataFrame:
+    """Per group: count, mean, shrunk_rating, ci_low, ci_high (groups in sorted order).
+
+    prior_weight defaults to the median group size.
+    """
+    df = df[[group_col, value_col]].copy()
+    df[value_col] = pd.to_numeric(df[value_col], errors="coerce")
+    df = df.dropna()
+
+    # one stable sort instead of iterating the groupby (100k+ directors)
+    codes, keys = pd.factorize(df[group_col], sort=True)
+    if len(keys) == 0:
+        return pd.DataFrame({group_col: keys, "count": np.empty(0, dtype=np.int64),
+                             **{col: np.empty(0) for col in
+                                ["mean", "shrunk_rating", "ci_low", "ci_high"]}})
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=len(keys))
+    values = np.split(df[value_col].to_numpy(dtype=np.float64)[order], np.cumsum(counts)[:-1])
+    means = df.groupby(codes)[value_col].mean().to_numpy()
+
+    if prior_weight is None:
+        prior_weight = float(np.median(counts)) if len(counts) else 0.0
+    overall = df[value_col].mean()
+
+    units = resample_units(values, counts)
+    seeds = np.random.SeedSequence(seed).spawn(len(units))
+    units = [(positions, matrix, unit_seed) for (positions, matrix), unit_seed in zip(units, seeds)]
+    if n_jobs <= 1 or len(units) <= 1:
+        parts = bootstrap_batch(units, n_resamples, confidence)
+    else:
+        batches = split_batches([matrix.size for _, matrix, _ in units], n_jobs)
+        with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+            futures = [pool.submit(bootstrap_batch, [units[i] for i in batch], n_resamples, confidence)
+                       for batch in batches]
+            parts = [part for future in futures for part in future.result()]
+
+    low = np.empty(len(values))
+    high = np.empty(len(values))
+    for positions, lo, hi in parts:
+        low[positions], high[positions] = lo, hi
+
+    return pd.DataFrame({
+        group_col: keys,
+        "count": counts,
+        "mean": means,
+        "shrunk_rating": shrunk_means(means, counts, overall, prior_weight),
+        "ci_low": low,
+        "ci_high": high,
+    })
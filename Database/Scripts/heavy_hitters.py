@@ -0,0 +1,128 @@
+"""
+Streaming top-N (heavy hitters) for the director / star rankings.
+
+The exact path explodes every stars string and runs value_counts, which
+builds a hash table of every person in the dataset. streaming_top_rows()
+instead reads the rows in batches and makes two passes:
+
+1. A Space-Saving summary with `capacity` counters per column. Each batch is
+   counted with a groupby (bounded by the batch) and merged in: a name that
+   is not monitored yet starts at the summary's floor (the largest count an
+   unmonitored name can have), and beyond `capacity` the lowest counters
+   are dropped (which raises the floor). Estimated counts never undercount,
+   and every name that occurs more than total / capacity times is kept.
+   Rating sums are carried per counter, as an estimate.
+2. An exact pass over the candidates only: the rows of the monitored names
+   are kept, counted and averaged exactly, and the top_n are picked by count
+   with ties broken by first appearance, like value_counts.
+
+The result is provably the exact top_n when the n-th exact count is above
+the floor (no unmonitored name can reach it); info["exact"] says so, and
+the caller can fall back to the exact path otherwise. Memory is bounded by
+the batch size, the capacity and the candidates' rows.
+
+tests/test_heavy_hitters.py checks it against the exact path on a synthetic
+Zipf-distributed cast.
+"""
+
+import numpy as np
+import pandas as pd
+
+CAPACITY = 2000
+BATCH_SIZE = 50_000
+
+
+def explode_names(df, col, delimiter=","):
+    # comma-joined names -> one row per name, stripped (the index repeats per row)
+    df = df.copy()
+    df[col] = df[col].str.split(delimiter)
+    df = df.explode(col)
+    df[col] = df[col].str.strip()
+    return df
+
+
+def exact_top_rows(df, col, top_n=50, delimiter=None):
+    """Rows of the top_n most frequent names in `col` (split on delimiter if given)."""
+    if delimiter is not None:
+        df = explode_names(df, col, delimiter)
+    top = df[col].value_counts().head(top_n).index
+    return df[df[col].isin(top)].reset_index(drop=True)
+
+
+class SpaceSaving:
+    """Space-Saving summary over batches: at most `capacity` counters."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.floor = 0  # no unmonitored name occurs more often than this
+        self.table = pd.DataFrame({"count": pd.Series(dtype=np.int64),
+                                   "error": pd.Series(dtype=np.int64),
+                                   "rating_sum": pd.Series(dtype=np.float64)})
+        self.seen = 0
+
+    def update(self, names, ratings):
+        ok = names.notna().to_numpy()
+        names, ratings = names[ok], ratings[ok]
+        self.seen += len(names)
+        if not len(names):
+            return self
+        local = (pd.DataFrame({"name": names.to_numpy(), "rating": ratings.to_numpy()})
+                 .groupby("name", sort=False)["rating"].agg(count="size", rating_sum="sum"))
+        # a newly monitored name may already have occurred up to `floor` times
+        new = ~local.index.isin(self.table.index)
+        local["error"] = np.where(new, self.floor, 0)
+        local["count"] += local["error"]
+
+        table = pd.concat([self.table, local[["count", "error", "rating_sum"]]])
+        table = table.groupby(level=0, sort=False).sum()
+        if len(table) > self.capacity:
+            table = table.nlargest(self.capacity, "count", keep="first")
+            self.floor = max(self.floor, int(table["count"].min()))
+        self.table = table
+        return self
+
+
+def streaming_top_rows(read_batches, columns, top_n=50, capacity=CAPACITY, rating_col="rating"):
+    """Top-n rows per column from batches, in two passes and bounded memory.
+
+    read_batches() returns a fresh iterator of DataFrames (e.g. a chunked
+    pd.read_sql_query); columns maps a column to its delimiter, or None for
+    single-valued columns. Returns ({col: rows}, {col: info}) where rows
+    match exact_top_rows() and info has the exact top list (name, count,
+    avg_rating), the sketch floor and whether the result is guaranteed exact.
+    """
+    def names_of(batch, col, delimiter):
+        return explode_names(batch, col, delimiter) if delimiter is not None else batch
+
+    # pass 1: candidates (only the name and rating columns are exploded)
+    sketches = {col: SpaceSaving(capacity) for col in columns}
+    for batch in read_batches():
+        for col, delimiter in columns.items():
+            rows = names_of(batch[[col, rating_col]], col, delimiter)
+            sketches[col].update(rows[col], rows[rating_col])
+
+    # pass 2: exact counts, sums and rows of the candidates only
+    kept = {col: [] for col in columns}
+    offsets = {col: 0 for col in columns}
+    candidates = {col: sketch.table.index for col, sketch in sketches.items()}
+    for batch in read_batches():
+        for col, delimiter in columns.items():
+            rows = names_of(batch, col, delimiter).reset_index(drop=True)
+            rows.index += offsets[col]  # position in the whole (exploded) stream
+            offsets[col] += len(rows)
+            kept[col].append(rows[rows[col].isin(candidates[col])])
+
+    results, info = {}, {}
+    for col in columns:
+        rows = pd.concat(kept[col]) if kept[col] else pd.DataFrame(columns=[col, rating_col])
+        # groupby(sort=False) keeps first-appearance order, the stable sort keeps it among ties
+        stats = (rows.groupby(col, sort=False)[rating_col]
+                 .agg(count="size", avg_rating="mean")
+                 .sort_values("count", ascending=False, kind="stable")
+                 .head(top_n))
+        floor = sketches[col].floor
+        exact = floor == 0 or (len(stats) == top_n and int(stats["count"].iloc[-1]) > floor)
+        results[col] = rows[rows[col].isin(stats.index)].reset_index(drop=True)
+        info[col] = {"top": stats.reset_index(), "floor": floor, "exact": exact,
+                     "candidates": len(candidates[col]), "names_seen": sketches[col].seen}
+    return results, info
@@ -0,0 +1,132 @@
+"""
+Import-time budget for the command-line entry points.
+
+Runs `python -X importtime <script> --help` for every entry point and checks
+two things:
+- none of the heavy optional libraries (matplotlib, seaborn, sklearn, scipy,
+  openai) is imported just to print the help; the scripts import them inside
+  the functions that plot / fit / call the API
+- the total import time stays under the budget (--budget-ms; pandas alone is
+  about half of the default)
+
+tests/test_import_budget.py asserts both rules for every entry point, so the
+test suite fails after a change that adds imports. Run this module for the
+per-script table (exits with status 1 on a failure as well).
+
+Usage (from Database/Scripts):
+    python -m pytest tests/test_import_budget.py
+    python import_budget.py
+    python import_budget.py --budget-ms 800 ML_LLM.py
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+ENTRY_POINTS = [
+    "Genre_Avg_Rating_DB.py",
+    "genre_analytics_dashboard.py",
+    "rating_runtime_correlation.py",
+    "avg_rating_per_runtime.py",
+    "Stars-Director-Rating-Visualisation.py",
+    "ML_LLM.py",
+    "query_service.py",
+    "service_load_test.py",
+    "DB_Creation/pipeline.py",
+    "DB_Creation/Normalize.py",
+    "DB_Creation/Column_Drop.py",
+    "DB_Creation/data_cleaning.py",
+    "DB_Creation/Encode_Categorical.py",
+    "DB_Creation/DB-Schema-after-cleaning.py",
+    "DB_Creation/boxplot_rows_drop.py",
+    "DB_Creation/data_profile.py",
+]
+
+LAZY_MODULES = ["matplotlib", "seaborn", "sklearn", "scipy", "openai"]
+
+BUDGET_MS = 1000
+
+
+def parse_importtime(stderr):
+    """-X importtime output -> [(module, self_us, cumulative_us, depth)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        # "import time:       611 |     481840 |   pandas.core" (2 spaces per nesting level)
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure(script, python=sys.executable):
+    path = HERE / script
+    proc = subprocess.run([python, "-X", "importtime", str(path), "--help"], cwd=path.parent,
+                          env=dict(os.environ, MPLBACKEND="Agg"), capture_output=True, text=True)
+    rows = parse_importtime(proc.stderr)
+    top = [(name, cumulative) for name, _, cumulative, depth in rows if depth == 0]
+    loaded = {name.split(".")[0] for name, *_ in rows}
+    return {
+        "script": script,
+        "ok": proc.returncode == 0,
+        "import_ms": round(sum(cumulative for _, cumulative in top) / 1000, 1),
+        "heaviest": [(name, round(cumulative / 1000, 1))
+                     for name, cumulative in sorted(top, key=lambda t: -t[1])[:3]],
+        "lazy_loaded": [name for name in LAZY_MODULES if name in loaded],
+    }
+
+
+def fastest(script, repeat=3, budget_ms=None):
+    # best of `repeat` runs; with a budget, stop at the first run within it
+    best = None
+    for _ in range(max(1, repeat)):
+        result = measure(script)
+        if best is None or result["import_ms"] < best["import_ms"]:
+            best = result
+        if budget_ms is not None and best["import_ms"] <= budget_ms:
+            break
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check the --help import time of the entry points.")
+    ap.add_argument("scripts", nargs="*", default=ENTRY_POINTS,
+                    help="entry points relative to Database/Scripts (default: all)")
+    ap.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="allowed import time per entry point")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per entry point; the fastest counts")
+    ap.add_argument("--json", default=None, metavar="FILE", help="also write the results as JSON")
+    args = ap.parse_args()
+
+    results, failed = [], 0
+    for script in args.scripts:
+        result = fastest(script, args.repeat)
+        problems = []
+        if not result["ok"]:
+            problems.append("--help failed")
+        if result["lazy_loaded"]:
+            problems.append("imports " + ", ".join(result["lazy_loaded"]))
+        if result["import_ms"] > args.budget_ms:
+            problems.append(f"over {args.budget_ms:.0f} ms")
+        result["problems"] = problems
+        failed += bool(problems)
+        results.append(result)
+
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in result["heaviest"])
+        print(f"{script:<42}{result['import_ms']:>8.0f} ms  {'FAIL: ' + '; '.join(problems) if problems else 'ok':<10}"
+              f"  ({heaviest})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"budget_ms": args.budget_ms, "results": results}, fh, indent=2)
+    if failed:
+        sys.exit(f"{failed} entry point(s) over the import budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+LLM access for ML_LLM.py: pluggable backends behind a response cache.
+
+- OpenAIBackend: one OpenAI / AsyncOpenAI client per backend, created on
+  first use and reused (its HTTP connection pool with it), with a request
+  timeout. openai is only imported when this backend is actually used.
+- StubBackend: deterministic local answers built from the prompt, for runs
+  without network or API key (tests, CI, offline demos).
+- ResponseCache: one JSON file per (backend, model, messages) hash. Entries
+  expire after ttl seconds; beyond max_entries the least recently used ones
+  are deleted (a hit refreshes the file's mtime).
+- LLMClient: complete() / acomplete() / astream() go through the cache,
+  complete_many() runs several prompts concurrently with asyncio, and
+  fan_out() streams one request per name with at most max_concurrency in
+  flight, so the total time follows the slowest answer, not the sum.
+
+The backend is chosen with --llm (or MOVIES_LLM_BACKEND=stub|openai).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from aggregate_cache import cache_key
+
+BACKENDS = ["openai", "stub"]
+DEFAULT_MODEL = "gpt-4"
+
+LLM_CACHE_DIR = Path(".llm_cache")
+CACHE_TTL = 7 * 24 * 3600
+CACHE_MAX_ENTRIES = 256
+
+
+class OpenAIBackend:
+    name = "openai"
+
+    def __init__(self, timeout=60.0, max_retries=2, **client_kwargs):
+        self.client_kwargs = dict(timeout=timeout, max_retries=max_retries, **client_kwargs)
+        self.client = None
+        self.async_client = None
+        self.async_loop = None
+
+    def sync_client(self):
+        if self.client is None:
+            from openai import OpenAI
+            self.client = OpenAI(**self.client_kwargs)
+        return self.client
+
+    def aio_client(self):
+        # the async connection pool belongs to one event loop (one asyncio.run)
+        loop = asyncio.get_running_loop()
+        if self.async_client is None or self.async_loop is not loop:
+            from openai import AsyncOpenAI
+            self.async_client = AsyncOpenAI(**self.client_kwargs)
+            self.async_loop = loop
+        return self.async_client
+
+    def complete(self, messages, model):
+        response = self.sync_client().chat.completions.create(model=model, messages=messages)
+        return response.choices[0].message.content
+
+    async def acomplete(self, messages, model):
+        response = await self.aio_client().chat.completions.create(model=model, messages=messages)
+        return response.choices[0].message.content
+
+    async def astream(self, messages, model):
+        stream = await self.aio_client().chat.completions.create(model=model, messages=messages,
+                                                                 stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class StubBackend:
+    """Offline backend: the same messages always give the same answer."""
+
+    name = "stub"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def answer(self, messages, model):
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        lines = [line.strip() for line in prompt.splitlines() if line.strip().startswith("- ")]
+        return f"[stub {model} {digest}] Summary of {len(lines)} points:\n" + "\n".join(lines)
+
+    def complete(self, messages, model):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.answer(messages, model)
+
+    async def acomplete(self, messages, model):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.answer(messages, model)
+
+    async def astream(self, messages, model):
+        # word by word, the delay spread over the whole answer
+        tokens = self.answer(messages, model).split(" ")
+        for i, token in enumerate(tokens):
+            if self.delay:
+                await asyncio.sleep(self.delay / len(tokens))
+            yield token if i == 0 else " " + token
+
+
+def make_backend(name=None, **kwargs):
+    name = name or os.environ.get("MOVIES_LLM_BACKEND") or "openai"
+    if name == "stub":
+        return StubBackend(**kwargs)
+    if name == "openai":
+        return OpenAIBackend(**kwargs)
+    raise ValueError(f"unknown LLM backend {name!r} (expected one of {BACKENDS})")
+
+
+class ResponseCache:
+    def __init__(self, cache_dir=LLM_CACHE_DIR, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    def path(self, backend, model, messages):
+        key, _ = cache_key("llm", {"backend": backend, "model": model, "messages": messages})
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, backend, model, messages):
+        path = self.path(backend, model, messages)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                entry = json.load(fh)
+            created, response = float(entry["created"]), entry["response"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None  # missing, or not an entry this class wrote
+        if self.ttl is not None and time.time() - created > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # LRU: a hit counts as a use
+        return response
+
+    def put(self, backend, model, messages, response):
+        path = self.path(backend, model, messages)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"created": time.time(), "model": model, "response": response}, fh)
+            os.replace(tmp, path)
+            self.evict()
+        except OSError:
+            pass  # read-only location: just don't cache
+
+    def evict(self):
+        entries = sorted(self.cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in entries[:max(0, len(entries) - self.max_entries)]:
+            path.unlink(missing_ok=True)
+
+
+class LLMClient:
+    def __init__(self, backend=None, cache=None, model=DEFAULT_MODEL):
+        self.backend = backend if backend is not None else make_backend()
+        self.cache = cache
+        self.model = model
+
+    def cached(self, messages):
+        if self.cache is None:
+            return None
+        return self.cache.get(self.backend.name, self.model, messages)
+
+    def store(self, messages, response):
+        if self.cache is not None:
+            self.cache.put(self.backend.name, self.model, messages, response)
+        return response
+
+    def complete(self, messages):
+        response = self.cached(messages)
+        if response is None:
+            response = self.store(messages, self.backend.complete(messages, self.model))
+        return response
+
+    async def acomplete(self, messages):
+        response = self.cached(messages)
+        if response is None:
+            response = self.store(messages, await self.backend.acomplete(messages, self.model))
+        return response
+
+    async def acomplete_many(self, message_lists):
+        return await asyncio.gather(*(self.acomplete(messages) for messages in message_lists))
+
+    def complete_many(self, message_lists):
+        """Answers for several prompts, requested concurrently (in order of message_lists)."""
+        return asyncio.run(self.acomplete_many(message_lists))
+
+    async def astream(self, messages):
+        """Yield the answer as it arrives (a cached answer comes as one piece)."""
+        response = self.cached(messages)
+        if response is not None:
+            yield response
+            return
+        parts = []
+        async for token in self.backend.astream(messages, self.model):
+            parts.append(token)
+            yield token
+        self.store(messages, "".join(parts))
+
+    async def afan_out(self, requests, max_concurrency=4, on_token=None):
+        """{name: messages} -> {name: answer}; on_token(name, token) sees every streamed piece."""
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run(name, messages):
+            async with semaphore:
+                parts = []
+                async for token in self.astream(messages):
+                    parts.append(token)
+                    if on_token is not None:
+                        on_token(name, token)
+                return "".join(parts)
+
+        names = list(requests)
+        answers = await asyncio.gather(*(run(name, requests[name]) for name in names))
+        return dict(zip(names, answers))
+
+    def fan_out(self, requests, max_concurrency=4, on_token=None):
+        return asyncio.run(self.afan_out(requests, max_concurrency, on_token))
+
+
+def add_arguments(ap):
+    ap.add_argument("--llm", choices=BACKENDS, default=None,
+                    help="LLM backend (default: MOVIES_LLM_BACKEND or openai); stub needs no network")
+    ap.add_argument("--model", default=DEFAULT_MODEL)
+    ap.add_argument("--llm-timeout", type=float, default=60.0, help="seconds per request")
+    ap.add_argument("--llm-base-url", default=None,
+                    help="OpenAI-compatible endpoint, e.g. a local server (default: OPENAI_BASE_URL / api.openai.com)")
+    ap.add_argument("--llm-concurrency", type=int, default=4, help="requests in flight at once")
+    ap.add_argument("--no-llm-cache", action="store_true", help="always call the backend")
+    ap.add_argument("--llm-cache-dir", default=str(LLM_CACHE_DIR))
+    ap.add_argument("--llm-cache-ttl", type=float, default=CACHE_TTL, help="seconds a cached answer is reused")
+
+
+def client_from_args(args):
+    name = args.llm or os.environ.get("MOVIES_LLM_BACKEND") or "openai"
+    if name == "openai":
+        backend = make_backend(name, timeout=args.llm_timeout, base_url=args.llm_base_url)
+    else:
+        backend = make_backend(name)
+    cache = None if args.no_llm_cache else ResponseCache(args.llm_cache_dir, args.llm_cache_ttl)
+    return LLMClient(backend, cache, args.model)
@@ -0,0 +1,211 @@
+"""
+Regression models behind the ML_LLM insights.
+
+- runtime vs rating: LinearRegression on the runtime column
+- stars / directors vs rating: Ridge regression on a sparse one-hot matrix
+  (movies x people). The (movie, person) pairs come from the movie_person
+  bridge table when it exists, otherwise from exploding the comma-joined
+  columns; either way the matrix is built straight from the pair codes with
+  scipy.sparse, never as a dense frame. A person's coefficient is their
+  rating effect with the other people on the same films held fixed.
+
+Fitted models are pickled to a cache directory under a key that hashes the
+training arrays, the model parameters and the sklearn / Python versions, so a
+rerun on unchanged data loads the model instead of training it again. A cache
+file that can't be unpickled is treated as a miss and overwritten.
+
+scipy and sklearn are imported inside the functions that fit, so loading
+the data (and ML_LLM.py --help) doesn't pay their import time.
+"""
+
+import hashlib
+import pickle
+import platform
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import etl_path  # noqa: F401  (DB_Creation on sys.path)
+from aggregate_cache import cache_key
+from db_loader import has_bridge_tables
+from typed_loader import exact_values, read_typed
+
+# only the columns the models use (was SELECT *)
+MOVIES_SQL = "SELECT id, runtime, rating, director, stars FROM movies"
+
+PERSON_PAIRS_SQL = """
+SELECT mp.movie_id, mp.role, p.name
+FROM movie_person mp
+JOIN people p ON p.id = mp.person_id
+ORDER BY mp.rowid
+"""
+
+ROLE_COLUMNS = {"star": "stars", "director": "director"}
+
+MODEL_CACHE_DIR = Path(".model_cache")
+
+
+def load_movies(conn):
+    return read_typed(conn, MOVIES_SQL)
+
+
+def load_person_pairs(conn, movies):
+    """(movie, role, name) rows, movie being the row position in `movies`.
+
+    Returns None when the database has no bridge tables.
+    """
+    if not has_bridge_tables(conn):
+        return None
+    pairs = pd.read_sql_query(PERSON_PAIRS_SQL, conn)
+    rows = pd.Index(movies["id"]).get_indexer(pairs["movie_id"])
+    pairs = pairs[rows >= 0]
+    return pd.DataFrame({"movie": rows[rows >= 0], "role": pairs["role"].to_numpy(),
+                         "name": pairs["name"].to_numpy()})
+
+
+def split_pairs(movies, role):
+    # no bridge tables: explode the comma-joined column like the stars script does
+    names = movies[ROLE_COLUMNS[role]].astype(object).str.split(",").explode().str.strip()
+    names = names[names.notna() & (names != "")]
+    return pd.DataFrame({"movie": names.index.to_numpy(), "role": role,
+                         "name": names.to_numpy(dtype=object)})
+
+
+def ratings(movies):
+    return pd.to_numeric(exact_values(movies["rating"]), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def one_hot(pairs, n_movies, min_movies=1):
+    """Sparse movies x people indicator matrix -> (csr matrix, names, movies per person).
+
+    People on fewer than min_movies films get no column.
+    """
+    from scipy import sparse
+
+    codes, names = pd.factorize(pairs["name"])
+    rows = pairs["movie"].to_numpy()
+    x = sparse.csr_matrix((np.ones(len(codes), dtype=np.float64), (rows, codes)),
+                          shape=(n_movies, len(names)))
+    x.sum_duplicates()
+    x.data[:] = 1.0  # someone listed twice on a film still counts once
+
+    counts = np.diff(x.tocsc().indptr)
+    keep = np.flatnonzero(counts >= min_movies)
+    return x[:, keep], np.asarray(names, dtype=object)[keep], counts[keep]
+
+
+def data_hash(*arrays):
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype, array.shape)).encode("utf-8"))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def fit_cached(name, make_model, x, y, params, cache_dir=MODEL_CACHE_DIR):
+    """make_model().fit(x, y), or the pickled fit of an identical earlier run."""
+    import sklearn
+    from scipy import sparse
+
+    if sparse.issparse(x):
+        arrays = (x.indptr, x.indices, x.data, np.array(x.shape), y)
+    else:
+        arrays = (x, y)
+    # a pickle is only loaded by the sklearn / Python that wrote it
+    versions = {"sklearn": sklearn.__version__, "python": platform.python_version()}
+    key, _ = cache_key(name, {**params, **versions, "data": data_hash(*arrays)})
+
+    path = Path(cache_dir) / f"{name}-{key}.pkl" if cache_dir is not None else None
+    if path is not None and path.exists():
+        try:
+            with open(path, "rb") as fh:
+                return pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass  # truncated or unreadable: fit again and overwrite it
+
+    model = make_model().fit(x, y)
+    if path is not None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as fh:
+                pickle.dump(model, fh)
+        except OSError:
+            pass  # read-only location: just don't cache
+    return model
+
+
+def holdout_split(n, test_share=0.2, seed=42):
+    order = np.random.default_rng(seed).permutation(n)
+    n_test = int(round(n * test_share))
+    return np.sort(order[n_test:]), np.sort(order[:n_test])
+
+
+def r2_score(y, predicted):
+    total = ((y - y.mean()) ** 2).sum()
+    if len(y) < 2 or total == 0:
+        return np.nan
+    return 1 - ((y - predicted) ** 2).sum() / total
+
+
+def runtime_model(movies, cache_dir=MODEL_CACHE_DIR):
+    from sklearn.linear_model import LinearRegression
+
+    x = pd.to_numeric(exact_values(movies["runtime"]), errors="coerce").to_numpy(dtype=np.float64)
+    y = ratings(movies)
+    ok = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[ok], y[ok]
+    if len(x) < 2:
+        return {"n_movies": int(len(x))}
+
+    model = fit_cached("runtime_rating", LinearRegression, x[:, None], y, {}, cache_dir)
+    return {
+        "n_movies": int(len(x)),
+        "pearson_r": float(np.corrcoef(x, y)[0, 1]),
+        "slope": float(model.coef_[0]),
+        "intercept": float(model.intercept_),
+        "r2": float(r2_score(y, model.predict(x[:, None]))),
+    }
+
+
+def people_model(movies, pairs, role, alpha=1.0, min_movies=3, top_n=10, cache_dir=MODEL_CACHE_DIR):
+    """Ridge fit of rating on who is in the film -> insight dict for one role."""
+    from sklearn.linear_model import Ridge
+
+    if pairs is None:
+        pairs = split_pairs(movies, role)
+    else:
+        pairs = pairs[pairs["role"] == role]
+
+    y = ratings(movies)
+    rated = ~np.isnan(y)
+    pairs = pairs[rated[pairs["movie"].to_numpy()]]
+    x, names, counts = one_hot(pairs, len(movies), min_movies)
+    x, y = x[rated], y[rated]
+    if x.shape[1] == 0 or len(y) < 2:
+        return {"n_movies": int(len(y)), "n_people": 0}
+
+    params = {"alpha": alpha, "role": role}
+    train, test = holdout_split(len(y))
+    # the holdout fit scores the features, the full fit gives the coefficients
+    holdout = fit_cached(f"{role}_rating_holdout", lambda: Ridge(alpha=alpha), x[train], y[train],
+                         params, cache_dir)
+    model = fit_cached(f"{role}_rating", lambda: Ridge(alpha=alpha), x, y, params, cache_dir)
+
+    effects = pd.DataFrame({"name": names, "effect": model.coef_, "movies": counts})
+    effects = effects.sort_values(["effect", "movies"], ascending=False, kind="stable")
+
+    def rows(frame):
+        return [{"name": r.name, "effect": round(float(r.effect), 4), "movies": int(r.movies)}
+                for r in frame.itertuples(index=False)]
+
+    return {
+        "n_movies": int(len(y)),
+        "n_people": int(len(names)),
+        "min_movies": min_movies,
+        "r2_holdout": float(r2_score(y[test], holdout.predict(x[test]))),
+        "top": rows(effects.head(top_n)),
+        "bottom": rows(effects.tail(top_n).iloc[::-1]),
+    }
+
@@ -0,0 +1,378 @@
+"""
+Long-running JSON query service over movies.db.
+
+The one-shot scripts pay interpreter start-up, imports and a cold page cache
+on every run. This service pays them once and then answers the dashboard
+queries over HTTP from the same aggregation functions:
+
+    GET /health                                   status, load generation, pool size
+    GET /genres?engine=auto&min_count=1           Genre_Avg_Rating_DB.genre_averages
+    GET /runtime                                  avg_rating_per_runtime.runtime_averages
+    GET /runtime/stats?engine=pandas              correlations, bins and fit
+                                                  (rating_runtime_correlation.compute_runtime_stats)
+    GET /movies?min_rating=8&limit=10             rows like Sample_Query.py (limit <= 1000)
+    GET /count                                    number of movies
+
+Every answer is {"generation": ..., "rows": [...]} (/runtime/stats has one
+list per frame), with the column names of the scripts' CSVs.
+
+- Queries run in a thread pool on a fixed set of read-only connections
+  (mode=ro, PRAGMA query_only, mmap_size), so SQLite reads pages through the
+  mmap and at most --pool queries touch the database at once.
+- Encoded answers are kept in an in-memory LRU. The key includes the
+  database file's size and mtime (and its -wal file's), so a reload is
+  picked up on the next request without touching SQLite for hot answers.
+  Identical requests that miss at the same time share one computation.
+- Below that, the aggregate cache in movies.db (aggregate_cache.py) is
+  still read; the service never writes to the database.
+
+Only the standard library is used for HTTP (HTTP/1.1 with keep-alive, GET
+only), so it needs nothing beyond the scripts' own dependencies. It binds
+to 127.0.0.1 by default and is meant for local dashboards, not the internet.
+
+Usage (from Database/Scripts):
+    python query_service.py --db movies.db --port 8765
+    python service_load_test.py --url http://127.0.0.1:8765 --clients 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import etl_path  # noqa: F401  (DB_Creation on sys.path)
+from Genre_Avg_Rating_DB import ENGINES, genre_averages, register_functions
+from aggregate_cache import cache_key
+from avg_rating_per_runtime import runtime_averages
+from db_loader import has_bridge_tables, load_generation
+from rating_runtime_correlation import compute_runtime_stats
+
+POOL_SIZE = 4
+MMAP_SIZE = 256 * 1024 ** 2
+CACHE_ENTRIES = 256
+MAX_LIMIT = 1000
+MAX_HEADER_BYTES = 16 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class NotFound(Exception):
+    pass
+
+
+#############################################
+# Read-only connection pool
+#############################################
+
+def open_readonly(db_path, mmap_size=MMAP_SIZE):
+    # mode=ro fails on a missing file instead of creating an empty database
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    register_functions(conn)  # pandas_mean for the sql genre engine
+    return conn
+
+
+class ConnectionPool:
+    """A fixed set of connections; each one is used by one thread at a time."""
+
+    def __init__(self, db_path, size=POOL_SIZE, mmap_size=MMAP_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sqlite")
+        self.idle = asyncio.Queue()
+        for _ in range(size):
+            self.idle.put_nowait(open_readonly(db_path, mmap_size))
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self.idle.get()
+        try:
+            yield conn
+        finally:
+            self.idle.put_nowait(conn)
+
+    async def run(self, func, *args):
+        """func(conn, *args) in the thread pool, on an idle connection."""
+        async with self.connection() as conn:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, conn, *args)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+#############################################
+# Queries (run in the pool threads)
+#############################################
+
+def records(df):
+    # NaN -> null; numpy scalars -> Python numbers (json.dumps keeps float64 exact)
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def query_genres(conn, params, use_cache):
+    engine = params.get("engine", "auto")
+    if engine not in ENGINES:
+        raise BadRequest(f"engine must be one of {ENGINES}")
+    if engine == "bridge" and not has_bridge_tables(conn):
+        raise BadRequest("this database has no bridge tables; use engine=auto, pandas or sql")
+    df = genre_averages(conn, delimiter=params.get("delimiter", ","),
+                        min_count=int_param(params, "min_count", 1), engine=engine,
+                        use_cache=use_cache)
+    return {"rows": records(df)}
+
+
+def query_runtime(conn, params, use_cache):
+    return {"rows": records(runtime_averages(conn, use_cache))}
+
+
+def query_runtime_stats(conn, params, use_cache):
+    engine = params.get("engine", "pandas")
+    if engine not in ("pandas", "streaming"):
+        raise BadRequest("engine must be pandas or streaming")
+    stats = compute_runtime_stats(conn, use_cache, engine, need_sample=False)
+    return {name: records(df) for name, df in stats.items()}
+
+
+def query_movies(conn, params, use_cache):
+    min_rating = float_param(params, "min_rating", None)
+    limit = min(int_param(params, "limit", 10), MAX_LIMIT)
+    if min_rating is None:
+        rows = conn.execute("SELECT movie, rating FROM movies LIMIT ?", (limit,)).fetchall()
+    else:
+        rows = conn.execute("SELECT movie, rating FROM movies WHERE rating > ? LIMIT ?",
+                            (min_rating, limit)).fetchall()
+    return {"rows": [{"movie": movie, "rating": rating} for movie, rating in rows]}
+
+
+def query_count(conn, params, use_cache):
+    return {"rows": [{"movies": conn.execute("SELECT COUNT(*) FROM movies").fetchone()[0]}]}
+
+
+ROUTES = {
+    "/genres": query_genres,
+    "/runtime": query_runtime,
+    "/runtime/stats": query_runtime_stats,
+    "/movies": query_movies,
+    "/count": query_count,
+}
+
+
+def int_param(params, name, default):
+    try:
+        return int(params[name]) if name in params else default
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer") from None
+
+
+def float_param(params, name, default):
+    try:
+        return float(params[name]) if name in params else default
+    except ValueError:
+        raise BadRequest(f"{name} must be a number") from None
+
+
+def run_query(conn, route, params, use_cache):
+    """Runs in a pool thread: the query plus the JSON encoding, off the event loop."""
+    result = ROUTES[route](conn, params, use_cache)
+    return json.dumps({"generation": load_generation(conn), **result}).encode("utf-8")
+
+
+#############################################
+# Service
+#############################################
+
+class QueryService:
+    def __init__(self, db_path, pool_size=POOL_SIZE, mmap_size=MMAP_SIZE,
+                 cache_entries=CACHE_ENTRIES, use_cache=True):
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, pool_size, mmap_size)
+        self.cache_entries = cache_entries if use_cache else 0
+        self.use_cache = use_cache
+        self.cache = OrderedDict()
+        self.in_flight = {}
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "shared": 0}
+
+    def data_version(self):
+        # changes with every committed write (rollback journal or WAL)
+        version = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                st = os.stat(path)
+                version += [st.st_mtime_ns, st.st_size]
+            except OSError:
+                version += [None, None]
+        return tuple(version)
+
+    async def answer(self, route, params):
+        if route not in ROUTES:
+            raise NotFound(route)
+        self.stats["requests"] += 1
+        key = (cache_key(route, params)[0], self.data_version())
+
+        body = self.cache.get(key)
+        if body is not None:
+            self.cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return body
+
+        # concurrent misses for the same answer wait for the first one
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            self.stats["shared"] += 1
+            return await asyncio.shield(pending)
+
+        self.stats["misses"] += 1
+        future = asyncio.ensure_future(self.pool.run(run_query, route, params, self.use_cache))
+        self.in_flight[key] = future
+        try:
+            body = await asyncio.shield(future)
+        finally:
+            del self.in_flight[key]
+        if self.cache_entries:
+            self.cache[key] = body
+            while len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+        return body
+
+    async def health(self):
+        generation = await self.pool.run(load_generation)
+        return json.dumps({"status": "ok", "generation": generation, "pool": self.pool.size,
+                           "cached": len(self.cache), **self.stats}).encode("utf-8")
+
+    async def respond(self, method, target):
+        if method not in ("GET", "HEAD"):
+            return 405, error_body("only GET is supported")
+        url = urlsplit(target)
+        route = url.path.rstrip("/") or "/"
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            if route == "/health":
+                return 200, await self.health()
+            return 200, await self.answer(route, params)
+        except NotFound:
+            return 404, error_body(f"unknown path {url.path}; try {', '.join(['/health', *ROUTES])}")
+        except ValueError as exc:  # bad parameters, e.g. the bridge engine on a db without bridge tables
+            return 400, error_body(str(exc))
+        except (sqlite3.Error, pd.errors.DatabaseError) as exc:
+            return 503, error_body(f"database error: {exc}")
+        except Exception as exc:  # keep serving; the traceback goes to the log
+            traceback.print_exc()
+            return 500, error_body(f"{type(exc).__name__}: {exc}")
+
+    async def handle(self, reader, writer):
+        # one keep-alive HTTP/1.1 connection; requests are answered in order
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await write_response(writer, 400, error_body("request header too large"), False)
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ")
+                except ValueError:
+                    await write_response(writer, 400, error_body("malformed request line"), False)
+                    break
+                headers = dict(line.split(":", 1) for line in header_lines if ":" in line)
+                headers = {name.strip().lower(): value.strip() for name, value in headers.items()}
+                try:
+                    content_length = int(headers.get("content-length", 0) or 0)
+                    if content_length < 0:
+                        raise ValueError(content_length)
+                except ValueError:
+                    await write_response(writer, 400, error_body("invalid Content-Length"), False)
+                    break
+                if content_length:
+                    try:
+                        await reader.readexactly(content_length)  # GET bodies are ignored
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        break
+
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                status, body = await self.respond(method, target)
+                await write_response(writer, status, b"" if method == "HEAD" else body, keep_alive,
+                                     content_length=len(body))
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def close(self):
+        self.pool.close()
+
+
+def error_body(message):
+    return json.dumps({"error": message}).encode("utf-8")
+
+
+async def write_response(writer, status, body, keep_alive, content_length=None):
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body) if content_length is None else content_length}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+async def serve(args):
+    service = QueryService(args.db, args.pool, args.mmap_mb * 1024 ** 2, args.cache_entries,
+                           not args.no_cache)
+    server = await asyncio.start_server(service.handle, args.host, args.port, limit=MAX_HEADER_BYTES)
+    port = server.sockets[0].getsockname()[1]
+    print(f"Serving {args.db} on http://{args.host}:{port} (pool={args.pool})", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve the movies.db aggregates as JSON over HTTP.")
+    ap.add_argument("--db", default="movies.db")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765, help="0 = any free port")
+    ap.add_argument("--pool", type=int, default=POOL_SIZE, help="read-only connections / query threads")
+    ap.add_argument("--mmap-mb", type=int, default=MMAP_SIZE // 1024 ** 2, help="PRAGMA mmap_size per connection")
+    ap.add_argument("--cache-entries", type=int, default=CACHE_ENTRIES, help="answers kept in memory")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="compute every answer (no in-memory answers, no aggregate cache reads)")
+    args = ap.parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"no database at {args.db}")
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print(f"Stopped after {time.perf_counter() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
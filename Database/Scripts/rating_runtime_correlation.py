@@ -1,106 +1,286 @@
+import argparse
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-
-# load data from database and select relevant columns
-conn = sqlite3.connect("movies.db")
-df = pd.read_sql_query("SELECT runtime, rating FROM movies", conn)
-
-# convert to numeric
-df['runtime'] = pd.to_numeric(df['runtime'], errors='coerce')
-df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
-
-# drop rows with missing values
-df = df.dropna(subset=['runtime', 'rating'])
-
-# average rating for each runtime
-avg_by_runtime = (
-    df.groupby("runtime", as_index=False)["rating"]
-      .mean()
-      .rename(columns={"rating": "avg_rating"})
-      .sort_values("runtime")
-)
-
-avg_by_runtime.to_csv("avg_rating_by_runtime.csv", index=False)
-
-# Correlations (Pearson for linear, Spearman for monotonic)
-pearson_r  = df[["runtime", "rating"]].corr(method="pearson").loc["runtime", "rating"]
-spearman_r = df[["runtime", "rating"]].corr(method="spearman").loc["runtime", "rating"]
-
-corr_df = pd.DataFrame({
-    "method": ["Pearson r", "Spearman r"],
-    "correlation": [pearson_r, spearman_r],
-})
-# r^2 for Pearson r correlation
-corr_df["r_squared (pearson)"] = [pearson_r ** 2, None]
-corr_df.round(4).to_csv("runtime_rating_correlations.csv", index=False)
-
-# bar chart of correlations
-plt.figure(figsize=(6, 5))
-plt.bar(corr_df["method"], corr_df["correlation"])
-plt.title("Correlation between Rating and Runtime")
-plt.xlabel("Correlation method")
-plt.ylabel("Correlation coefficient (r)")
-plt.tight_layout()
-plt.show()
 
+import etl_path  # noqa: F401  (DB_Creation on sys.path)
+import headless
+import profiling
+headless.select_backend()
+
+from aggregate_cache import cached_frame
+from avg_rating_per_runtime import runtime_averages
+from density import SCATTER_MODES, density_grid, draw_density, value_range
+from streaming_stats import count_pairs, interval_mids, merge_summaries, pick_pairs, summarize
 
 # Bin runtime into 20 equal-width bins in [0, 1]
 bins = np.linspace(0, 1, 21)
-df["runtime_bin"] = pd.cut(df["runtime"], bins=bins, include_lowest=True)
-
-# Average rating in each bin
-avg_by_bin = (
-    df.groupby("runtime_bin", observed=False)["rating"]
-    .mean()
-    . reset_index()
-    .rename(columns={"rating": "avg_rating"})
-)
-
-# Use bin midpoints for a nicer numeric x-axis
-bin_mid = avg_by_bin["runtime_bin"].apply(lambda iv: iv.mid)
-
-plt.figure(figsize=(9, 5))
-plt.bar(bin_mid, avg_by_bin["avg_rating"], width=(bins[1] - bins[0]) * 0.9)
-plt.title("Average Rating by Runtime (0–1)")
-plt.xlabel("Runtime")
-plt.ylabel("Average Rating (0–1)")
-plt.xlim(0, 1)
-plt.ylim(0, 1)
-plt.tight_layout()
-plt.savefig("avg_rating_by_runtime.png", dpi=150)
-plt.show()
-
-# Save the table (with midpoints) for your report
-# avg_by_bin.assign(runtime_mid=bin_mid).to_csv("avg_rating_by_runtime_bins.csv", index=False)
-
-# scatterplot with sample
-plot_df = df
-if len(plot_df) > 5000:  # downsample for readability/perf
-    plot_df = plot_df.sample(2000, random_state=42)
-
-x = df["runtime"].to_numpy()
-y = df["rating"].to_numpy()
-if len(x) > 1:
+
+
+@profiling.profiled("read")
+def load_runtime_rating(conn):
+    # load data from database and select relevant columns
+    df = pd.read_sql_query("SELECT runtime, rating FROM movies", conn)
+
+    # convert to numeric
+    df['runtime'] = pd.to_numeric(df['runtime'], errors='coerce')
+    df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
+
+    # drop rows with missing values
+    return df.dropna(subset=['runtime', 'rating'])
+
+
+@profiling.profiled()
+def compute_correlations(df):
+    # Correlations (Pearson for linear, Spearman for monotonic)
+    pearson_r  = df[["runtime", "rating"]].corr(method="pearson").loc["runtime", "rating"]
+    spearman_r = df[["runtime", "rating"]].corr(method="spearman").loc["runtime", "rating"]
+
+    corr_df = pd.DataFrame({
+        "method": ["Pearson r", "Spearman r"],
+        "correlation": [pearson_r, spearman_r],
+    })
+    # r^2 for Pearson r correlation
+    corr_df["r_squared (pearson)"] = [pearson_r ** 2, None]
+    return corr_df
+
+
+@profiling.profiled()
+def average_rating_by_bin(df):
+    runtime_bin = pd.cut(df["runtime"], bins=bins, include_lowest=True)
+
+    # Average rating in each bin
+    avg_by_bin = (
+        df.groupby(runtime_bin, observed=False)["rating"]
+        .mean()
+        . reset_index()
+        .rename(columns={"rating": "avg_rating"})
+    )
+
+    # Use bin midpoints for a nicer numeric x-axis
+    avg_by_bin["runtime_mid"] = avg_by_bin["runtime"].apply(lambda iv: iv.mid).astype(float)
+    return avg_by_bin[["runtime_mid", "avg_rating"]]
+
+
+@profiling.profiled()
+def fit_line(df):
+    # least-squares line over all points (the scatter itself is sampled)
+    x = df["runtime"].to_numpy()
+    y = df["rating"].to_numpy()
+    if len(x) <= 1:
+        return pd.DataFrame({"slope": [], "intercept": []})
     m, b = np.polyfit(x, y, 1)
-    xx = np.linspace(0, 1, 100)
-    yy = m * xx + b
-    plt.figure(figsize=(7, 5))
-    plt.scatter(plot_df["runtime"], plot_df["rating"], s=6, alpha=0.15)
-    plt.plot(xx, yy, linewidth=2, label=f'y = {m:.4f}x + {b:.4f}', color='red')
-    plt.title("Runtime vs Rating (sampled 2000 movies and shows)")
-    plt.xlabel("Runtime (0–1 Normalized)")
-    plt.ylabel("Rating (0–1 Normalized)")
+    return pd.DataFrame({"slope": [m], "intercept": [b]})
+
+
+SAMPLE_ABOVE, SAMPLE_SIZE, SAMPLE_SEED = 5000, 2000, 42
+
+
+def scatter_sample(df):
+    # scatterplot with sample
+    plot_df = df
+    if len(plot_df) > SAMPLE_ABOVE:  # downsample for readability/perf
+        plot_df = plot_df.sample(SAMPLE_SIZE, random_state=SAMPLE_SEED)
+    return plot_df[["runtime", "rating"]].reset_index(drop=True)
+
+
+@profiling.profiled()
+def streamed_sample(conn):
+    # the rows scatter_sample() would pick, without loading the table: DataFrame.sample
+    # draws its positions with RandomState.choice, so the same draw over the row count
+    # selects the same rows, which are then picked out of one batched pass
+    total = count_pairs(conn, "movies", "runtime", "rating")
+    positions = np.arange(total)
+    if total > SAMPLE_ABOVE:
+        positions = np.random.RandomState(SAMPLE_SEED).choice(total, SAMPLE_SIZE, replace=False)
+    x, y = pick_pairs(conn, "movies", "runtime", "rating", positions)
+    return pd.DataFrame({"runtime": x, "rating": y})
+
+
+def compute_runtime_density(conn, bins=100, use_cache=True):
+    # all runtime/rating pairs binned into a bins x bins grid (one pass, cached)
+    frames = []
+
+    def computed():
+        if not frames:
+            frames.extend(density_grid(conn, "movies", "runtime", "rating", bins))
+        return frames
+
+    params = {"table": "movies", "bins": bins}
+    grid = cached_frame(conn, "runtime_rating_density", params, lambda: computed()[0], use_cache)
+    meta = cached_frame(conn, "runtime_rating_density_meta", params, lambda: computed()[1], use_cache)
+    return grid, meta
+
+
+def summarize_shard(db_path, x_range, y_range, shard=0, n_shards=1):
+    with sqlite3.connect(db_path) as conn:
+        return summarize(conn, "movies", "runtime", "rating", x_range, y_range, bins,
+                         shard=shard, n_shards=n_shards)
+
+
+@profiling.profiled()
+def streaming_summary(conn, db_path, shards=1):
+    # one fetchmany pass per shard (rowid % shards), merged afterwards
+    x_range, y_range = value_range(conn, "movies", "runtime", "rating")
+    if shards <= 1:
+        return summarize(conn, "movies", "runtime", "rating", x_range, y_range, bins)
+    with ProcessPoolExecutor(max_workers=shards) as pool:
+        futures = [pool.submit(summarize_shard, db_path, x_range, y_range, shard, shards)
+                   for shard in range(shards)]
+        return merge_summaries([future.result() for future in futures])
+
+
+def streaming_frames(summary):
+    # the same frames compute_correlations / average_rating_by_bin / fit_line return
+    stats, ranks, binned = summary
+    pearson_r, spearman_r = stats.pearson(), ranks.spearman()
+    corr_df = pd.DataFrame({
+        "method": ["Pearson r", "Spearman r"],
+        "correlation": [pearson_r, spearman_r],
+    })
+    corr_df["r_squared (pearson)"] = [pearson_r ** 2, None]
+
+    avg_by_bin = pd.DataFrame({"runtime_mid": interval_mids(bins), "avg_rating": binned.means()})
+
+    m, b = stats.fit()
+    fit = pd.DataFrame({"slope": [], "intercept": []}) if np.isnan(m) else \
+        pd.DataFrame({"slope": [m], "intercept": [b]})
+    return {"correlations": corr_df, "avg_by_bin": avg_by_bin, "fit": fit}
+
+
+def compute_runtime_stats(conn, use_cache=True, engine="pandas", db_path=None, shards=1,
+                          need_sample=True):
+    # every aggregate is cached separately in movies.db; the raw rows are only
+    # loaded (once) when one of them has to be recomputed. The per-runtime averages
+    # are a SQL GROUP BY, and with the streaming engine the table is never loaded:
+    # correlations, bins and fit come from one fetchmany pass, the sample from another.
+    rows = []
+    summary = []
+
+    def data():
+        if not rows:
+            rows.append(load_runtime_rating(conn))
+        return rows[0]
+
+    def streamed(name):
+        if not summary:
+            summary.append(streaming_frames(streaming_summary(conn, db_path, shards)))
+        return summary[0][name]
+
+    params = {"table": "movies"}
+    stats = {"avg_by_runtime": runtime_averages(conn, use_cache)}
+    if engine == "streaming":
+        stream_params = {"table": "movies", "engine": "streaming"}
+        for key, name in [("correlations", "runtime_correlations"), ("avg_by_bin", "runtime_bins"),
+                          ("fit", "runtime_fit")]:
+            stats[key] = cached_frame(conn, name, stream_params, lambda key=key: streamed(key), use_cache)
+    else:
+        stats["correlations"] = cached_frame(conn, "runtime_correlations", params,
+                                             lambda: compute_correlations(data()), use_cache)
+        stats["avg_by_bin"] = cached_frame(conn, "runtime_bins", params,
+                                           lambda: average_rating_by_bin(data()), use_cache)
+        stats["fit"] = cached_frame(conn, "runtime_fit", params, lambda: fit_line(data()), use_cache)
+    if need_sample:
+        sample = (lambda: streamed_sample(conn)) if engine == "streaming" else \
+            (lambda: scatter_sample(data()))
+        stats["sample"] = cached_frame(conn, "runtime_scatter_sample", params, sample, use_cache)
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="movies.db")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="always recompute instead of using the aggregate cache in the database")
+    ap.add_argument("--scatter-mode", choices=SCATTER_MODES, default="sample",
+                    help="sample = 2000 sampled points, hexbin/heatmap = density of all points")
+    ap.add_argument("--bins", type=int, default=100, help="grid size of the hexbin/heatmap scatter")
+    ap.add_argument("--engine", choices=["pandas", "streaming"], default="pandas",
+                    help="streaming = never load the table: correlations, bins and fit from one "
+                         "chunked pass, the scatter sample from another")
+    ap.add_argument("--shards", type=int, default=1,
+                    help="with --engine streaming, summarize this many rowid shards in parallel and merge")
+    headless.add_arguments(ap)
+    profiling.add_arguments(ap)
+    args = ap.parse_args()
+    headless.configure(args)
+    profiling.configure(args)
+
+    conn = sqlite3.connect(args.db)
+    stats = compute_runtime_stats(conn, not args.no_cache, args.engine, args.db, args.shards,
+                                  need_sample=args.scatter_mode == "sample")
+    if args.scatter_mode != "sample":
+        grid, meta = compute_runtime_density(conn, args.bins, not args.no_cache)
+    conn.close()
+
+    # average rating for each runtime
+    stats["avg_by_runtime"].to_csv("avg_rating_by_runtime.csv", index=False)
+
+    corr_df = stats["correlations"]
+    corr_df.round(4).to_csv("runtime_rating_correlations.csv", index=False)
+
+    # matplotlib only from here on, so --help and the data work start without it
+    import matplotlib.pyplot as plt
+
+    # bar chart of correlations
+    plt.figure(figsize=(6, 5))
+    plt.bar(corr_df["method"], corr_df["correlation"])
+    plt.title("Correlation between Rating and Runtime")
+    plt.xlabel("Correlation method")
+    plt.ylabel("Correlation coefficient (r)")
+    plt.tight_layout()
+    with profiling.stage("render_correlation_bar"):
+        headless.show("runtime_rating_correlation_bar.png")
+
+    avg_by_bin = stats["avg_by_bin"]
+
+    plt.figure(figsize=(9, 5))
+    plt.bar(avg_by_bin["runtime_mid"], avg_by_bin["avg_rating"], width=(bins[1] - bins[0]) * 0.9)
+    plt.title("Average Rating by Runtime (0–1)")
+    plt.xlabel("Runtime")
+    plt.ylabel("Average Rating (0–1)")
     plt.xlim(0, 1)
     plt.ylim(0, 1)
     plt.tight_layout()
-    plt.savefig("runtime_rating_scatterplot.png", dpi=150)
-    plt.show()
+    with profiling.stage("render_runtime_bins"):
+        plt.savefig(headless.output_path("avg_rating_by_runtime.png"), dpi=150)
+        headless.show()
+
+    # Save the table (with midpoints) for your report
+    # avg_by_bin.to_csv("avg_rating_by_runtime_bins.csv", index=False)
+
+    plot_df = stats.get("sample")
+    fit = stats["fit"]
+    if len(fit):
+        m, b = fit["slope"].iloc[0], fit["intercept"].iloc[0]
+        xx = np.linspace(0, 1, 100)
+        yy = m * xx + b
+        plt.figure(figsize=(7, 5))
+        if args.scatter_mode == "sample":
+            plt.scatter(plot_df["runtime"], plot_df["rating"], s=6, alpha=0.15)
+            plt.title("Runtime vs Rating (sampled 2000 movies and shows)")
+        else:
+            # every movie counted into the grid instead of a 2000-row sample
+            mappable = draw_density(plt.gca(), grid, meta, args.scatter_mode)
+            if mappable is not None:
+                plt.colorbar(mappable, label="Movies per cell")
+            plt.title(f"Runtime vs Rating (all {int(meta['n'].iloc[0]):,} movies and shows)")
+        plt.plot(xx, yy, linewidth=2, label=f'y = {m:.4f}x + {b:.4f}', color='red')
+        plt.xlabel("Runtime (0–1 Normalized)")
+        plt.ylabel("Rating (0–1 Normalized)")
+        plt.xlim(0, 1)
+        plt.ylim(0, 1)
+        plt.tight_layout()
+        with profiling.stage("render_scatter"):
+            plt.savefig(headless.output_path("runtime_rating_scatterplot.png"), dpi=150)
+            headless.show()
+
+    print("CSV saved and PNG created.")
 
 
-conn.close()
-print("CSV saved and PNG created.")
+if __name__ == "__main__":
+    main()
 
 # the correlations show a strong negative correlation between runtime and rating
 # ratings tends to go DOWN as runtime goes UP
@@ -110,4 +290,4 @@ print("CSV saved and PNG created.")
 # 20 bins, so it's not too vague nor too messy
 
 # scatterplot shows overall pattern and highlights density and outliers.
-# downwards direction so there's a negative correlation, but not a strong one
\ No newline at end of file
+# downwards direction so there's a negative correlation, but not a strong one
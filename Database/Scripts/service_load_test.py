@@ -0,0 +1,183 @@
+"""
+Load test for query_service.py: N concurrent keep-alive clients on localhost.
+
+Each client opens one connection and sends its requests back to back,
+cycling through --paths. The report gives p50 / p90 / p99 / max latency and
+the throughput, overall and per path.
+
+With --db the service is started in a subprocess on a free port (and
+stopped afterwards), so one command measures a cold start too: the first
+round of requests is timed separately from the rest (--warmup).
+
+Usage (from Database/Scripts):
+    python service_load_test.py --db movies.db --clients 1 8 32 --requests 200
+    python service_load_test.py --url http://127.0.0.1:8765 --clients 32 --out load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+HERE = Path(__file__).resolve().parent
+
+DEFAULT_PATHS = ["/genres", "/genres?engine=sql&min_count=10", "/runtime", "/runtime/stats",
+                 "/movies?min_rating=0.8&limit=50", "/count"]
+
+
+def percentile(sorted_values, share):
+    # nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(share * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, seconds):
+    values = sorted(latencies)
+    ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        "requests": len(values),
+        "rps": round(len(values) / max(seconds, 1e-9), 1),
+        "p50_ms": ms(percentile(values, 0.50)),
+        "p90_ms": ms(percentile(values, 0.90)),
+        "p99_ms": ms(percentile(values, 0.99)),
+        "max_ms": ms(values[-1] if values else None),
+    }
+
+
+async def get(reader, writer, host, path):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    return status, body
+
+
+async def client(host, port, paths, n_requests, offset, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(n_requests):
+            path = paths[(offset + i) % len(paths)]
+            start = time.perf_counter()
+            status, _ = await get(reader, writer, host, path)
+            results.append((path, status, time.perf_counter() - start))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_clients(host, port, paths, n_clients, n_requests):
+    results = []
+    start = time.perf_counter()
+    # clients start on different paths, so every path is requested concurrently
+    await asyncio.gather(*(client(host, port, paths, n_requests, i, results) for i in range(n_clients)))
+    return results, time.perf_counter() - start
+
+
+def report(results, seconds, paths):
+    ok = [latency for _, status, latency in results if status == 200]
+    summary = summarize(ok, seconds)
+    summary["errors"] = sum(status != 200 for _, status, _ in results)
+    summary["paths"] = {path: summarize([lat for p, status, lat in results if p == path and status == 200],
+                                        seconds) for path in paths}
+    return summary
+
+
+def host_port(url):
+    """http://host[:port] -> (host, port), port 80 when the URL has none."""
+    parts = urlsplit(url)
+    if parts.scheme != "http" or not parts.hostname:
+        raise ValueError(f"expected a URL like http://127.0.0.1:8765, got {url!r}")
+    return parts.hostname, parts.port or 80
+
+
+def start_service(args):
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    cmd = [sys.executable, str(HERE / "query_service.py"), "--db", args.db, "--port", "0",
+           "--pool", str(args.pool)]
+    if args.no_cache:
+        cmd.append("--no-cache")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, env=env)
+    line = proc.stdout.readline()  # "Serving movies.db on http://127.0.0.1:PORT (pool=4)"
+    if not line.startswith("Serving"):
+        proc.kill()
+        raise SystemExit(f"query_service.py did not start: {line!r}")
+    return proc, line.split("http://", 1)[1].split(" ", 1)[0]
+
+
+def print_row(label, summary):
+    print(f"{label:<42}{summary['requests']:>7}{summary['rps']:>10.0f}"
+          f"{summary['p50_ms'] or 0:>10.2f}{summary['p90_ms'] or 0:>10.2f}"
+          f"{summary['p99_ms'] or 0:>10.2f}{summary['max_ms'] or 0:>10.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="p50/p99 latency of query_service.py under concurrent clients.")
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="a running service, e.g. http://127.0.0.1:8765")
+    target.add_argument("--db", help="start query_service.py on this database for the test")
+    ap.add_argument("--clients", type=int, nargs="+", default=[8], help="concurrent clients (one run each)")
+    ap.add_argument("--requests", type=int, default=100, help="requests per client")
+    ap.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    ap.add_argument("--warmup", type=int, default=1,
+                    help="rounds over --paths before timing (reported separately as the cold start)")
+    ap.add_argument("--pool", type=int, default=4, help="with --db: the service's connection pool")
+    ap.add_argument("--no-cache", action="store_true", help="with --db: start the service with --no-cache")
+    ap.add_argument("--out", default=None, help="JSON report")
+    args = ap.parse_args()
+
+    proc = None
+    if args.db:
+        proc, address = start_service(args)
+        host, port = host_port(f"http://{address}")
+    else:
+        try:
+            host, port = host_port(args.url)
+        except ValueError as exc:
+            ap.error(str(exc))
+        address = f"{host}:{port}"
+
+    report_json = {"address": address, "paths": args.paths, "runs": []}
+    try:
+        if args.warmup:
+            results, seconds = asyncio.run(run_clients(host, port, args.paths, 1,
+                                                       args.warmup * len(args.paths)))
+            report_json["warmup"] = report(results, seconds, args.paths)
+
+        print(f"{'':<42}{'reqs':>7}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        if args.warmup:
+            print_row("warmup (1 client, cold)", report_json["warmup"])
+        for n_clients in args.clients:
+            results, seconds = asyncio.run(run_clients(host, port, args.paths, n_clients, args.requests))
+            run = {"clients": n_clients, **report(results, seconds, args.paths)}
+            report_json["runs"].append(run)
+            print_row(f"{n_clients} clients", run)
+            for path, summary in run["paths"].items():
+                print_row(f"  {path}", summary)
+            if run["errors"]:
+                print(f"  {run['errors']} requests failed")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report_json, fh, indent=2)
+        print("Saved:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Single-pass statistics over (x, y) pairs streamed from SQLite.
+
+The rows are read in fetchmany() batches and folded into small accumulators,
+so memory does not grow with the number of rows:
+
+- PairStats: count, means, variances and covariance (Welford, with Chan's
+  formula to fold in a whole batch at once) -> Pearson r, least-squares line
+- RankSketch: joint histogram of x and y on a fixed grid. Cell mid-ranks give
+  an approximate Spearman r; it is exact when every distinct value falls in
+  its own cell (the normalized columns are rounded to 2 decimals, so any grid
+  of 101+ cells over [0, 1] is exact).
+- BinnedMeans: mean of y per fixed x bin (the runtime bar chart)
+
+pick_pairs() fetches the pairs at given row positions (e.g. a random sample)
+in one more pass, keeping only those rows.
+
+The batches come from density.iter_batches(). Every accumulator has merge(),
+so shards of the table (e.g. id % n) can be summarized in separate processes
+and combined afterwards.
+"""
+
+import numpy as np
+import pandas as pd
+
+from density import NUMERIC_WHERE, iter_batches
+
+
+class PairStats:
+    def __init__(self):
+        self.n = 0
+        self.mean_x = self.mean_y = 0.0
+        self.m2_x = self.m2_y = self.c_xy = 0.0
+
+    def update(self, x, y):
+        if len(x) == 0:
+            return
+        batch = PairStats()
+        batch.n = len(x)
+        batch.mean_x, batch.mean_y = x.mean(), y.mean()
+        dx, dy = x - batch.mean_x, y - batch.mean_y
+        batch.m2_x, batch.m2_y, batch.c_xy = (dx * dx).sum(), (dy * dy).sum(), (dx * dy).sum()
+        self.merge(batch)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta_x = other.mean_x - self.mean_x
+        delta_y = other.mean_y - self.mean_y
+        w = self.n * other.n / n
+        self.m2_x += other.m2_x + delta_x * delta_x * w
+        self.m2_y += other.m2_y + delta_y * delta_y * w
+        self.c_xy += other.c_xy + delta_x * delta_y * w
+        self.mean_x += delta_x * other.n / n
+        self.mean_y += delta_y * other.n / n
+        self.n = n
+        return self
+
+    def pearson(self):
+        if self.n <= 1 or self.m2_x == 0 or self.m2_y == 0:
+            return np.nan
+        return self.c_xy / np.sqrt(self.m2_x * self.m2_y)
+
+    def fit(self):
+        # least-squares y = m x + b
+        if self.n <= 1 or self.m2_x == 0:
+            return np.nan, np.nan
+        m = self.c_xy / self.m2_x
+        return m, self.mean_y - m * self.mean_x
+
+
+class RankSketch:
+    def __init__(self, x_range, y_range, bins=1000):
+        self.bins = bins
+        self.x_range = tuple(x_range)
+        self.y_range = tuple(y_range)
+        self.counts = np.zeros(bins * bins, dtype=np.int64)
+
+    def cells(self, values, lo, hi):
+        width = (hi - lo) or 1.0
+        idx = np.floor((values - lo) * (self.bins / width) + 1e-9).astype(np.int64)
+        return np.clip(idx, 0, self.bins - 1)
+
+    def update(self, x, y):
+        ix = self.cells(x, *self.x_range)
+        iy = self.cells(y, *self.y_range)
+        self.counts += np.bincount(ix * self.bins + iy, minlength=self.bins * self.bins)
+
+    def merge(self, other):
+        if (other.bins, other.x_range, other.y_range) != (self.bins, self.x_range, self.y_range):
+            raise ValueError("rank sketches must share the same grid to be merged")
+        self.counts += other.counts
+        return self
+
+    def spearman(self):
+        joint = self.counts.reshape(self.bins, self.bins).astype(np.float64)
+
+        def mid_ranks(marginal):
+            # every value in a cell gets the average rank of the cell (ties)
+            return np.cumsum(marginal) - marginal + (marginal + 1) / 2
+
+        rx = mid_ranks(joint.sum(axis=1))
+        ry = mid_ranks(joint.sum(axis=0))
+        n = joint.sum()
+        if n <= 1:
+            return np.nan
+        mean = (n + 1) / 2
+        dx, dy = rx - mean, ry - mean
+        cov = dx @ joint @ dy
+        var_x = (dx * dx) @ joint.sum(axis=1)
+        var_y = (dy * dy) @ joint.sum(axis=0)
+        if var_x == 0 or var_y == 0:
+            return np.nan
+        return cov / np.sqrt(var_x * var_y)
+
+
+class BinnedMeans:
+    """Mean of y per x bin, binned like pd.cut(x, edges, include_lowest=True)."""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.sums = np.zeros(len(self.edges) - 1)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def update(self, x, y):
+        idx = np.searchsorted(self.edges, x, side="left") - 1
+        idx[x == self.edges[0]] = 0
+        inside = (idx >= 0) & (idx < len(self.sums))
+        idx, y = idx[inside], y[inside]
+        self.sums += np.bincount(idx, weights=y, minlength=len(self.sums))
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+
+    def merge(self, other):
+        self.sums += other.sums
+        self.counts += other.counts
+        return self
+
+    def means(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.counts > 0, self.sums / self.counts, np.nan)
+
+
+def summarize(conn, table, x_col, y_col, x_range, y_range, bin_edges, rank_bins=1000,
+              batch_size=200_000, shard=0, n_shards=1):
+    """One pass over (a shard of) the table -> (PairStats, RankSketch, BinnedMeans)."""
+    stats = PairStats()
+    ranks = RankSketch(x_range, y_range, rank_bins)
+    binned = BinnedMeans(bin_edges)
+    for x, y in iter_batches(conn, table, x_col, y_col, batch_size, shard, n_shards):
+        stats.update(x, y)
+        ranks.update(x, y)
+        binned.update(x, y)
+    return stats, ranks, binned
+
+
+def merge_summaries(parts):
+    stats, ranks, binned = parts[0]
+    for other_stats, other_ranks, other_binned in parts[1:]:
+        stats.merge(other_stats)
+        ranks.merge(other_ranks)
+        binned.merge(other_binned)
+    return stats, ranks, binned
+
+
+def count_pairs(conn, table, x_col, y_col):
+    where = NUMERIC_WHERE.format(x=x_col, y=y_col)
+    return conn.execute(f'SELECT COUNT(*) FROM "{table}" WHERE {where}').fetchone()[0]
+
+
+def pick_pairs(conn, table, x_col, y_col, positions, batch_size=200_000):
+    """(x, y) of the numeric pairs at `positions` (in that order), in one batched pass."""
+    positions = np.asarray(positions, dtype=np.int64)
+    order = np.argsort(positions, kind="stable")
+    wanted = positions[order]
+    x, y = np.empty(len(positions)), np.empty(len(positions))
+    start = 0
+    for bx, by in iter_batches(conn, table, x_col, y_col, batch_size):
+        lo, hi = np.searchsorted(wanted, [start, start + len(bx)])
+        x[order[lo:hi]] = bx[wanted[lo:hi] - start]
+        y[order[lo:hi]] = by[wanted[lo:hi] - start]
+        start += len(bx)
+        if hi == len(wanted):
+            break
+    return x, y
+
+
+def interval_mids(edges):
+    # the same midpoints pd.cut(..., include_lowest=True) reports for its intervals
+    cats = pd.cut(pd.Series([], dtype=float), bins=edges, include_lowest=True).cat.categories
+    return np.asarray(cats.mid, dtype=float)
@@ -0,0 +1,9 @@
+# the scripts import each other as top-level modules (from Database/Scripts and
+# from DB_Creation), so both directories go on sys.path like when they are run
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[1]
+for path in (SCRIPTS / "DB_Creation", SCRIPTS):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,26 @@
+import sqlite3
+
+import pandas as pd
+
+from aggregate_cache import cache_key, read_cached, write_cached
+
+
+def agg_tables(conn):
+    return {name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name != 'aggregate_cache'")}
+
+
+def test_write_drops_tables_of_earlier_generations():
+    conn = sqlite3.connect(":memory:")
+    df = pd.DataFrame({"runtime": [0.1, 0.2], "avg_rating": [0.5, 0.6]})
+    write_cached(conn, "runtime_averages", {"table": "movies"}, 1, df)
+    write_cached(conn, "runtime_bins", {"table": "movies"}, 1, df)
+    assert len(agg_tables(conn)) == 2
+
+    # after a reload only the aggregates written for the new generation remain
+    write_cached(conn, "runtime_bins", {"table": "movies"}, 2, df)
+    key, _ = cache_key("runtime_bins", {"table": "movies"})
+    assert agg_tables(conn) == {f"agg_{key}"}
+    assert conn.execute("SELECT generation FROM aggregate_cache").fetchall() == [(2,)]
+    assert read_cached(conn, "runtime_averages", {"table": "movies"}, 2) is None
+    pd.testing.assert_frame_equal(read_cached(conn, "runtime_bins", {"table": "movies"}, 2), df)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from artifacts import ArtifactWriter, parquet_path, read_artifact
+from Normalize import normalize_chunked
+
+
+def sparse_movies(rows=150, empty=100):
+    # certificate is missing in the first `empty` rows, like a sparse column of movies.csv
+    return pd.DataFrame({
+        "movie": [f"Movie {i}" for i in range(rows)],
+        "genre": ["\nDrama, Crime      "] * rows,
+        "runtime": [f"{90 + i % 60} min" for i in range(rows)],
+        "certificate": [None] * empty + ["TV-MA"] * (rows - empty),
+        "rating": np.round(np.linspace(1, 9, rows), 1),
+        "stars": ["['A', 'B']"] * rows,
+        "description": ["Plot."] * rows,
+        "votes": [f"{1000 + i:,}" for i in range(rows)],
+        "director": ["['C']"] * rows,
+    })
+
+
+def test_all_null_first_chunk_stays_text(tmp_path):
+    src, csv = tmp_path / "in.csv", tmp_path / "out.csv"
+    sparse_movies().to_csv(src, index=False)
+    writer = ArtifactWriter(csv)
+    try:
+        # read_csv types the all-empty certificate of the first chunk as float64
+        for chunk in pd.read_csv(src, chunksize=50):
+            writer.write(chunk)
+    finally:
+        writer.close()
+
+    assert str(pq.read_schema(parquet_path(csv)).field("certificate").type) == "string"
+    from_parquet = read_artifact(csv)
+    from_csv = pd.read_csv(csv)
+    assert from_parquet["certificate"].tolist()[100:] == ["TV-MA"] * 50
+    assert from_parquet["certificate"].isna().sum() == from_csv["certificate"].isna().sum() == 100
+
+
+def test_normalize_chunked_with_sparse_text_column(tmp_path):
+    src, dst = tmp_path / "movies.csv", tmp_path / "movies-normalized.csv"
+    sparse_movies().to_csv(src, index=False)
+
+    assert normalize_chunked(src, dst, 50) == 150
+    from_parquet = read_artifact(dst)
+    from_csv = pd.read_csv(dst)
+    pd.testing.assert_frame_equal(from_parquet[["runtime", "rating", "votes"]],
+                                  from_csv[["runtime", "rating", "votes"]])
+    assert from_parquet["certificate"].fillna("").tolist() == from_csv["certificate"].fillna("").tolist()
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_profile
+from Column_Drop import drop_sparse_columns
+from data_profile import DataProfile, cleaned_histograms
+
+
+def sparse_movies(rows=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def holes(values, share):
+        values = pd.Series(values)
+        return values.mask(rng.random(rows) < share)
+
+    return pd.DataFrame({
+        "movie": holes([f"Movie {i}" for i in range(rows)], 0.01),
+        "genre": holes(rng.choice(["Drama", "Comedy", "Crime", "Horror"], rows), 0.1),
+        # 4,000 distinct values or so: wider than a small MAX_HISTOGRAM_VALUES
+        "runtime": holes(np.round(rng.random(rows), 4), 0.3),
+        "rating": holes(np.round(rng.random(rows), 2), 0.2),
+        "certificate": holes(rng.choice(["PG", "R"], rows), 0.7),
+        "gross": holes(rng.random(rows), 0.5),
+    })
+
+
+def chunked_profile(df, chunksize=700):
+    profile = DataProfile()
+    for start in range(0, len(df), chunksize):
+        profile.update(df.iloc[start:start + chunksize])
+    return profile
+
+
+def test_null_counts_and_distinct_estimates():
+    df = sparse_movies()
+    stats = chunked_profile(df).column_stats()
+    for col in df.columns:
+        assert stats[col]["nulls"] == df[col].isna().sum()
+        # HyperLogLog with 4096 registers: about 1.6% standard error
+        assert stats[col]["distinct"] == pytest.approx(df[col].nunique(), rel=0.05)
+    assert stats["rating"]["mean"] == pytest.approx(df["rating"].mean(), rel=1e-12)
+
+
+@pytest.mark.parametrize("max_missing", [0.25, 0.5, 0.7])
+def test_columns_to_drop_match_column_drop(max_missing):
+    df = sparse_movies()
+    # exactly on the threshold: half of the column missing
+    df["gross"] = np.where(np.arange(len(df)) % 2, np.nan, 1.0)
+    expected = drop_sparse_columns(df, max_missing)[1]
+    assert chunked_profile(df).columns_to_drop(max_missing) == expected
+    assert drop_sparse_columns(df, max_missing, profile=chunked_profile(df))[1] == expected
+
+
+def test_wide_columns_get_a_scanned_histogram(tmp_path, monkeypatch):
+    df = sparse_movies()
+    path = tmp_path / "movies-column-dropped.csv"
+    df.to_csv(path, index=False)
+    df = pd.read_csv(path)
+
+    full = chunked_profile(df)
+    monkeypatch.setattr(data_profile, "MAX_HISTOGRAM_VALUES", 1_000)
+    narrow = chunked_profile(df)
+    assert "runtime" in full.histogram_columns and "runtime" not in narrow.histogram_columns
+
+    fill_values = narrow.fill_values(narrow.numeric)
+    assert narrow.cleaned_histogram("runtime", fill_values["runtime"]) is None
+    scanned = cleaned_histograms(path, ["runtime", "rating"], fill_values, chunksize=700)
+    for col in ["runtime", "rating"]:
+        expected = full.cleaned_histogram(col, fill_values[col])
+        pd.testing.assert_series_equal(scanned[col], expected, check_names=False, check_index_type=False)
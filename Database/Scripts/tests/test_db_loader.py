@@ -0,0 +1,72 @@
+import sqlite3
+
+import pandas as pd
+
+from db_loader import has_bridge_tables, load_movies, natural_keys, upsert_movies
+
+
+def movie(name, stars, genre="Drama"):
+    return {"movie": name, "genre": genre, "runtime": 0.5, "rating": 0.7, "stars": stars,
+            "description": "Plot.", "votes": 0.1, "director": "D"}
+
+
+def test_repeated_names_keep_one_bridge_row_per_position(tmp_path):
+    db = tmp_path / "movies.db"
+    load_movies(pd.DataFrame([movie("M1", "A, B, A", "Drama, Drama"), movie("M2", "A")]), db)
+    conn = sqlite3.connect(db)
+    assert has_bridge_tables(conn)
+    stars = conn.execute(
+        "SELECT mp.movie_id, mp.ord, p.name FROM movie_person mp JOIN people p ON p.id = mp.person_id "
+        "WHERE mp.role = 'star' ORDER BY mp.rowid"
+    ).fetchall()
+    assert stars == [(1, 0, "A"), (1, 1, "B"), (1, 2, "A"), (2, 0, "A")]
+    # the same counts as exploding the stars / genre strings
+    counts = dict(conn.execute(
+        "SELECT p.name, s.movie_count FROM person_stats s JOIN people p ON p.id = s.person_id "
+        "WHERE s.role = 'star'"
+    ).fetchall())
+    assert counts == {"A": 3, "B": 1}
+    assert conn.execute("SELECT movie_count FROM genre_stats").fetchall() == [(3,)]
+
+
+def test_bridge_tables_without_ord_count_as_missing(tmp_path):
+    db = tmp_path / "movies.db"
+    load_movies(pd.DataFrame([movie("M1", "A")]), db)
+    conn = sqlite3.connect(db)
+    conn.execute("DROP TABLE movie_person")
+    conn.execute("CREATE TABLE movie_person (movie_id INTEGER, person_id INTEGER, role TEXT, "
+                 "PRIMARY KEY (movie_id, person_id, role))")
+    assert not has_bridge_tables(conn)
+
+
+def test_changed_stars_update_the_row_in_place(tmp_path):
+    db = tmp_path / "movies.db"
+    load_movies(pd.DataFrame([movie("M1", "A, B"), movie("M2", "C")]), db)
+    counts = upsert_movies(pd.DataFrame([movie("M1", "A, E"), movie("M2", "C")]), db)
+    assert counts == {"inserted": 0, "updated": 1, "deleted": 0, "unchanged": 1}
+
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT id, stars FROM movies ORDER BY id").fetchall() == [(1, "A, E"), (2, "C")]
+    stars = conn.execute(
+        "SELECT p.name FROM movie_person mp JOIN people p ON p.id = mp.person_id "
+        "WHERE mp.movie_id = 1 AND mp.role = 'star' ORDER BY mp.ord"
+    ).fetchall()
+    assert stars == [("A",), ("E",)]
+
+
+def test_keys_of_an_older_version_are_recomputed(tmp_path):
+    db = tmp_path / "movies.db"
+    load_movies(pd.DataFrame([movie("M1", "A")]), db)
+    upsert_movies(pd.DataFrame([movie("M1", "A")]), db)
+    conn = sqlite3.connect(db)
+    # what an incremental load before the key change left behind
+    conn.execute("UPDATE movies SET natural_key = 'sha1 of movie, director and stars'")
+    conn.execute("DELETE FROM load_meta WHERE key = 'natural_key_version'")
+    conn.commit()
+    conn.close()
+
+    counts = upsert_movies(pd.DataFrame([movie("M1", "B")]), db)
+    assert counts == {"inserted": 0, "updated": 1, "deleted": 0, "unchanged": 0}
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT natural_key FROM movies").fetchall() == \
+        [(natural_keys(pd.DataFrame([movie("M1", "B")]))[0],)]
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import Encode_Categorical
+from Encode_Categorical import clean_list_column, join_list_column, parse_list_column
+
+VALUES = [
+    "['Frank Darabont', 'Tim Robbins']",
+    # nested and mixed quotes
+    "[\"O'Brien\", 'Mary \"Q\" Smith']",
+    "['\"Quoted\"', \"'Single'\", '\\'Both\\'']",
+    "''",
+    # brackets inside and around the list
+    "[[Nested], [Brackets]]",
+    "[A [B] C]",
+    "[]]",
+    "[[",
+    # empty lists and empty names
+    "[]",
+    "",
+    "   ",
+    "[ , ,]",
+    "[',', '']",
+    # whitespace, separators, no brackets
+    "\n['Tab\\tName',\t 'New\nLine']  ",
+    "Plain, Names ,Here",
+    "Ünïcødé, 名前",
+    # not strings
+    np.nan,
+    None,
+    42,
+    1.5,
+]
+
+
+@pytest.fixture(params=["arrow", "pandas"])
+def engine(request, monkeypatch):
+    if request.param == "arrow":
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(Encode_Categorical, "pa", None)
+    return request.param
+
+
+@pytest.fixture
+def values():
+    # a non-default index, which the results have to keep
+    return pd.Series(VALUES, index=np.arange(len(VALUES)) * 10 + 3, dtype=object)
+
+
+def test_parse_list_column_matches_clean_list_column(engine, values):
+    expected = values.apply(clean_list_column)
+    pd.testing.assert_series_equal(parse_list_column(values), expected)
+
+
+@pytest.mark.parametrize("sep", [", ", "|"])
+def test_join_list_column_matches_clean_list_column(engine, values, sep):
+    expected = values.apply(clean_list_column).apply(sep.join)
+    pd.testing.assert_series_equal(join_list_column(values, sep), expected, check_dtype=False)
+
+
+def test_all_missing_and_empty_columns(engine):
+    for values in [pd.Series([np.nan, None], dtype=object), pd.Series([], dtype=object)]:
+        assert parse_list_column(values).tolist() == values.apply(clean_list_column).tolist()
+        assert join_list_column(values).tolist() == [""] * len(values)
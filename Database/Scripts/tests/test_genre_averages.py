@@ -0,0 +1,70 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from db_loader import load_movies
+from Genre_Avg_Rating_DB import genre_averages, register_functions
+
+GENRES = ["Drama", "Comedy", "Romance", "Crime", "Action", "Horror"]
+
+
+@pytest.fixture
+def conn(tmp_path):
+    rng = np.random.default_rng(4)
+    rows = 2_000
+    load_movies(pd.DataFrame({
+        "movie": [f"Movie {i}" for i in range(rows)],
+        "genre": ["\n" + ", ".join(rng.choice(GENRES, rng.integers(1, 4), replace=False)) + "    "
+                  for _ in range(rows)],
+        "runtime": np.round(rng.random(rows), 2),
+        "rating": np.round(rng.random(rows), 2),
+        "stars": "A, B",
+        "description": "Plot.",
+        "votes": np.round(rng.random(rows), 2),
+        "director": "D",
+    }), tmp_path / "movies.db")
+    conn = sqlite3.connect(tmp_path / "movies.db")
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("engine", ["auto", "sql"])
+def test_default_engines_match_pandas_exactly(conn, engine):
+    expected = genre_averages(conn, engine="pandas", use_cache=False)
+    assert len(expected) == len(GENRES)
+    pd.testing.assert_frame_equal(genre_averages(conn, engine=engine, use_cache=False), expected,
+                                  check_exact=True)
+
+
+def test_bridge_engine_is_close_to_pandas(conn):
+    expected = genre_averages(conn, engine="pandas", use_cache=False).set_index("genre")
+    bridge = genre_averages(conn, engine="bridge", use_cache=False).set_index("genre")
+    assert (bridge["count"] == expected["count"].reindex(bridge.index)).all()
+    np.testing.assert_allclose(bridge["avg_rating"], expected["avg_rating"].reindex(bridge.index),
+                               rtol=1e-12)
+
+
+def test_sql_engine_strips_like_pandas():
+    conn = sqlite3.connect(":memory:")
+    pd.DataFrame({
+        "genre": ["\xa0Drama,\u3000Comedy\x1f", "Drama\x85, Comedy", " Drama", "\x1c,Crime\n"],
+        "rating": [0.1, 0.2, 0.3, 0.4],
+    }).to_sql("movies", conn, index=False)
+    expected = genre_averages(conn, engine="pandas", use_cache=False)
+    assert sorted(expected["genre"]) == ["Comedy", "Crime", "Drama"]
+    pd.testing.assert_frame_equal(genre_averages(conn, engine="sql", use_cache=False), expected,
+                                  check_exact=True)
+
+
+def test_pandas_mean_over_a_sliding_frame():
+    conn = sqlite3.connect(":memory:")
+    register_functions(conn)
+    conn.execute("CREATE TABLE t (i INTEGER, x REAL)")
+    values = [0.1, 0.7, None, 0.2, 0.9, 0.4]
+    conn.executemany("INSERT INTO t VALUES (?, ?)", enumerate(values))
+    rows = conn.execute("SELECT pandas_mean(x) OVER (ORDER BY i ROWS BETWEEN 1 PRECEDING AND CURRENT ROW) "
+                        "FROM t ORDER BY i").fetchall()
+    expected = pd.Series(values, dtype=float).rolling(2, min_periods=1).mean()
+    np.testing.assert_allclose([row[0] for row in rows], expected, rtol=1e-15)
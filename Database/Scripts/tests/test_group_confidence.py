@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from group_confidence import SMALL_GROUP, group_intervals
+
+COLUMNS = ["director", "count", "mean", "shrunk_rating", "ci_low", "ci_high"]
+
+
+@pytest.mark.parametrize("rows", [
+    pd.DataFrame({"director": pd.Series([], dtype=object), "rating": pd.Series([], dtype=float)}),
+    pd.DataFrame({"director": ["A", None], "rating": [None, 0.5]}),  # nothing left after dropna
+])
+def test_no_groups_gives_an_empty_frame(rows):
+    for n_jobs in (1, 2):
+        intervals = group_intervals(rows, "director", "rating", n_resamples=20, n_jobs=n_jobs)
+        assert list(intervals.columns) == COLUMNS
+        assert len(intervals) == 0
+        # callers sort and select on the result
+        assert intervals.sort_values(["shrunk_rating", "count"], ascending=False).empty
+
+
+def director_ratings(seed=0):
+    # one large group with few distinct values (multinomial resampling), one large
+    # continuous group (index resampling), and many small groups of equal sizes
+    rng = np.random.default_rng(seed)
+    groups = {"big_rounded": np.round(rng.random(SMALL_GROUP + 500), 1),
+              "big_continuous": rng.random(SMALL_GROUP + 200)}
+    for i in range(300):
+        groups[f"small_{i:03d}"] = np.round(rng.random(1 + i % 5), 2)
+    return pd.DataFrame({"director": np.repeat(list(groups), [len(v) for v in groups.values()]),
+                         "rating": np.concatenate(list(groups.values()))})
+
+
+def test_result_does_not_depend_on_jobs():
+    rows = director_ratings()
+    serial = group_intervals(rows, "director", "rating", n_resamples=200, n_jobs=1)
+    parallel = group_intervals(rows, "director", "rating", n_resamples=200, n_jobs=2)
+    assert len(serial) == 302
+    pd.testing.assert_frame_equal(serial, parallel, check_exact=True)
+
+
+def test_interval_contains_the_mean():
+    intervals = group_intervals(director_ratings(1), "director", "rating", n_resamples=500)
+    assert (intervals["ci_low"] <= intervals["mean"] + 1e-12).all()
+    assert (intervals["mean"] <= intervals["ci_high"] + 1e-12).all()
+    # one-film directors: nothing to resample
+    single = intervals[intervals["count"] == 1]
+    assert (single["ci_low"] == single["mean"]).all() and (single["ci_high"] == single["mean"]).all()
+    big = intervals.set_index("director").loc["big_continuous"]
+    assert big["ci_high"] - big["ci_low"] < 0.05
+
+
+def test_shrunk_rating_formula():
+    rows = pd.DataFrame({"director": ["A", "A", "A", "B", "C", "C"],
+                         "rating": [0.9, 0.8, 0.7, 0.1, 0.4, 0.6]})
+    overall = rows["rating"].mean()
+    intervals = group_intervals(rows, "director", "rating", n_resamples=50, prior_weight=2.0)
+    assert intervals["director"].tolist() == ["A", "B", "C"]
+    assert intervals["count"].tolist() == [3, 1, 2]
+    np.testing.assert_allclose(intervals["mean"], [0.8, 0.1, 0.5])
+    np.testing.assert_allclose(intervals["shrunk_rating"],
+                               [(3 * 0.8 + 2 * overall) / 5, (0.1 + 2 * overall) / 3, (2 * 0.5 + 2 * overall) / 4])
+
+    # default prior weight: the median group size (2)
+    default = group_intervals(rows, "director", "rating", n_resamples=50)
+    np.testing.assert_allclose(default["shrunk_rating"], intervals["shrunk_rating"])
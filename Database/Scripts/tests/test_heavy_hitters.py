@@ -0,0 +1,48 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from heavy_hitters import CAPACITY, exact_top_rows, streaming_top_rows
+
+QUERY = "SELECT movie, director, stars, rating FROM movies"
+COLUMNS = {"director": None, "stars": ","}
+
+
+def zipf_movies(n_movies, pool, exponent=1.3, seed=0):
+    # star line-ups of 1-4 names and one director, both Zipf-distributed over the pool
+    # (ranks beyond the pool wrap around instead of piling up on the last person)
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(1, 5, size=n_movies)
+    ids = (rng.zipf(exponent, size=counts.sum()) - 1) % pool
+    names = np.array([f"Person {i}" for i in range(pool)], dtype=object)
+    ends = np.cumsum(counts)
+    stars = [", ".join(names[ids[end - k:end]]) for k, end in zip(counts, ends)]
+    directors = names[(rng.zipf(exponent, size=n_movies) - 1) % pool]
+    return pd.DataFrame({
+        "movie": [f"Movie {i}" for i in range(n_movies)],
+        "director": directors,
+        "stars": stars,
+        "rating": np.round(rng.uniform(0, 1, size=n_movies), 2),
+    })
+
+
+@pytest.mark.parametrize("exponent, seed", [(1.3, 0), (1.1, 1)])
+def test_streaming_top_rows_match_exact_top_rows(exponent, seed):
+    conn = sqlite3.connect(":memory:")
+    zipf_movies(40_000, 20_000, exponent, seed).to_sql("movies", conn, index=False)
+    df = pd.read_sql_query(QUERY, conn)
+
+    # batches much smaller than the table, so the summary has to merge and evict
+    rows, info = streaming_top_rows(lambda: pd.read_sql_query(QUERY, conn, chunksize=5_000),
+                                    COLUMNS, 50, CAPACITY)
+    for col, delimiter in COLUMNS.items():
+        expected = exact_top_rows(df, col, 50, delimiter)
+        assert info[col]["exact"], info[col]["floor"]
+        assert info[col]["names_seen"] > CAPACITY
+        pd.testing.assert_frame_equal(rows[col], expected)
+
+        averages = expected.groupby(col, sort=False)["rating"].mean()
+        top = info[col]["top"].set_index(col)
+        np.testing.assert_allclose(top["avg_rating"], averages.reindex(top.index), rtol=0, atol=1e-12)
@@ -0,0 +1,12 @@
+import pytest
+
+from import_budget import BUDGET_MS, ENTRY_POINTS, fastest
+
+
+@pytest.mark.parametrize("script", ENTRY_POINTS)
+def test_help_stays_within_the_import_budget(script):
+    result = fastest(script, repeat=3, budget_ms=BUDGET_MS)
+    assert result["ok"], f"{script} --help failed"
+    assert result["lazy_loaded"] == [], f"{script} imports {', '.join(result['lazy_loaded'])} up front"
+    assert result["import_ms"] <= BUDGET_MS, \
+        f"{script} imports in {result['import_ms']:.0f} ms ({result['heaviest']})"
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from artifacts import read_artifact
+from data_cleaning import clean_chunked, clean_frame
+from imputation import Imputer
+
+
+def movies():
+    return pd.DataFrame({
+        "movie": ["A", "B", "C", "D"],
+        "genre": ["\nDrama, Romance    ", "\nComedy    ", None, None],
+        "runtime": [0.2, np.nan, 0.5, np.nan],
+        "rating": [0.4, 0.6, np.nan, 0.8],
+        "votes": [0.1, 0.3, 0.2, np.nan],
+    })
+
+
+def test_genre_mean_falls_back_to_the_column_mean():
+    imputer = Imputer(["runtime", "rating", "votes"], "genre_mean").fit_chunk(movies())
+    filled = imputer.transform(movies())
+    # Comedy has no runtime, the genre-less rows only get column means
+    assert filled["runtime"].tolist() == [0.2, 0.35, 0.5, 0.35]
+    assert filled["rating"].tolist() == [0.4, 0.6, 0.6, 0.8]
+    assert filled["votes"].tolist() == [0.1, 0.3, 0.2, 0.2]
+
+
+@pytest.mark.parametrize("strategy", ["mean", "median", "genre_mean"])
+def test_chunked_matches_whole_file(tmp_path, strategy):
+    src, dst = tmp_path / "movies-column-dropped.csv", tmp_path / "movies-cleaned.csv"
+    movies().to_csv(src, index=False)
+    # chunks of 2: the second chunk has no genre at all, so read_csv types it as float64
+    clean_chunked(src, dst, 2, strategy, log='quiet')
+    expected = clean_frame(pd.read_csv(src), None, strategy, log='quiet')
+    pd.testing.assert_frame_equal(read_artifact(dst)[["runtime", "rating", "votes"]],
+                                  expected[["runtime", "rating", "votes"]].reset_index(drop=True))
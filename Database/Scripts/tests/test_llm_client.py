@@ -0,0 +1,88 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from llm_client import LLMClient, ResponseCache, StubBackend
+
+
+def messages(text):
+    return [{"role": "system", "content": "You summarize."},
+            {"role": "user", "content": f"{text}:\n- first point\n- second point"}]
+
+
+async def collect(stream):
+    return [token async for token in stream]
+
+
+def test_stub_answers_are_deterministic():
+    stub = StubBackend()
+    answer = stub.complete(messages("a"), "m")
+    assert answer == StubBackend().complete(messages("a"), "m")
+    assert answer != stub.complete(messages("b"), "m")
+    assert answer.endswith("Summary of 2 points:\n- first point\n- second point")
+    assert "".join(asyncio.run(collect(stub.astream(messages("a"), "m")))) == answer
+
+
+def test_answers_come_from_the_cache(tmp_path):
+    stub = StubBackend()
+    client = LLMClient(stub, ResponseCache(tmp_path), model="m")
+    answer = client.complete(messages("a"))
+    assert client.complete(messages("a")) == answer
+    assert asyncio.run(client.acomplete(messages("a"))) == answer
+    # a cached answer is streamed as one piece
+    assert asyncio.run(collect(client.astream(messages("a")))) == [answer]
+    assert stub.calls == 1
+
+    # a streamed answer is cached once it is complete
+    tokens = asyncio.run(collect(client.astream(messages("b"))))
+    assert len(tokens) > 1 and stub.calls == 2
+    assert client.complete(messages("b")) == "".join(tokens)
+    assert stub.calls == 2
+
+    # other model, other entry
+    assert LLMClient(stub, ResponseCache(tmp_path), model="n").complete(messages("a")) != answer
+    assert stub.calls == 3
+
+
+def test_expired_entry_is_a_miss(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60)
+    cache.put("stub", "m", messages("a"), "old answer")
+    path = cache.path("stub", "m", messages("a"))
+    entry = json.loads(path.read_text())
+    path.write_text(json.dumps({**entry, "created": time.time() - 120}))
+
+    assert cache.get("stub", "m", messages("a")) is None
+    assert not path.exists()
+    assert ResponseCache(tmp_path, ttl=None).get("stub", "m", messages("a")) is None
+
+
+@pytest.mark.parametrize("content", ['{"response": "no created"}', '{"created": 1}',
+                                     '["not", "an", "entry"]', '{"created": "x", "response": "r"}', "{"])
+def test_foreign_entry_is_a_miss(tmp_path, content):
+    cache = ResponseCache(tmp_path)
+    path = cache.path("stub", "m", messages("a"))
+    path.write_text(content)
+    assert cache.get("stub", "m", messages("a")) is None
+
+    client = LLMClient(StubBackend(), cache, model="m")
+    assert client.complete(messages("a")) == StubBackend().complete(messages("a"), "m")
+    assert cache.get("stub", "m", messages("a")) is not None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResponseCache(tmp_path, max_entries=2)
+    now = time.time()
+    for age, name in [(30, "a"), (20, "b")]:
+        cache.put("stub", "m", messages(name), name)
+        os.utime(cache.path("stub", "m", messages(name)), (now - age, now - age))
+
+    assert cache.get("stub", "m", messages("a")) == "a"  # a is now the most recent use
+    cache.put("stub", "m", messages("c"), "c")
+
+    assert cache.get("stub", "m", messages("b")) is None
+    assert cache.get("stub", "m", messages("a")) == "a"
+    assert cache.get("stub", "m", messages("c")) == "c"
+    assert len(list(tmp_path.glob("*.json"))) == 2
@@ -0,0 +1,136 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import SCRIPTS
+from db_loader import load_movies
+
+pytest.importorskip("openai")
+pytest.importorskip("sklearn")
+
+# every request streams its answer over DELAY seconds
+DELAY = 1.0
+AUDIENCES = {
+    "general": "General Audience",
+    "industry": "Industry Stakeholders",
+    "critics": "film critics who care about directors",
+}
+
+
+def answer_for(prompt):
+    # a distinct two-line answer per audience, so mixed-up streams would show
+    name = next(name for name, marker in AUDIENCES.items() if marker in prompt)
+    return f"Summary for {name}:\n{name} point one, {name} point two."
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """POST /v1/chat/completions, answered as a server-sent event stream."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        start = time.perf_counter()
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            tokens = answer_for(body["messages"][-1]["content"]).split(" ")
+            tokens = [token if i == 0 else " " + token for i, token in enumerate(tokens)]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for token in tokens:
+                time.sleep(DELAY / len(tokens))
+                self.event({"content": token})
+            self.event({}, finish_reason="stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+                server.spans.append((start, time.perf_counter()))
+
+    def event(self, delta, finish_reason=None):
+        chunk = {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+                 "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    server.lock = threading.Lock()
+    server.in_flight = server.max_in_flight = 0
+    server.spans = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def movies_db(tmp_path):
+    rng = np.random.default_rng(3)
+    rows = 120
+    people = [f"Person {i}" for i in range(15)]
+    db = tmp_path / "movies.db"
+    load_movies(pd.DataFrame({
+        "movie": [f"Movie {i}" for i in range(rows)],
+        "genre": rng.choice(["Drama", "Comedy", "Crime"], rows),
+        "runtime": np.round(rng.random(rows), 2),
+        "rating": np.round(rng.random(rows), 2),
+        "stars": [", ".join(rng.choice(people, 2, replace=False)) for _ in range(rows)],
+        "description": "Plot.",
+        "votes": np.round(rng.random(rows), 2),
+        "director": rng.choice(people, rows),
+    }), db)
+    return db
+
+
+def test_audiences_stream_concurrently_from_the_base_url(fake_openai, movies_db, tmp_path):
+    base_url = f"http://127.0.0.1:{fake_openai.server_address[1]}/v1"
+    audiences = ["general", "industry", AUDIENCES["critics"]]
+    proc = subprocess.run(
+        [sys.executable, str(SCRIPTS / "ML_LLM.py"), "--db", str(movies_db), "--llm", "openai",
+         "--llm-base-url", base_url, "--no-llm-cache", "--stream", "--profile", "profile.jsonl",
+         *[arg for audience in audiences for arg in ("--audience", audience)]],
+        cwd=tmp_path, capture_output=True, text=True, timeout=120,
+        env=dict(os.environ, OPENAI_API_KEY="test", MPLBACKEND="Agg"),
+    )
+    assert proc.returncode == 0, proc.stderr
+
+    # one request per audience, all of them in flight at once: the requests take
+    # about as long as the slowest one, and the llm stage less than their sum
+    spans = fake_openai.spans
+    assert len(spans) == 3
+    assert fake_openai.max_in_flight == 3
+    requests_s = max(end for _, end in spans) - min(start for start, _ in spans)
+    assert requests_s < 1.5 * DELAY, f"3 x {DELAY}s requests took {requests_s:.2f}s"
+    stages = [json.loads(line) for line in (tmp_path / "profile.jsonl").read_text().splitlines()]
+    llm_s = next(stage["wall_s"] for stage in stages if stage["stage"] == "llm")
+    assert DELAY <= llm_s < 3 * DELAY, f"llm stage took {llm_s:.2f}s for 3 x {DELAY}s requests"
+
+    # the streamed tokens add up to each audience's own answer
+    printed = {}
+    for line in proc.stdout.splitlines():
+        name, sep, text = line.partition(" | ")
+        if sep:
+            printed.setdefault(name, []).append(text)
+    assert {name: "\n".join(lines) for name, lines in printed.items()} == {
+        "general": answer_for("General Audience"),
+        "industry": answer_for("Industry Stakeholders"),
+        "profile_3": answer_for(AUDIENCES["critics"]),
+    }
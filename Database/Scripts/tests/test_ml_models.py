@@ -0,0 +1,59 @@
+import pickle
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+pytest.importorskip("scipy")
+
+from ml_models import fit_cached
+
+
+class CountingModel:
+    fits = 0
+
+    def fit(self, x, y):
+        CountingModel.fits += 1
+        self.coef_ = np.linalg.lstsq(x, y, rcond=None)[0]
+        return self
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    x = rng.random((50, 2))
+    return x, x @ np.array([2.0, -1.0])
+
+
+def test_cached_fit_is_reused(tmp_path, data):
+    CountingModel.fits = 0
+    first = fit_cached("model", CountingModel, *data, {}, tmp_path)
+    second = fit_cached("model", CountingModel, *data, {}, tmp_path)
+    assert CountingModel.fits == 1
+    np.testing.assert_array_equal(first.coef_, second.coef_)
+
+
+@pytest.mark.parametrize("content", [b"", b"\x80\x04\x95", b"not a pickle"])
+def test_unreadable_cache_file_is_a_miss(tmp_path, data, content):
+    fit_cached("model", CountingModel, *data, {}, tmp_path)
+    (path,) = tmp_path.glob("model-*.pkl")
+    path.write_bytes(content)
+
+    CountingModel.fits = 0
+    model = fit_cached("model", CountingModel, *data, {}, tmp_path)
+    assert CountingModel.fits == 1
+    np.testing.assert_allclose(model.coef_, [2.0, -1.0])
+    # overwritten with a good pickle
+    with open(path, "rb") as fh:
+        assert isinstance(pickle.load(fh), CountingModel)
+
+
+def test_sklearn_upgrade_misses_the_cache(tmp_path, data, monkeypatch):
+    import sklearn
+
+    fit_cached("model", CountingModel, *data, {}, tmp_path)
+    monkeypatch.setattr(sklearn, "__version__", "0.0.1")
+    CountingModel.fits = 0
+    fit_cached("model", CountingModel, *data, {}, tmp_path)
+    assert CountingModel.fits == 1
+    assert len(list(tmp_path.glob("model-*.pkl"))) == 2
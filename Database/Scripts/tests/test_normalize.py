@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Normalize import cols_to_normalize, normalize, normalize_chunked, parse_numeric_columns
+
+
+def raw_movies():
+    return pd.DataFrame({
+        "movie": ["A", "B", "C", "D", "E"],
+        "rating": [7.1, np.nan, 8.4, 5.0, 6.3],
+        "votes": ["1,234", "56", None, "7,890", "12"],
+        "runtime": ["90 min", "121 min", "45 min", None, "60 min"],
+        "certificate": ["PG", None, "R", "TV-MA", None],
+    })
+
+
+def test_normalize_matches_min_max_scaler():
+    preprocessing = pytest.importorskip("sklearn.preprocessing")
+    expected = parse_numeric_columns(raw_movies())
+    expected[cols_to_normalize] = preprocessing.MinMaxScaler().fit_transform(expected[cols_to_normalize])
+    expected[cols_to_normalize] = expected[cols_to_normalize].round(2)
+    pd.testing.assert_frame_equal(normalize(raw_movies()), expected)
+
+
+def test_constant_column_is_only_shifted():
+    df = raw_movies().assign(rating=5.0)
+    assert normalize(df)["rating"].tolist() == [0.0] * 5
+
+
+def test_chunked_matches_whole_file(tmp_path):
+    src, dst = tmp_path / "movies.csv", tmp_path / "movies-normalized.csv"
+    raw_movies().to_csv(src, index=False)
+    normalize_chunked(src, dst, chunksize=2)
+    expected = normalize(pd.read_csv(src))
+    pd.testing.assert_frame_equal(pd.read_csv(dst)[cols_to_normalize], expected[cols_to_normalize])
@@ -0,0 +1,38 @@
+import argparse
+import json
+import sys
+
+import profiling
+
+
+def test_stage_without_resource_module(tmp_path, monkeypatch):
+    # Windows has no resource module (and no /proc): the stage is still recorded
+    monkeypatch.setitem(sys.modules, "resource", None)
+    monkeypatch.setitem(sys.modules, "psutil", None)
+    monkeypatch.setattr(profiling, "current_rss", profiling.peak_rss)
+    out = tmp_path / "profile.jsonl"
+    monkeypatch.setattr(profiling, "state", dict(profiling.state))
+    profiling.configure(argparse.Namespace(profile=str(out), profile_stage=[]))
+
+    with profiling.stage("read", 10) as st:
+        st.rows_out = 5
+
+    record = json.loads(out.read_text())
+    assert record["stage"] == "read" and record["rows_out"] == 5 and record["ok"]
+    assert record["rss_mb"] is record["rss_delta_mb"] is record["peak_rss_mb"] is None
+
+
+def test_scripts_share_the_etl_profiling_state(tmp_path, monkeypatch):
+    # pipeline.py / benchmark.py configure the ETL's profiling module; stages
+    # decorated in the analytics scripts have to land in the same output
+    import pandas as pd
+    import Genre_Avg_Rating_DB
+
+    assert Genre_Avg_Rating_DB.profiling is profiling
+    out = tmp_path / "profile.jsonl"
+    monkeypatch.setattr(profiling, "state", dict(profiling.state))
+    profiling.configure(argparse.Namespace(profile=str(out), profile_stage=[]))
+
+    Genre_Avg_Rating_DB.compute_genre_averages_from_df(
+        pd.DataFrame({"genre": ["Drama, Comedy"], "rating": [0.5]}), "genre", "rating")
+    assert [json.loads(line)["stage"] for line in out.read_text().splitlines()] == ["genre_averages"]
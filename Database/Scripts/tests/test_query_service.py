@@ -0,0 +1,156 @@
+import asyncio
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Genre_Avg_Rating_DB import load_genre_averages
+from avg_rating_per_runtime import average_rating_by_runtime
+from db_loader import load_movies
+from query_service import MAX_HEADER_BYTES, QueryService
+from service_load_test import host_port
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "movies.db"
+    load_movies(pd.DataFrame({
+        "movie": ["M1", "M2"], "genre": ["Drama", "Comedy"], "runtime": [0.2, 0.4],
+        "rating": [0.5, 0.7], "stars": ["A", "B"], "description": ["", ""], "votes": [0.1, 0.2],
+        "director": ["D", "E"],
+    }), path)
+    return str(path)
+
+
+def movies(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    genres = ["Drama", "Comedy", "Crime", "Horror"]
+    return pd.DataFrame({
+        "movie": [f"Movie {i}" for i in range(rows)],
+        "genre": [", ".join(rng.choice(genres, rng.integers(1, 3), replace=False)) for _ in range(rows)],
+        "runtime": np.round(rng.integers(0, 20, rows) / 20, 2),
+        "rating": np.round(rng.random(rows), 2),
+        "stars": "A, B",
+        "description": "Plot.",
+        "votes": np.round(rng.random(rows), 2),
+        "director": "D",
+    })
+
+
+@pytest.fixture
+def big_db(tmp_path):
+    path = tmp_path / "movies.db"
+    load_movies(movies(500), path)
+    return str(path)
+
+
+async def get_json(server, target):
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 30)
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert int(head.split()[1]) == 200, body
+    return json.loads(body)
+
+
+async def exchange(service, request):
+    # one raw request against a server on 127.0.0.1 -> (status, json body)
+    server = await asyncio.start_server(service.handle, "127.0.0.1", 0, limit=MAX_HEADER_BYTES)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 10)
+        writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_a_400(db, length):
+    service = QueryService(db, pool_size=1)
+    try:
+        status, body = asyncio.run(exchange(
+            service, f"GET /health HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()))
+    finally:
+        service.close()
+    assert status == 400
+    assert body == {"error": "invalid Content-Length"}
+
+
+def test_get_body_is_skipped(db):
+    service = QueryService(db, pool_size=1)
+    try:
+        status, body = asyncio.run(exchange(
+            service, b"GET /health HTTP/1.1\r\nContent-Length: 4\r\nConnection: close\r\n\r\nbody"))
+    finally:
+        service.close()
+    assert status == 200 and body["status"] == "ok"
+
+
+def test_answers_match_the_scripts(big_db):
+    async def scenario(service):
+        async with await asyncio.start_server(service.handle, "127.0.0.1", 0) as server:
+            return [await get_json(server, target) for target in
+                    ["/genres", "/genres?engine=pandas&min_count=100", "/runtime", "/movies?min_rating=0.9&limit=5"]]
+
+    service = QueryService(big_db, pool_size=2)
+    try:
+        genres, pandas_genres, runtime, top = asyncio.run(scenario(service))
+    finally:
+        service.close()
+
+    pd.testing.assert_frame_equal(pd.DataFrame(genres["rows"]),
+                                  load_genre_averages(big_db, use_cache=False), check_exact=True)
+    pd.testing.assert_frame_equal(pd.DataFrame(pandas_genres["rows"]),
+                                  load_genre_averages(big_db, min_count=100, engine="pandas", use_cache=False),
+                                  check_exact=True)
+    with sqlite3.connect(big_db) as conn:
+        df = pd.read_sql_query("SELECT movie, runtime, rating FROM movies", conn)
+    pd.testing.assert_frame_equal(pd.DataFrame(runtime["rows"]), average_rating_by_runtime(df),
+                                  check_exact=True)
+    assert top["rows"] == df[df["rating"] > 0.9][["movie", "rating"]].head(5).to_dict(orient="records")
+
+
+def test_reload_invalidates_the_answer_cache(big_db):
+    async def scenario(service):
+        async with await asyncio.start_server(service.handle, "127.0.0.1", 0) as server:
+            before = [await get_json(server, "/count"), await get_json(server, "/genres")]
+            assert await get_json(server, "/count") == before[0]
+            assert service.stats["hits"] == 1
+
+            load_movies(movies(800, seed=1), big_db)  # a reload while the service runs
+            after = [await get_json(server, "/count"), await get_json(server, "/genres")]
+            return before, after
+
+    service = QueryService(big_db, pool_size=2)
+    try:
+        (count, genres), (new_count, new_genres) = asyncio.run(scenario(service))
+    finally:
+        service.close()
+
+    assert service.stats["hits"] == 1 and service.stats["misses"] == 4
+    assert count["rows"] == [{"movies": 500}] and new_count["rows"] == [{"movies": 800}]
+    assert new_count["generation"] == count["generation"] + 1
+    pd.testing.assert_frame_equal(pd.DataFrame(new_genres["rows"]),
+                                  load_genre_averages(big_db, use_cache=False), check_exact=True)
+    assert new_genres["rows"] != genres["rows"]
+
+
+@pytest.mark.parametrize("url, expected", [("http://127.0.0.1", ("127.0.0.1", 80)),
+                                           ("http://127.0.0.1:8765/", ("127.0.0.1", 8765)),
+                                           ("http://[::1]:9000", ("::1", 9000))])
+def test_load_test_url(url, expected):
+    assert host_port(url) == expected
+
+
+@pytest.mark.parametrize("url", ["127.0.0.1:8765", "https://127.0.0.1", "http://127.0.0.1:port"])
+def test_load_test_rejects_bad_urls(url):
+    with pytest.raises(ValueError):
+        host_port(url)
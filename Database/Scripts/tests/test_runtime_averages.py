@@ -0,0 +1,19 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from avg_rating_per_runtime import average_rating_by_runtime, runtime_averages
+
+
+def test_sql_averages_match_pandas_exactly():
+    rng = np.random.default_rng(5)
+    rows = 20_000
+    conn = sqlite3.connect(":memory:")
+    pd.DataFrame({
+        "runtime": np.round(rng.integers(0, 40, rows) / 40, 2),
+        "rating": np.where(rng.random(rows) < 0.05, np.nan, np.round(rng.random(rows), 2)),
+    }).to_sql("movies", conn, index=False)
+
+    expected = average_rating_by_runtime(pd.read_sql_query("SELECT runtime, rating FROM movies", conn))
+    pd.testing.assert_frame_equal(runtime_averages(conn, use_cache=False), expected, check_exact=True)
@@ -0,0 +1,28 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rating_runtime_correlation import load_runtime_rating, scatter_sample, streamed_sample
+
+
+def movies_db(rows):
+    # runtime/rating with NULLs and a text value that the numeric filter has to skip
+    rng = np.random.default_rng(0)
+    runtime = np.round(rng.random(rows), 2).astype(object)
+    rating = np.round(rng.random(rows), 2).astype(object)
+    runtime[::7] = None
+    rating[::11] = None
+    runtime[5] = "n/a"
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE movies (runtime REAL, rating REAL)")
+    conn.executemany("INSERT INTO movies VALUES (?, ?)", zip(runtime, rating))
+    return conn
+
+
+@pytest.mark.parametrize("rows", [3000, 12_000])
+def test_streamed_sample_matches_scatter_sample(rows):
+    conn = movies_db(rows)
+    expected = scatter_sample(load_runtime_rating(conn))
+    pd.testing.assert_frame_equal(streamed_sample(conn), expected)
@@ -0,0 +1,103 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from typed_loader import exact_values, expand_frame, fits_float32, read_typed
+
+QUERY = "SELECT movie, genre, director, stars, runtime, rating, votes FROM movies"
+
+
+@pytest.fixture
+def conn():
+    rng = np.random.default_rng(7)
+    rows = 60
+    rating = np.round(rng.random(rows), 2)
+    rating[45] = 0.123456789  # not 2 decimals: rating has to fall back to float64 mid-stream
+    movies = pd.DataFrame({
+        "movie": [f"Movie {i}" for i in range(rows)],
+        "genre": rng.choice(["Drama", "Comedy", "Crime, Drama", None], rows),
+        "director": rng.choice(["Ann", "Bob", "Cid", None], rows),
+        # mostly unique line-ups stay plain strings
+        "stars": [f"Star {i}, Star {i + 1}" for i in range(rows)],
+        "runtime": np.round(rng.random(rows), 2),
+        "rating": rating,
+        "votes": np.where(rng.random(rows) < 0.2, np.nan, np.round(rng.random(rows), 2)),
+    })
+    conn = sqlite3.connect(":memory:")
+    movies.to_sql("movies", conn, index=False)
+    return conn
+
+
+def test_float32_fallback_mid_stream(conn):
+    plain = pd.read_sql_query(QUERY, conn)
+    assert fits_float32(plain["rating"].to_numpy()[:40])
+    assert not fits_float32(plain["rating"].to_numpy())
+
+    df = read_typed(conn, QUERY, chunksize=8)
+    assert df["rating"].dtype == np.float64
+    assert df["runtime"].dtype == np.float32 and df["votes"].dtype == np.float32
+    assert isinstance(df["director"].dtype, pd.CategoricalDtype)
+    assert not isinstance(df["stars"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(expand_frame(df), plain, check_dtype=False)
+
+
+def test_aggregates_match_read_sql_query(conn):
+    # the aggregates the scripts compute, on read_typed output vs the plain frame
+    plain = pd.read_sql_query(QUERY, conn)
+    df = read_typed(conn, QUERY, chunksize=8)
+
+    def average_by(frame, col):
+        names = frame.assign(**{col: frame[col].str.split(", ")}).explode(col)
+        return names.groupby(col)["rating"].agg(["mean", "count"])
+
+    # genre and star averages over an expanded selection
+    for col in ["genre", "stars"]:
+        pd.testing.assert_frame_equal(average_by(expand_frame(df[[col, "rating"]]), col),
+                                      average_by(plain[[col, "rating"]], col))
+
+    # top directors: value_counts ties break by first appearance, like on the plain column
+    top = df["director"].value_counts().head(2).index
+    assert top.astype(object).tolist() == plain["director"].value_counts().head(2).index.tolist()
+    pd.testing.assert_frame_equal(
+        expand_frame(df[df["director"].isin(top)].reset_index(drop=True)),
+        plain[plain["director"].isin(top.astype(object))].reset_index(drop=True),
+        check_dtype=False,
+    )
+
+    # numeric columns through exact_values
+    for col in ["runtime", "rating", "votes"]:
+        pd.testing.assert_series_equal(exact_values(df[col]).groupby(plain["director"]).sum(),
+                                       plain[col].groupby(plain["director"]).sum())
+
+
+def test_all_null_first_chunk(conn):
+    conn.execute("UPDATE movies SET director = NULL, rating = NULL WHERE rowid <= 8")
+    plain = pd.read_sql_query(QUERY, conn)
+    df = read_typed(conn, QUERY, chunksize=8)
+    assert df["rating"].dtype == np.float64 and df["director"].cat.categories.dtype == plain["director"].dtype
+    pd.testing.assert_frame_equal(expand_frame(df), plain, check_dtype=False)
+
+
+def test_integer_chunks(conn):
+    # no column affinity: whole numbers stay INTEGER, so those chunks come back as int64
+    conn.execute("CREATE TABLE mixed (movie TEXT, runtime, rating)")
+    conn.execute("""
+        INSERT INTO mixed
+        SELECT movie,
+               CASE WHEN rowid BETWEEN 17 AND 24 THEN CAST(runtime * 100 AS INTEGER) ELSE runtime END,
+               CASE WHEN rowid <= 8 OR rowid BETWEEN 49 AND 56 THEN CAST(rating > 0.5 AS INTEGER)
+                    ELSE rating END
+        FROM movies ORDER BY rowid
+    """)
+    query = "SELECT movie, runtime, rating FROM mixed"
+    plain = pd.read_sql_query(query, conn)
+    first = pd.read_sql_query(query + " LIMIT 8", conn)
+    assert first["rating"].dtype == np.int64
+
+    df = read_typed(conn, query, chunksize=8)
+    assert df["runtime"].dtype == np.float32
+    assert df["rating"].dtype == np.float64  # row 45 still forces the fallback
+    pd.testing.assert_frame_equal(expand_frame(df), plain.astype({"runtime": float, "rating": float}),
+                                  check_exact=True)
@@ -0,0 +1,136 @@
+"""
+Compact typed frames for the analytics scripts.
+
+read_typed() runs a query in chunks and compacts every chunk as it arrives,
+so the full object-string frame never exists:
+
+- genre / director / stars become pandas Categoricals (unless they are mostly
+  unique). Categories are kept in order of first appearance, so
+  value_counts() breaks ties like it does on the plain string column.
+- runtime / rating / votes become float32. They are normalized and rounded to
+  2 decimals, so exact_values() gets the original float64 back bit for bit
+  (np.round(x, 2)); a column where that round trip would not be exact stays
+  float64.
+
+Aggregate on exact_values(...) (or expand_frame() a selection) rather than on
+the float32 column itself, so results match the plain float64 frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ["genre", "director", "stars"]
+FLOAT32_COLUMNS = ["runtime", "rating", "votes"]
+DECIMALS = 2
+
+# columns with more distinct values than this share of the rows stay plain strings
+MAX_CATEGORY_RATIO = 0.5
+
+
+def exact_values(series: pd.Series) -> pd.Series:
+    # float32 column -> the float64 values it was made from
+    if series.dtype == np.float32:
+        return pd.Series(np.round(series.to_numpy(dtype=np.float64), DECIMALS),
+                         index=series.index, name=series.name)
+    return series
+
+
+def plain_values(series: pd.Series) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(series.cat.categories.dtype)
+    return exact_values(series)
+
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Back to the dtypes read_sql_query would have given (for small selections)."""
+    return pd.DataFrame({col: plain_values(df[col]) for col in df.columns}, index=df.index)
+
+
+def fits_float32(values: np.ndarray) -> bool:
+    values = values[~np.isnan(values)]
+    as32 = values.astype(np.float32).astype(np.float64)
+    return bool(np.array_equal(np.round(as32, DECIMALS), values))
+
+
+class CategoryBuilder:
+    """Grows one dictionary across chunks and hands out int32 codes."""
+
+    def __init__(self):
+        self.index = {}
+        self.categories = []
+
+    def encode(self, series):
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            code = self.index.get(value)
+            if code is None:
+                code = self.index[value] = len(self.categories)
+                self.categories.append(value)
+            mapping[i] = code
+        out = np.full(len(codes), -1, dtype=np.int32)
+        present = codes >= 0
+        out[present] = mapping[codes[present]]
+        return out
+
+    def categorical(self, codes, dtype):
+        categories = pd.Index(self.categories, dtype=dtype)
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def read_typed(conn, query, params=None, chunksize=100_000) -> pd.DataFrame:
+    """pd.read_sql_query(query, conn) with categorical text and float32 numerics."""
+    builders = {}
+    text_dtypes = {}
+    columns = None
+    parts = {}
+    exact32 = {}
+    for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunksize):
+        if columns is None:
+            columns = list(chunk.columns)
+            parts = {col: [] for col in columns}
+        for col in columns:
+            values = chunk[col]
+            # a chunk that is all NULL comes back as object dtype whatever the column holds
+            all_null = values.isna().all()
+            if col in CATEGORICAL_COLUMNS and not pd.api.types.is_numeric_dtype(values.dtype):
+                builders.setdefault(col, CategoryBuilder())
+                if not all_null:
+                    text_dtypes.setdefault(col, values.dtype)
+                parts[col].append(builders[col].encode(values))
+            elif col in FLOAT32_COLUMNS and (pd.api.types.is_float_dtype(values.dtype) or all_null
+                                             or pd.api.types.is_integer_dtype(values.dtype)):
+                # a chunk of whole numbers without NULLs comes back as int64
+                array = values.to_numpy(dtype=np.float64)
+                if exact32.get(col, True) and fits_float32(array):
+                    exact32[col] = True
+                    array = array.astype(np.float32)
+                elif exact32.get(col, True):
+                    # not exact after all: earlier chunks go back to float64
+                    exact32[col] = False
+                    parts[col] = [np.round(p.astype(np.float64), DECIMALS) for p in parts[col]]
+                parts[col].append(array)
+            else:
+                parts[col].append(values)
+
+    if columns is None:
+        return pd.read_sql_query(query, conn, params=params)
+
+    out = {}
+    for col in columns:
+        if col in builders:
+            text_dtype = text_dtypes.get(col, object)
+            values = builders[col].categorical(np.concatenate(parts[col]), text_dtype)
+            if len(values.categories) > MAX_CATEGORY_RATIO * len(values):
+                # mostly unique (e.g. star line-ups): a dictionary would not save anything
+                values = pd.Series(values).astype(text_dtype)
+            out[col] = values
+        elif col in exact32:
+            out[col] = np.concatenate(parts[col])
+        else:
+            out[col] = pd.concat(parts[col], ignore_index=True)
+    return pd.DataFrame(out)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 ** 2